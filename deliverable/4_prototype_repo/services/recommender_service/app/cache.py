@@ -0,0 +1,94 @@
+"""
+Cache de predições em memória, versionado pelo modelo.
+
+Cada entrada fica sob ``(versão do modelo, features normalizadas)`` e expira
+após ``ttl_seconds``; acima de ``max_entries`` a menos usada é descartada
+(LRU).  Quando o serviço passa a consultar com outra versão (modelo recarregado
+ou entrada em fallback) o cache se esvazia sozinho, e gravações feitas com a
+versão anterior são ignoradas: um modelo novo nunca responde com predições do
+antigo.
+
+Métricas (rótulo ``cache``), expostas no ``/metrics`` do instrumentador:
+
+- ``reco_engine_prediction_cache_hits_total`` / ``..._misses_total``;
+- ``reco_engine_prediction_cache_evictions_total``: descartes por ``reason``
+  (``ttl``, ``size`` ou ``version``);
+- ``reco_engine_prediction_cache_entries``: entradas atuais.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+HITS = Counter("reco_engine_prediction_cache_hits_total", "Predições respondidas pelo cache.", ["cache"])
+MISSES = Counter("reco_engine_prediction_cache_misses_total", "Predições ausentes no cache.", ["cache"])
+EVICTIONS = Counter(
+    "reco_engine_prediction_cache_evictions_total", "Entradas descartadas do cache.", ["cache", "reason"]
+)
+ENTRIES = Gauge("reco_engine_prediction_cache_entries", "Entradas no cache de predições.", ["cache"])
+
+
+def normalize_features(features: List[float]) -> Tuple[float, ...]:
+    """Chave estável para o vetor: tudo como float e ``-0.0`` igual a ``0.0``."""
+    return tuple(float(x) + 0.0 for x in features)
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 60.0, name: str = "predict", clock=time.monotonic):
+        self.max_entries = max(0, int(max_entries))  # 0 desliga o cache
+        self.ttl = max(0.0, float(ttl_seconds))  # 0 desliga a expiração
+        self.name = name
+        self.clock = clock
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version: str, key: Hashable) -> Optional[Any]:
+        """Valor em cache para ``key`` na versão ``version``, ou ``None``."""
+        if not self.max_entries:
+            return None
+        reason = None
+        with self._lock:
+            if version != self.version:
+                reason, dropped = "version", len(self._entries)
+                self._entries.clear()
+                self.version = version
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and entry[0] <= self.clock():
+                del self._entries[key]
+                reason, dropped, entry = "ttl", 1, None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            size = len(self._entries)
+        if reason and dropped:
+            EVICTIONS.labels(self.name, reason).inc(dropped)
+        (MISSES if entry is None else HITS).labels(self.name).inc()
+        ENTRIES.labels(self.name).set(size)
+        return None if entry is None else entry[1]
+
+    def put(self, version: str, key: Hashable, value: Any) -> None:
+        """Grava ``value``; ignora se ``version`` já não é a versão atual."""
+        if not self.max_entries:
+            return
+        evicted = 0
+        with self._lock:
+            if self.version is None:
+                self.version = version
+            if version != self.version:
+                return
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            size = len(self._entries)
+        if evicted:
+            EVICTIONS.labels(self.name, "size").inc(evicted)
+        ENTRIES.labels(self.name).set(size)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"version": self.version, "entries": len(self._entries), "max_entries": self.max_entries}
@@ -0,0 +1,96 @@
+"""
+Executor de inferência com concorrência limitada.
+
+O trabalho síncrono (``model.predict``, chamadas ao MLflow) roda em um pool de
+threads dimensionado, fora do loop de eventos do Uvicorn.  A admissão é
+limitada a ``workers`` tarefas em execução mais ``max_queue`` na fila; acima
+disso ``run`` levanta ``Overloaded`` imediatamente e o handler responde 503
+com ``Retry-After``, mantendo o ``/health`` e o ``/metrics`` responsivos
+mesmo com a inferência saturada.
+
+Métricas (rótulo ``executor``), expostas no ``/metrics`` do instrumentador:
+
+- ``reco_engine_inference_queue_seconds``: histograma da espera na fila;
+- ``reco_engine_inference_run_seconds``: duração da execução;
+- ``reco_engine_inference_admitted``: tarefas executando ou na fila;
+- ``reco_engine_inference_rejected_total``: tarefas recusadas por fila cheia.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from prometheus_client import Counter, Gauge, Histogram
+
+_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+QUEUE_SECONDS = Histogram(
+    "reco_engine_inference_queue_seconds",
+    "Espera na fila do executor de inferência.",
+    ["executor"],
+    buckets=_TIME_BUCKETS,
+)
+RUN_SECONDS = Histogram(
+    "reco_engine_inference_run_seconds",
+    "Duração das tarefas no executor de inferência.",
+    ["executor"],
+    buckets=_TIME_BUCKETS,
+)
+ADMITTED = Gauge(
+    "reco_engine_inference_admitted", "Tarefas admitidas (executando ou na fila).", ["executor"]
+)
+REJECTED = Counter(
+    "reco_engine_inference_rejected_total", "Tarefas recusadas por fila cheia.", ["executor"]
+)
+
+
+class Overloaded(Exception):
+    """A fila de admissão do executor está cheia."""
+
+
+class BoundedExecutor:
+    def __init__(self, workers: int = 4, max_queue: int = 32, name: str = "inference"):
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self.name = name
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{name}-worker")
+        # Alterado apenas no loop de eventos (uma thread): dispensa lock
+        self._admitted = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Executa ``fn(*args)`` no pool; levanta ``Overloaded`` se não houver vaga."""
+        if self._admitted >= self.capacity:
+            REJECTED.labels(self.name).inc()
+            raise Overloaded(f"Fila de inferência cheia ({self.capacity} tarefas).")
+        self._admitted += 1
+        ADMITTED.labels(self.name).set(self._admitted)
+        enqueued = time.perf_counter()
+
+        def job():
+            start = time.perf_counter()
+            QUEUE_SECONDS.labels(self.name).observe(start - enqueued)
+            try:
+                return fn(*args)
+            finally:
+                RUN_SECONDS.labels(self.name).observe(time.perf_counter() - start)
+
+        # A vaga só é liberada quando a tarefa do pool termina: cancelar quem
+        # espera (timeout, cliente desconectado) não interrompe a thread
+        future = asyncio.get_running_loop().run_in_executor(self._pool, job)
+        future.add_done_callback(self._release)
+        return await asyncio.shield(future)
+
+    def _release(self, _future) -> None:
+        self._admitted -= 1
+        ADMITTED.labels(self.name).set(self._admitted)
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": self.workers, "max_queue": self.max_queue, "admitted": self._admitted}
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,5 +1,7 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import hmac
 import os
 import logging
 
@@ -9,8 +11,17 @@ from prometheus_fastapi_instrumentator import Instrumentator, Info
 from .schemas import HealthResponse, PredictRequest, PredictResponse
 from .model import PredictionModel
 from .mlflow_utils import configure_mlflow, log_inference
+from .executor import BoundedExecutor, Overloaded
+from .cache import PredictionCache, normalize_features
 
 APP_VERSION = os.getenv("APP_VERSION", "0.1.0-k8s")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+INFERENCE_QUEUE = int(os.getenv("INFERENCE_QUEUE", "32"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2.0"))
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", "10000"))
+PREDICT_CACHE_TTL = float(os.getenv("PREDICT_CACHE_TTL", "60"))
+# Sem token o /model/reload fica desativado (404); a troca de modelo volta a ser só por rollout
+MODEL_RELOAD_TOKEN = os.getenv("MODEL_RELOAD_TOKEN", "")
 log = logging.getLogger("uvicorn")
 
 app = FastAPI(
@@ -29,6 +40,18 @@ app.add_middleware(
 # Modelo global (carregado na inicialização)
 prediction_model = PredictionModel()
 
+# Trabalho bloqueante fora do loop de eventos: inferência com fila limitada,
+# logging no MLflow e a sonda do /health em pools separados, para que um
+# MLflow lento não consuma as vagas da inferência.
+inference_executor = BoundedExecutor(INFERENCE_WORKERS, INFERENCE_QUEUE, name="inference")
+logging_executor = BoundedExecutor(1, 256, name="mlflow_log")
+probe_executor = BoundedExecutor(1, 0, name="health_probe")
+reload_executor = BoundedExecutor(1, 0, name="model_reload")
+_background_tasks = set()
+
+# Cache de predições por (versão do modelo, features); trocar o modelo esvazia o cache
+prediction_cache = PredictionCache(PREDICT_CACHE_SIZE, PREDICT_CACHE_TTL)
+
 # --- IMPLEMENTAÇÃO FASE 3: Self-Observability ---
 
 def get_model_fallback_status(info: Info) -> int:
@@ -52,6 +75,8 @@ instrumentator.add(
     )
 )
 instrumentator.instrument(app)
+# Expõe /metrics (inclui os histogramas do executor, no registro padrão)
+instrumentator.expose(app, include_in_schema=False)
 # --------------------------------------------------
 
 @app.on_event("startup")
@@ -60,10 +85,16 @@ async def startup_event():
     IMPLEMENTAÇÃO FASE 2: O 'prediction_model.load()' agora é 
     resiliente e NUNCA falha o startup do serviço.
     """
-    prediction_model.load()
+    await asyncio.get_running_loop().run_in_executor(None, prediction_model.load)
     log.info(f"[startup] Carregamento do modelo concluído. Versão: {prediction_model.version}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    for executor in (inference_executor, logging_executor, probe_executor, reload_executor):
+        executor.shutdown()
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """
@@ -73,13 +104,14 @@ async def health_check():
     mlflow_connected = False
     notes = "MLflow (dependência) indisponível. Serviço em modo fallback."
     
-    # Teste de conexão (não-bloqueante)
+    # Teste de conexão em thread separada e com prazo: um MLflow lento não
+    # trava o loop nem o próprio /health
     try:
-        configure_mlflow() # Tenta conectar
+        await asyncio.wait_for(probe_executor.run(configure_mlflow), HEALTH_PROBE_TIMEOUT)
         mlflow_connected = True
         notes = "Serviço saudável."
     except Exception:
-        pass # Falha de conexão é esperada se o MLflow estiver fora (Fase 2)
+        pass # Falha de conexão (ou sonda anterior ainda pendente) é esperada se o MLflow estiver fora (Fase 2)
 
     # O status do app é 'ok' desde que o fallback esteja funcionando
     return HealthResponse(
@@ -96,22 +128,66 @@ async def predict(request: PredictRequest):
     if not request.features:
         raise HTTPException(status_code=400, detail="Lista de features vazia.")
 
-    # A lógica de fallback já está contida no método .predict()
-    prediction, model_version = prediction_model.predict(request.features)
-
-    # Log assíncrono (não bloqueia a resposta se o MLflow falhar)
-    try:
-        log_inference(
-            run_name="inference_prototype",
-            features=request.features,
-            prediction=prediction,
-        )
-    except Exception:
-        log.warning("Falha no logging de inferência (não-bloqueante).")
-        pass
+    # Referência local: um /model/reload concorrente troca o global
+    model = prediction_model
+    key = normalize_features(request.features)
+    prediction = prediction_cache.get(model.version, key)
+    model_version = model.version
+    if prediction is None:
+        # A lógica de fallback já está contida no método .predict(); roda no pool
+        # de inferência e responde 503 na hora se a fila estiver cheia
+        try:
+            prediction, model_version = await inference_executor.run(model.predict, request.features)
+        except Overloaded as exc:
+            raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+        # Fallback por erro de inferência não é a resposta do modelo: não entra no cache
+        if model_version == model.version:
+            prediction_cache.put(model_version, key, prediction)
+
+    # Log em segundo plano (não atrasa a resposta nem bloqueia o loop)
+    task = asyncio.create_task(_log_in_background(request.features, prediction))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
     return PredictResponse(
         prediction=prediction,
         model_version=model_version,
         metadata={"n_features": len(request.features)},
-    )
\ No newline at end of file
+    )
+
+
+@app.post("/model/reload", include_in_schema=False)
+async def reload_model(x_reload_token: str = Header(default="")):
+    """
+    Carrega de novo o modelo do MLflow (ex.: nova versão em Production) e o
+    troca atomicamente.  Se a carga cair em fallback, o modelo atual é mantido.
+
+    Só existe com ``MODEL_RELOAD_TOKEN`` definido e exige o mesmo valor no
+    cabeçalho ``X-Reload-Token``; uma carga por vez (outra em andamento -> 409).
+    """
+    global prediction_model
+    if not MODEL_RELOAD_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_reload_token.encode(), MODEL_RELOAD_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Token de recarga inválido.")
+    candidate = PredictionModel()
+    try:
+        await reload_executor.run(candidate.load)
+    except Overloaded:
+        raise HTTPException(status_code=409, detail="Recarga do modelo já em andamento.")
+    if candidate.fallback_active and not prediction_model.fallback_active:
+        raise HTTPException(status_code=503, detail=f"Falha ao recarregar; mantendo {prediction_model.version}.")
+    previous, prediction_model = prediction_model.version, candidate
+    log.info(f"[reload] Modelo trocado: {previous} -> {candidate.version}")
+    return {"previous_version": previous, "model_version": candidate.version, "cache": prediction_cache.stats()}
+
+
+async def _log_in_background(features, prediction: float) -> None:
+    try:
+        await logging_executor.run(
+            lambda: log_inference(run_name="inference_prototype", features=features, prediction=prediction)
+        )
+    except Overloaded:
+        log.warning("Fila de logging de inferência cheia; registro descartado.")
+    except Exception:
+        log.warning("Falha no logging de inferência (não-bloqueante).")
@@ -1,5 +1,6 @@
 import logging
-from typing import List, Tuple
+import os
+from typing import Any, List, Tuple
 from .mlflow_utils import load_model_from_mlflow
 import numpy as np
 
@@ -19,8 +20,10 @@ class PredictionModel:
         try:
             # 1. Tentar MLflow (Fonte Primária)
             self._model = load_model_from_mlflow()
-            # (Opcional: recuperar metadados de versão do modelo)
-            self._model_version = "mlflow-model-v1" # Simulado
+            # Versão a partir do run de origem: muda a cada modelo promovido
+            # (e invalida o cache de predições do serviço)
+            run_id = getattr(getattr(self._model, "metadata", None), "run_id", None)
+            self._model_version = f"mlflow-{run_id[:8]}" if run_id else "mlflow-model-v1"
             self.is_fallback = False
             log.info(f"Sucesso: Modelo carregado do MLflow (URI: {os.getenv('MLFLOW_MODEL_URI')})")
 
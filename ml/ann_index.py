@@ -0,0 +1,389 @@
+"""
+ann_index.py
+------------
+
+Índice IVF (*inverted file*) em NumPy para busca aproximada dos vizinhos mais
+próximos entre os embeddings do store (``embedding_store.py``).  Os vetores
+são agrupados por k-means em ``n_lists`` listas (por padrão ``4 * sqrt(N)``) e
+gravados contíguos, lista após lista; uma consulta pontua os centróides, visita
+só as ``nprobe`` listas mais próximas e ordena os candidatos por produto
+interno.  ``nprobe`` controla a troca entre recall e latência: ``nprobe =
+n_lists`` equivale à busca exata.
+
+Cada vetor guarda também o código da sua categoria.  Com filtro, os candidatos
+de outras categorias são descartados dentro das listas e, se as ``nprobe``
+listas não tiverem ``k`` candidatos válidos, a busca continua pelas listas
+seguintes até completar ``k`` (categorias raras custam mais listas, mas não
+perdem resultados).
+
+O índice é um diretório de ``.npy`` mais ``meta.json``, aberto com
+``mmap_mode="r"`` como o store, e o módulo não importa ``torch``.
+
+Uso:
+
+```bash
+# constrói a partir da versão mais recente do store e mede recall vs. QPS
+python -m ml.ann_index --store artifacts/embeddings --output artifacts/ann_index --benchmark
+
+# benchmark com 1M vetores sintéticos
+python -m ml.ann_index --synthetic 1000000 --dim 64 --output /tmp/ann --benchmark
+```
+
+```python
+from ml.ann_index import IVFIndex
+
+index = IVFIndex.load("artifacts/ann_index")
+ids, scores = index.search(index.vector_of(42), k=10, nprobe=8, categories=["service"], exclude_ids=[42])
+```
+"""
+
+import argparse
+import json
+import math
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    from .embedding_store import EmbeddingStore, lookup_ids
+    from .subgraph import _ranges
+except ImportError:  # executado como script: ``python ann_index.py``
+    from embedding_store import EmbeddingStore, lookup_ids
+    from subgraph import _ranges
+
+FORMAT_VERSION = 1
+METRICS = ("ip", "cosine")
+ARRAYS = ("centroids", "offsets", "vectors", "ids", "codes")
+
+PathLike = Union[str, Path]
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Centróide mais próximo (L2) de cada linha, em blocos de ~16M escores."""
+    half = 0.5 * np.einsum("cd,cd->c", centroids, centroids)
+    chunk = max(1024, (1 << 24) // len(centroids))
+    out = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), chunk):
+        out[start : start + chunk] = np.argmax(x[start : start + chunk] @ centroids.T - half, axis=1)
+    return out
+
+
+def kmeans(
+    x: np.ndarray, n_clusters: int, iters: int = 10, seed: int = 0, max_points_per_centroid: int = 64
+) -> np.ndarray:
+    """Centróides por Lloyd sobre uma amostra de até ``max_points_per_centroid * n_clusters`` linhas."""
+    rng = np.random.default_rng(seed)
+    n_sample = min(len(x), max_points_per_centroid * n_clusters)
+    sample = np.asarray(x[np.sort(rng.choice(len(x), n_sample, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(n_sample, n_clusters, replace=False)].copy()
+    for _ in range(iters):
+        labels = _nearest(sample, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        empty = counts == 0
+        order = np.argsort(labels, kind="stable")
+        starts = (np.cumsum(counts) - counts)[~empty]
+        centroids[~empty] = np.add.reduceat(sample[order], starts, axis=0) / counts[~empty, None]
+        # listas vazias recomeçam em pontos sorteados
+        centroids[empty] = sample[rng.choice(n_sample, int(empty.sum()), replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    """Índice IVF plano: centróides, vetores agrupados por lista e ids/categorias por posição."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, object]):
+        self.centroids = arrays["centroids"]
+        self.offsets = arrays["offsets"]
+        self.vectors = arrays["vectors"]
+        self.ids = arrays["ids"]
+        self.codes = arrays["codes"]
+        self.meta = meta
+        self.metric = str(meta["metric"])
+        self.categories: List[str] = list(meta.get("categories", []))
+        self._half_norms = 0.5 * np.einsum("cd,cd->c", self.centroids, self.centroids)
+        self._order = np.argsort(self.ids, kind="stable")
+        self._sorted_ids = self.ids[self._order]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        ids: np.ndarray,
+        n_lists: Optional[int] = None,
+        metric: str = "cosine",
+        codes: Optional[np.ndarray] = None,
+        categories: Optional[Sequence[str]] = None,
+        seed: int = 0,
+        iters: int = 10,
+        meta: Optional[Dict[str, object]] = None,
+    ) -> "IVFIndex":
+        """Agrupa ``vectors`` (uma linha por id) e devolve o índice em memória.
+
+        ``codes`` é o índice em ``categories`` de cada linha (``-1`` sem
+        categoria).
+        """
+        if metric not in METRICS:
+            raise ValueError(f"métrica desconhecida: {metric!r} (use {METRICS})")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if metric == "cosine":
+            vectors = _normalize(vectors)
+        n_lists = n_lists or max(1, int(4 * math.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        centroids = kmeans(vectors, n_lists, iters=iters, seed=seed)
+        labels = _nearest(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=offsets[1:])
+        codes = np.full(len(vectors), -1, dtype=np.int32) if codes is None else np.asarray(codes, dtype=np.int32)
+        arrays = {
+            "centroids": centroids,
+            "offsets": offsets,
+            "vectors": np.ascontiguousarray(vectors[order]),
+            "ids": np.asarray(ids)[order],
+            "codes": codes[order],
+        }
+        info = dict(meta or {})
+        info.update(
+            format_version=FORMAT_VERSION,
+            metric=metric,
+            categories=list(categories or []),
+            n_lists=n_lists,
+            size=len(vectors),
+            dim=int(vectors.shape[1]),
+            built_at=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        )
+        return cls(arrays, info)
+
+    def save(self, path: PathLike) -> Path:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(path / f"{name}.npy", getattr(self, name), allow_pickle=False)
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path: PathLike, mmap: bool = True) -> "IVFIndex":
+        path = Path(path)
+        with open(path / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"formato de {path} não suportado: {meta.get('format_version')}")
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r" if mmap and name == "vectors" else None)
+            for name in ARRAYS
+        }
+        return cls(arrays, meta)
+
+    def positions(self, node_ids: Sequence) -> np.ndarray:
+        """Posição de cada id no índice (``-1`` para ids ausentes)."""
+        return lookup_ids(self._sorted_ids, self._order, node_ids)
+
+    def vector_of(self, node_id) -> np.ndarray:
+        """Vetor indexado de ``node_id``; levanta ``KeyError`` se o id não estiver no índice."""
+        pos = int(self.positions([node_id])[0])
+        if pos < 0:
+            raise KeyError(node_id)
+        return np.asarray(self.vectors[pos])
+
+    def category_codes(self, categories: Sequence[str]) -> np.ndarray:
+        unknown = [c for c in categories if c not in self.categories]
+        if unknown:
+            raise KeyError(f"categorias desconhecidas: {unknown}")
+        return np.asarray([self.categories.index(c) for c in categories], dtype=np.int32)
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        nprobe: int = 8,
+        categories: Optional[Sequence[str]] = None,
+        exclude_ids: Optional[Sequence] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Os ``k`` ids de maior produto interno com ``query`` e os seus escores (ordem decrescente).
+
+        Com ``categories``, só vetores dessas categorias entram no resultado.
+        Se as ``nprobe`` listas não tiverem ``k`` candidatos válidos, a busca
+        continua pelas listas seguintes.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        if self.metric == "cosine":
+            query = _normalize(query)
+        allowed = None if not categories else self.category_codes(categories)
+        excluded = None if exclude_ids is None else self.positions(exclude_ids)
+        list_order = np.argsort(self._half_norms - self.centroids @ query, kind="stable")
+        nprobe = max(1, min(nprobe, self.n_lists))
+        found: List[np.ndarray] = []
+        n_found = 0
+        for start in range(0, self.n_lists, nprobe):
+            lists = list_order[start : start + nprobe]
+            cand = _ranges(self.offsets[lists], self.offsets[lists + 1] - self.offsets[lists])
+            if allowed is not None:
+                cand = cand[np.isin(self.codes[cand], allowed)]
+            if excluded is not None and len(cand):
+                cand = cand[~np.isin(cand, excluded)]
+            found.append(cand)
+            n_found += len(cand)
+            if n_found >= k:
+                break
+        cand = np.concatenate(found)
+        scores = np.asarray(self.vectors[cand]) @ query
+        if len(cand) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            cand, scores = cand[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return self.ids[cand[order]], scores[order]
+
+    def exact_search(self, queries: np.ndarray, k: int = 10, chunk: int = 262144) -> np.ndarray:
+        """Posições dos ``k`` vizinhos exatos de cada consulta (força bruta em blocos)."""
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.metric == "cosine":
+            queries = _normalize(queries)
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_pos = np.zeros((len(queries), k), dtype=np.int64)
+        for start in range(0, len(self), chunk):
+            scores = queries @ np.asarray(self.vectors[start : start + chunk]).T
+            merged_scores = np.concatenate([best_scores, scores], axis=1)
+            merged_pos = np.concatenate(
+                [best_pos, np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)], axis=1
+            )
+            top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(merged_scores, top, axis=1)
+            best_pos = np.take_along_axis(merged_pos, top, axis=1)
+        return best_pos
+
+
+def store_category_codes(store: EmbeddingStore) -> Tuple[Optional[np.ndarray], List[str]]:
+    """Categoria de cada linha do store a partir do one-hot no fim das features (como no treino)."""
+    categories = list(store.meta.get("categories", []))
+    if not categories or not store.has_graph:
+        return None, categories
+    features, _ = store.load_graph()
+    onehot = np.asarray(features[:, features.shape[1] - len(categories) :])
+    codes = np.argmax(onehot, axis=1).astype(np.int32)
+    codes[onehot.max(axis=1) <= 0] = -1
+    return codes, categories
+
+
+def build_from_store(
+    store: EmbeddingStore,
+    layer: str = "output",
+    n_lists: Optional[int] = None,
+    metric: str = "cosine",
+    seed: int = 0,
+) -> IVFIndex:
+    """Índice sobre a camada ``layer`` da versão ``store`` (linhas removidas ficam de fora)."""
+    keep = ~store.deleted
+    codes, categories = store_category_codes(store)
+    return IVFIndex.build(
+        np.asarray(store.layers[layer])[keep],
+        store.ids[keep],
+        n_lists=n_lists,
+        metric=metric,
+        codes=None if codes is None else codes[keep],
+        categories=categories,
+        seed=seed,
+        meta={"store_version": store.version, "layer": layer},
+    )
+
+
+def benchmark(
+    index: IVFIndex,
+    queries: np.ndarray,
+    k: int = 10,
+    nprobes: Sequence[int] = (1, 2, 4, 8, 16, 32, 64),
+) -> List[Dict[str, float]]:
+    """Recall@k (contra a busca exata) e vazão de consultas uma a uma para cada ``nprobe``."""
+    truth_pos = index.exact_search(queries, k)
+    truth = [set(index.ids[row].tolist()) for row in truth_pos]
+    results = []
+    for nprobe in nprobes:
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            ids, _ = index.search(query, k=k, nprobe=nprobe)
+            latencies.append(time.perf_counter() - start)
+            hits += len(expected.intersection(ids.tolist()))
+        latencies = np.asarray(latencies) * 1000.0
+        results.append({
+            "nprobe": nprobe,
+            f"recall_at_{k}": hits / (k * len(queries)),
+            "qps": len(queries) / (latencies.sum() / 1000.0),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+        })
+    return results
+
+
+def synthetic_vectors(n: int, dim: int, n_clusters: int = 1000, seed: int = 0) -> np.ndarray:
+    """Mistura de gaussianas para medir o índice em escala sem um store."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim), dtype=np.float32)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 1_000_000):
+        size = min(1_000_000, n - start)
+        out[start : start + size] = centers[rng.integers(n_clusters, size=size)]
+        out[start : start + size] += 0.5 * rng.standard_normal((size, dim), dtype=np.float32)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Constrói o índice IVF de embeddings e mede recall vs. QPS")
+    parser.add_argument("--store", type=str, default="artifacts/embeddings", help="Raiz do store de embeddings")
+    parser.add_argument("--version", type=str, default=None, help="Versão do store (padrão: LATEST)")
+    parser.add_argument("--layer", type=str, default="output", help="Camada indexada")
+    parser.add_argument("--output", type=str, default="artifacts/ann_index", help="Diretório do índice")
+    parser.add_argument("--n-lists", type=int, default=None, help="Número de listas (padrão: 4*sqrt(N))")
+    parser.add_argument("--metric", type=str, default="cosine", choices=METRICS, help="Similaridade")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do k-means e das consultas")
+    parser.add_argument("--synthetic", type=int, default=0, help="Usa N vetores sintéticos em vez do store")
+    parser.add_argument("--dim", type=int, default=64, help="Dimensão dos vetores sintéticos")
+    parser.add_argument("--benchmark", action="store_true", help="Mede recall@k e QPS após construir")
+    parser.add_argument("--queries", type=int, default=1000, help="Consultas do benchmark")
+    parser.add_argument("--k", type=int, default=10, help="Vizinhos por consulta no benchmark")
+    parser.add_argument("--nprobes", type=str, default="1,2,4,8,16,32,64", help="Valores de nprobe medidos")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dim, seed=args.seed)
+        index = IVFIndex.build(vectors, np.arange(len(vectors)), args.n_lists, args.metric, seed=args.seed)
+    else:
+        if args.version is None:
+            store = EmbeddingStore.open_latest(args.store)
+        else:
+            store = EmbeddingStore(f"{args.store}/{args.version}")
+        index = build_from_store(store, args.layer, args.n_lists, args.metric, args.seed)
+    index.save(args.output)
+    print(f"índice com {len(index)} vetores e {index.n_lists} listas em {args.output} ({time.perf_counter() - start:.1f}s)")
+
+    if args.benchmark:
+        rng = np.random.default_rng(args.seed)
+        rows = rng.choice(len(index), min(args.queries, len(index)), replace=False)
+        queries = np.asarray(index.vectors[rows])
+        nprobes = [int(n) for n in args.nprobes.split(",")]
+        print(f"{'nprobe':>7} {'recall@' + str(args.k):>10} {'qps':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        for row in benchmark(index, queries, args.k, nprobes):
+            print(
+                f"{row['nprobe']:>7} {row[f'recall_at_{args.k}']:>10.4f} {row['qps']:>10.0f} "
+                f"{row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+embedding_refresh.py
+--------------------
+
+Atualização incremental do store de embeddings (``embedding_store.py``) quando
+o grafo de dependências muda.  Em vez de recalcular todos os nós, um delta
+(nós/arestas adicionados ou removidos) é aplicado ao grafo guardado na versão
+e, com os pesos do ``GraphSAGEModel`` já treinado, são recalculadas apenas as
+linhas afetadas:
+
+* ``hidden`` (1ª camada) muda nos nós cujas arestas de entrada mudaram e nos
+  nós novos;
+* ``output`` (2ª camada) muda nesses nós e nos seus vizinhos diretos.
+
+As linhas são gravadas no próprio memmap da versão (nós novos ganham linhas no
+fim dos arquivos, nós removidos são marcados em ``deleted.npy``), de modo que
+os serviços que já mapearam a versão passam a ver os valores novos sem
+recarregar.  O custo é proporcional às vizinhanças de 2 saltos do delta, não
+ao tamanho do grafo.
+
+Formato do delta (ids como em ``data/graph.json``):
+
+```json
+{"added_nodes": [{"id": 64, "category": "service"}],
+ "removed_nodes": [12],
+ "added_edges": [{"source": 64, "target": 5}],
+ "removed_edges": [{"source": 3, "target": 7}]}
+```
+
+Uso:
+
+```bash
+python -m ml.embedding_refresh --store artifacts/embeddings --delta delta.json \
+  --mlflow-uri http://localhost:5000
+```
+"""
+
+import argparse
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import mlflow
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+try:
+    from .embedding_store import EmbeddingStore
+except ImportError:  # executado como script: ``python embedding_refresh.py``
+    from embedding_store import EmbeddingStore
+
+
+@dataclass
+class GraphDelta:
+    """Mudanças no grafo; nós novos trazem ``category`` ou ``features`` explícitas."""
+
+    added_nodes: List[Dict[str, object]] = field(default_factory=list)
+    removed_nodes: List[Hashable] = field(default_factory=list)
+    added_edges: List[Tuple[Hashable, Hashable]] = field(default_factory=list)
+    removed_edges: List[Tuple[Hashable, Hashable]] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, list]) -> "GraphDelta":
+        def edges(key: str) -> List[Tuple[Hashable, Hashable]]:
+            return [(e["source"], e["target"]) for e in payload.get(key, [])]
+
+        return cls(
+            added_nodes=list(payload.get("added_nodes", [])),
+            removed_nodes=list(payload.get("removed_nodes", [])),
+            added_edges=edges("added_edges"),
+            removed_edges=edges("removed_edges"),
+        )
+
+
+@dataclass
+class RefreshResult:
+    """Linhas tocadas por uma atualização incremental."""
+
+    added_rows: np.ndarray
+    removed_rows: np.ndarray
+    hidden_rows: np.ndarray
+    output_rows: np.ndarray
+    seconds: float
+
+
+def load_delta(path: str) -> GraphDelta:
+    with open(path, "r", encoding="utf-8") as f:
+        return GraphDelta.from_dict(json.load(f))
+
+
+def new_node_features(store: EmbeddingStore, nodes: List[Dict[str, object]], rows: np.ndarray) -> np.ndarray:
+    """Features dos nós novos no mesmo formato do treino (aleatórias + one-hot da categoria).
+
+    A parte aleatória usa ``default_rng([feature_seed, linha])``, determinística
+    por nó.
+    """
+    width = int(np.load(store.path / "features.npy", mmap_mode="r").shape[1])
+    categories = list(store.meta.get("categories", []))
+    rand_dim = width - len(categories)
+    out = np.zeros((len(nodes), width), dtype=np.float32)
+    for i, (node, row) in enumerate(zip(nodes, rows)):
+        if "features" in node:
+            out[i] = np.asarray(node["features"], dtype=np.float32)
+            continue
+        if node.get("category") not in categories:
+            raise ValueError(f"categoria desconhecida para o nó {node.get('id')}: {node.get('category')!r}")
+        rng = np.random.default_rng([int(store.meta.get("feature_seed", 0)), int(row)])
+        out[i, :rand_dim] = rng.standard_normal(rand_dim, dtype=np.float32)
+        out[i, rand_dim + categories.index(node["category"])] = 1.0
+    return out
+
+
+def _rows(store: EmbeddingStore, ids) -> np.ndarray:
+    rows = store.rows(list(ids))
+    if (rows < 0).any():
+        raise KeyError(f"ids desconhecidos no store: {np.asarray(list(ids))[rows < 0][:10].tolist()}")
+    return rows
+
+
+def _both_directions(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    return np.stack([np.concatenate([src, dst]), np.concatenate([dst, src])])
+
+
+@torch.no_grad()
+def _conv_rows(conv, features: np.ndarray, edge_index: np.ndarray, rows: np.ndarray) -> torch.Tensor:
+    """Saída de ``conv`` apenas para ``rows``, sobre o subgrafo das suas arestas de entrada."""
+    incoming = edge_index[:, np.isin(edge_index[1], rows)]
+    nodes = np.union1d(rows, incoming[0])
+    local = np.searchsorted(nodes, incoming)
+    x = torch.from_numpy(np.asarray(features[nodes], dtype=np.float32))
+    out = conv(x, torch.from_numpy(local.astype(np.int64)))
+    return out[torch.from_numpy(np.searchsorted(nodes, rows))]
+
+
+def refresh_embeddings(store: EmbeddingStore, model: torch.nn.Module, delta: GraphDelta) -> RefreshResult:
+    """Aplica ``delta`` ao grafo da versão e recalcula só as linhas afetadas (no lugar).
+
+    ``store`` precisa estar aberto em ``r+`` e ter o grafo de origem guardado
+    (versões gravadas por ``train_gnn.export_embeddings``).
+    """
+    if store.mode != "r+" or not store.has_graph:
+        raise ValueError("o store precisa estar aberto em 'r+' e conter o grafo de origem")
+    start = time.perf_counter()
+    model = model.cpu().eval()
+    removed = _rows(store, delta.removed_nodes) if delta.removed_nodes else np.empty(0, dtype=np.int64)
+    new_ids = [node["id"] for node in delta.added_nodes]
+    if new_ids and (store.rows(new_ids) >= 0).any():
+        raise ValueError("nós adicionados já existem no store")
+    added = store.grow(new_ids)
+    features, edge_index = store.load_graph()
+    if len(added):
+        features[added] = new_node_features(store, delta.added_nodes, added)
+
+    # arestas removidas (nos dois sentidos) e todas as arestas dos nós removidos
+    n = np.int64(len(store.ids))
+    keys = edge_index[0] * n + edge_index[1]
+    drop = np.isin(edge_index[0], removed) | np.isin(edge_index[1], removed)
+    if delta.removed_edges:
+        src, dst = _rows(store, [u for u, _ in delta.removed_edges]), _rows(store, [v for _, v in delta.removed_edges])
+        pairs = _both_directions(src, dst)
+        drop |= np.isin(keys, pairs[0] * n + pairs[1])
+    if delta.added_edges:
+        src, dst = _rows(store, [u for u, _ in delta.added_edges]), _rows(store, [v for _, v in delta.added_edges])
+        new_edges = _both_directions(src, dst)
+    else:
+        new_edges = np.empty((2, 0), dtype=np.int64)
+    changed = np.unique(np.concatenate([edge_index[1][drop], new_edges[1], added]))
+    edge_index = np.concatenate([edge_index[:, ~drop], new_edges], axis=1)
+    store.save_edge_index(edge_index)
+
+    # hidden muda onde a vizinhança de entrada (ou a própria feature) mudou; output, também nos vizinhos
+    hidden_rows = np.setdiff1d(changed, removed)
+    output_rows = np.setdiff1d(
+        np.union1d(hidden_rows, edge_index[1][np.isin(edge_index[0], hidden_rows)]), removed
+    )
+    hidden, output = store.layers["hidden"], store.layers["output"]
+    if len(hidden_rows):
+        hidden[hidden_rows] = F.relu(_conv_rows(model.conv1, features, edge_index, hidden_rows)).numpy()
+    if len(output_rows):
+        output[output_rows] = _conv_rows(model.conv2, hidden, edge_index, output_rows).numpy()
+    if len(removed):
+        hidden[removed] = 0.0
+        output[removed] = 0.0
+        store.mark_deleted(removed)
+    store.flush()
+    if isinstance(features, np.memmap):
+        features.flush()
+    store.update_meta(
+        refreshed_at=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        refresh_count=int(store.meta.get("refresh_count", 0)) + 1,
+    )
+    return RefreshResult(added, removed, hidden_rows, output_rows, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Atualiza incrementalmente o store de embeddings a partir de um delta")
+    parser.add_argument("--store", type=str, default="artifacts/embeddings", help="Raiz do store de embeddings")
+    parser.add_argument("--version", type=str, default=None, help="Versão a atualizar (padrão: LATEST)")
+    parser.add_argument("--delta", type=str, required=True, help="Arquivo JSON com o delta do grafo")
+    parser.add_argument(
+        "--model-uri",
+        type=str,
+        default=None,
+        help="URI do modelo no MLflow (padrão: runs:/<run_id da versão>/model)",
+    )
+    parser.add_argument("--mlflow-uri", type=str, default="http://127.0.0.1:5000", help="URI do tracking do MLflow")
+    args = parser.parse_args()
+    mlflow.set_tracking_uri(args.mlflow_uri)
+    if args.version is None:
+        store = EmbeddingStore.open_latest(args.store, mode="r+")
+    else:
+        store = EmbeddingStore(f"{args.store}/{args.version}", mode="r+")
+    model = mlflow.pytorch.load_model(args.model_uri or f"runs:/{store.meta['run_id']}/model")
+    result = refresh_embeddings(store, model, load_delta(args.delta))
+    print(
+        f"versão {store.version}: {len(result.added_rows)} nós adicionados, {len(result.removed_rows)} removidos, "
+        f"{len(result.hidden_rows)} linhas hidden e {len(result.output_rows)} output recalculadas "
+        f"em {result.seconds:.3f}s (de {len(store)} nós)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+embedding_store.py
+------------------
+
+Armazenamento materializado dos embeddings de nós produzidos pelo
+``GraphSAGEModel``.  Cada versão é um diretório com uma matriz ``float32`` por
+camada em formato ``.npy`` (``hidden`` = saída da primeira camada após ReLU,
+``output`` = saída final), o vetor ``ids.npy`` com o id de cada linha e um
+``meta.json`` (dimensões, modelo de origem, data).  O arquivo ``LATEST`` na
+raiz aponta para a versão mais recente e é trocado de forma atômica.
+Opcionalmente a versão guarda o grafo de onde os embeddings saíram
+(``features.npy`` e ``edge_index.npy``), usado pela atualização incremental de
+``embedding_refresh.py``, e ``deleted.npy`` marca linhas de nós removidos.
+
+As matrizes são abertas com ``mmap_mode="r"``: vários processos de serviço
+mapeiam o mesmo arquivo somente leitura e compartilham as páginas do page
+cache, sem copiar os embeddings para a memória de cada processo.  O índice
+id -> linha é feito por busca binária sobre os ids ordenados, sem dicionário
+Python por nó.
+
+Exemplo:
+
+```python
+from ml.embedding_store import EmbeddingStore
+
+store = EmbeddingStore.open_latest("artifacts/embeddings")
+vectors = store.get([12, 40], layer="hidden")
+```
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+LATEST_FILE = "LATEST"
+META_FILE = "meta.json"
+IDS_FILE = "ids.npy"
+FEATURES_FILE = "features.npy"
+EDGE_INDEX_FILE = "edge_index.npy"
+DELETED_FILE = "deleted.npy"
+
+PathLike = Union[str, Path]
+
+
+def common_id_dtype(a: np.dtype, b: np.dtype) -> Optional[np.dtype]:
+    """Dtype em que ids dos dois tipos se comparam sem perda (``None`` se são de naturezas distintas).
+
+    Números só se comparam com números e textos com textos; entre textos vale
+    o mais largo, para que ``'svc_a_extra'`` não seja truncado em ``'svc_a'``.
+    """
+    a, b = np.dtype(a), np.dtype(b)
+    if a.kind in "biuf" and b.kind in "biuf":
+        return np.promote_types(a, b)
+    if a.kind == b.kind and a.kind in "US":
+        return np.promote_types(a, b)
+    return None
+
+
+def lookup_ids(sorted_ids: np.ndarray, order: np.ndarray, node_ids: Sequence) -> np.ndarray:
+    """``order[k]`` para cada id encontrado em ``sorted_ids[k]`` (``-1`` para ids ausentes).
+
+    ``sorted_ids = ids[order]`` precisa estar ordenado.  A consulta não é
+    convertida para o dtype dos ids guardados: os dois lados sobem para o
+    dtype comum, e ids de outra natureza simplesmente não são encontrados.
+    """
+    node_ids = np.asarray(node_ids)
+    dtype = common_id_dtype(sorted_ids.dtype, node_ids.dtype) if node_ids.size else None
+    if not len(sorted_ids) or dtype is None:
+        return np.full(len(node_ids), -1, dtype=np.int64)
+    keys, node_ids = sorted_ids.astype(dtype, copy=False), node_ids.astype(dtype, copy=False)
+    pos = np.minimum(np.searchsorted(keys, node_ids), len(keys) - 1)
+    return np.where(keys[pos] == node_ids, order[pos], -1).astype(np.int64, copy=False)
+
+
+class EmbeddingStore:
+    """Uma versão do store: matrizes por camada mapeadas em memória e índice de ids."""
+
+    def __init__(self, path: PathLike, mode: str = "r"):
+        self.path = Path(path)
+        self.mode = mode
+        with open(self.path / META_FILE, "r", encoding="utf-8") as f:
+            self.meta: Dict[str, object] = json.load(f)
+        self.version = str(self.meta["version"])
+        self.ids = np.load(self.path / IDS_FILE, allow_pickle=False)
+        deleted_path = self.path / DELETED_FILE
+        self.deleted = np.load(deleted_path) if deleted_path.exists() else np.zeros(len(self.ids), dtype=bool)
+        self._order = np.argsort(self.ids, kind="stable")
+        self._sorted_ids = self.ids[self._order]
+        self.layers: Dict[str, np.ndarray] = {
+            layer: np.load(self.path / f"{layer}.npy", mmap_mode=mode) for layer in self.meta["layers"]
+        }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def hidden(self) -> np.ndarray:
+        return self.layers["hidden"]
+
+    @property
+    def output(self) -> np.ndarray:
+        return self.layers["output"]
+
+    def rows(self, node_ids: Sequence) -> np.ndarray:
+        """Linha de cada id (``-1`` para ids ausentes)."""
+        rows = lookup_ids(self._sorted_ids, self._order, node_ids)
+        if not len(self.ids):
+            return rows
+        return np.where((rows >= 0) & ~self.deleted[rows], rows, -1)
+
+    def get(self, node_ids: Sequence, layer: str = "output") -> np.ndarray:
+        """Embeddings dos ids informados; levanta ``KeyError`` para ids desconhecidos."""
+        rows = self.rows(node_ids)
+        if (rows < 0).any():
+            missing = np.asarray(node_ids)[rows < 0]
+            raise KeyError(f"ids sem embedding na versão {self.version}: {missing[:10].tolist()}")
+        return np.asarray(self.layers[layer][rows])
+
+    def flush(self) -> None:
+        """Grava no disco as alterações feitas em modo ``r+``."""
+        for matrix in self.layers.values():
+            if isinstance(matrix, np.memmap):
+                matrix.flush()
+
+    @property
+    def has_graph(self) -> bool:
+        return (self.path / FEATURES_FILE).exists() and (self.path / EDGE_INDEX_FILE).exists()
+
+    def save_graph(self, features: np.ndarray, edge_index: np.ndarray) -> None:
+        """Guarda as features e as arestas ``[origem, destino]`` (em linhas) usadas no cálculo."""
+        np.save(self.path / FEATURES_FILE, np.asarray(features, dtype=np.float32), allow_pickle=False)
+        self.save_edge_index(edge_index)
+
+    def save_edge_index(self, edge_index: np.ndarray) -> None:
+        _save_atomic(self.path / EDGE_INDEX_FILE, np.asarray(edge_index, dtype=np.int64))
+
+    def update_meta(self, **values) -> None:
+        self.meta.update(values)
+        _write_json_atomic(self.path / META_FILE, self.meta)
+
+    def load_graph(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Features (memmap no modo do store) e ``edge_index`` do grafo guardado."""
+        return (
+            np.load(self.path / FEATURES_FILE, mmap_mode=self.mode),
+            np.load(self.path / EDGE_INDEX_FILE, allow_pickle=False),
+        )
+
+    def grow(self, new_ids: Sequence) -> np.ndarray:
+        """Acrescenta linhas (zeros) para ``new_ids`` sem reescrever as matrizes.
+
+        Os arquivos ``.npy`` crescem no próprio lugar (o cabeçalho reserva
+        espaço para a dimensão 0 crescer); leitores com mapeamentos antigos
+        continuam vendo as linhas que já existiam.  Devolve as novas linhas.
+        """
+        new_ids = np.asarray(new_ids)
+        start, n_new = len(self.ids), len(new_ids)
+        if n_new == 0:
+            return np.empty(0, dtype=np.int64)
+        # sem converter para o dtype atual: ids de texto mais longos seriam truncados
+        dtype = common_id_dtype(self.ids.dtype, new_ids.dtype)
+        if dtype is None:
+            raise TypeError(f"ids {new_ids.dtype} incompatíveis com os ids {self.ids.dtype} do store")
+        self.flush()
+        files = [self.path / f"{layer}.npy" for layer in self.meta["layers"]]
+        if self.has_graph:
+            files.append(self.path / FEATURES_FILE)
+        for path in files:
+            _grow_npy(path, start + n_new)
+        _save_atomic(self.path / IDS_FILE, np.concatenate([self.ids.astype(dtype), new_ids.astype(dtype)]))
+        self.mark_deleted(np.empty(0, dtype=np.int64), size=start + n_new)
+        self.update_meta(num_nodes=start + n_new)
+        self.__init__(self.path, self.mode)
+        return np.arange(start, start + n_new)
+
+    def mark_deleted(self, rows: np.ndarray, size: Optional[int] = None) -> None:
+        """Marca linhas como removidas (``rows``/``get`` deixam de encontrá-las)."""
+        deleted = np.zeros(size or len(self.ids), dtype=bool)
+        deleted[: len(self.deleted)] = self.deleted
+        deleted[rows] = True
+        _save_atomic(self.path / DELETED_FILE, deleted)
+        self.deleted = deleted
+
+    @classmethod
+    def create(
+        cls,
+        root: PathLike,
+        version: str,
+        ids: np.ndarray,
+        dims: Dict[str, int],
+        meta: Optional[Dict[str, object]] = None,
+    ) -> "EmbeddingStore":
+        """Cria uma versão vazia (zeros) aberta em ``r+`` para ser preenchida."""
+        path = Path(root) / version
+        path.mkdir(parents=True, exist_ok=False)
+        ids = np.asarray(ids)
+        if ids.dtype.kind not in "iu":
+            ids = ids.astype(str)
+        np.save(path / IDS_FILE, ids, allow_pickle=False)
+        for layer, dim in dims.items():
+            np.lib.format.open_memmap(path / f"{layer}.npy", mode="w+", dtype=np.float32, shape=(len(ids), dim)).flush()
+        info = {
+            "version": version,
+            "layers": list(dims),
+            "dims": dims,
+            "num_nodes": int(len(ids)),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            **(meta or {}),
+        }
+        _write_json_atomic(path / META_FILE, info)
+        return cls(path, mode="r+")
+
+    @classmethod
+    def open_latest(cls, root: PathLike, mode: str = "r") -> "EmbeddingStore":
+        """Abre a versão apontada por ``LATEST``."""
+        return cls(Path(root) / latest_version(root), mode=mode)
+
+
+def _save_atomic(path: Path, array: np.ndarray) -> None:
+    tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npy")
+    np.save(tmp, array, allow_pickle=False)
+    os.replace(tmp, path)
+
+
+def _write_json_atomic(path: Path, payload: Dict[str, object]) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+_HEADER_IO = {
+    (1, 0): (np.lib.format.read_array_header_1_0, np.lib.format.write_array_header_1_0),
+    (2, 0): (np.lib.format.read_array_header_2_0, np.lib.format.write_array_header_2_0),
+}
+
+
+def _grow_npy(path: Path, rows: int) -> None:
+    """Aumenta a dimensão 0 de um ``.npy`` C-contíguo reescrevendo só o cabeçalho."""
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        read_header, write_header = _HEADER_IO[version]
+        shape, fortran, dtype = read_header(f)
+        offset = f.tell()
+        if fortran:
+            raise ValueError(f"{path} está em ordem Fortran e não pode crescer")
+        header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (rows, *shape[1:])}
+        f.seek(0)
+        write_header(f, header)
+        if f.tell() != offset:
+            raise ValueError(f"cabeçalho de {path} sem espaço para {rows} linhas")
+        f.truncate(offset + rows * int(np.prod(shape[1:], dtype=np.int64)) * dtype.itemsize)
+
+
+def latest_version(root: PathLike) -> str:
+    with open(Path(root) / LATEST_FILE, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def publish(root: PathLike, version: str) -> None:
+    """Aponta ``LATEST`` para ``version`` (troca atômica do arquivo)."""
+    tmp = Path(root) / f".{LATEST_FILE}.{os.getpid()}.tmp"
+    tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp, Path(root) / LATEST_FILE)
+
+
+def write_embeddings(
+    root: PathLike,
+    version: str,
+    ids: np.ndarray,
+    layers: Dict[str, np.ndarray],
+    meta: Optional[Dict[str, object]] = None,
+    make_latest: bool = True,
+    graph: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> EmbeddingStore:
+    """Grava uma nova versão a partir de matrizes já calculadas e a publica.
+
+    ``graph`` (``(features, edge_index)``) guarda junto o grafo de origem,
+    necessário para atualizações incrementais.
+    """
+    store = EmbeddingStore.create(root, version, ids, {k: int(v.shape[1]) for k, v in layers.items()}, meta)
+    for layer, values in layers.items():
+        store.layers[layer][:] = np.asarray(values, dtype=np.float32)
+    store.flush()
+    if graph is not None:
+        store.save_graph(*graph)
+    if make_latest:
+        publish(root, version)
+    return store
@@ -0,0 +1,330 @@
+"""
+hparam_search.py
+----------------
+
+Busca de hiperparâmetros do ``GraphSAGEModel`` em paralelo com parada
+antecipada ASHA (Asynchronous Successive Halving).  Cada tentativa sorteia
+``hidden_channels``, ``lr`` e, no modo mini-batch, ``fanouts``; o número de
+épocas é o orçamento dos degraus (``min_epochs * eta**k`` até
+``max_epochs``).  Sempre que um processo fica livre, a tentativa que está entre
+as ``1/eta`` melhores do seu degrau é promovida e continua do checkpoint até o
+próximo orçamento; se não houver promoção possível, uma nova tentativa começa.
+Tentativas ruins param cedo, sem esperar o degrau inteiro terminar.
+
+Promoções e a escolha da melhor tentativa usam a acurácia de validação, uma
+fração (``--val-fraction``) dos nós de treino separada pelo ``GNNTrainer``.  O
+conjunto de teste só é avaliado uma vez, no checkpoint da configuração
+escolhida, e essa é a ``test_accuracy`` registrada; ela não participa da
+seleção e, portanto, não fica otimista.
+
+As tentativas rodam em um ``ProcessPoolExecutor`` com limite de threads por
+tentativa (``torch.set_num_threads`` e
+``OMP_NUM_THREADS``/``MKL_NUM_THREADS``), para que ``workers x threads`` não
+ultrapasse os núcleos da máquina.  Cada tentativa é uma execução MLflow aninhada
+na execução da busca; as métricas de cada segmento de treino são enviadas com
+um único ``log_batch``.
+
+A melhor configuração é reprodutível: a tentativa guarda a sua semente, e o
+treino retomado de checkpoints (``GNNTrainer``) produz os mesmos pesos de um
+treino contínuo.  O comando ``train_gnn.py`` equivalente é impresso e
+registrado em ``best_config.json``.
+
+Uso:
+
+```bash
+python -m ml.hparam_search --graph-path data/graph.json --n-trials 27 \
+  --max-epochs 81 --min-epochs 3 --eta 3 --workers 4 --threads-per-trial 2 \
+  --mlflow-uri http://localhost:5000
+```
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import mlflow
+import numpy as np
+import torch
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
+
+try:
+    from .train_gnn import GNNTrainer, load_dataset
+except ImportError:  # executado como script: ``python hparam_search.py``
+    from train_gnn import GNNTrainer, load_dataset
+
+HIDDEN_CHOICES = (16, 32, 64, 128)
+LR_RANGE = (1e-3, 5e-2)
+FANOUT_CHOICES = ((5, 5), (10, 10), (15, 10), (25, 10))
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def sample_config(rng: np.random.Generator, batch_size: Optional[int], val_fraction: float) -> Dict[str, object]:
+    """Sorteia uma configuração (``lr`` log-uniforme) com a semente de treino da tentativa."""
+    config: Dict[str, object] = {
+        "hidden_channels": int(rng.choice(HIDDEN_CHOICES)),
+        "lr": float(math.exp(rng.uniform(math.log(LR_RANGE[0]), math.log(LR_RANGE[1])))),
+        "batch_size": batch_size,
+        "random_seed": int(rng.integers(2**31 - 1)),
+        "val_fraction": val_fraction,
+    }
+    if batch_size is not None:
+        config["fanouts"] = list(FANOUT_CHOICES[int(rng.integers(len(FANOUT_CHOICES)))])
+    return config
+
+
+class ASHAScheduler:
+    """Degraus do successive halving assíncrono.
+
+    ``rungs[k]`` é o orçamento (épocas acumuladas) do degrau ``k``.  Uma
+    tentativa do degrau ``k`` é promovida quando está entre as
+    ``len(resultados_k) // eta`` melhores e ainda não foi promovida.
+    """
+
+    def __init__(self, min_epochs: int, max_epochs: int, eta: int = 3):
+        if min_epochs < 1 or max_epochs < min_epochs or eta < 2:
+            raise ValueError("é preciso 1 <= min_epochs <= max_epochs e eta >= 2")
+        self.eta = eta
+        self.rungs: List[int] = []
+        budget = min_epochs
+        while budget < max_epochs:
+            self.rungs.append(budget)
+            budget *= eta
+        self.rungs.append(max_epochs)
+        self.results: List[Dict[int, float]] = [{} for _ in self.rungs]
+        self.promoted: List[Set[int]] = [set() for _ in self.rungs]
+
+    def report(self, trial_id: int, rung: int, score: float) -> None:
+        self.results[rung][trial_id] = score
+
+    def promotion(self) -> Optional[Tuple[int, int]]:
+        """``(tentativa, próximo degrau)`` a promover, do degrau mais alto para o mais baixo."""
+        for rung in range(len(self.rungs) - 2, -1, -1):
+            results = self.results[rung]
+            top = sorted(results, key=lambda t: (-results[t], t))[: len(results) // self.eta]
+            for trial_id in top:
+                if trial_id not in self.promoted[rung]:
+                    self.promoted[rung].add(trial_id)
+                    return trial_id, rung + 1
+        return None
+
+    def best(self) -> Tuple[int, int, float]:
+        """``(tentativa, degrau, métrica)`` da melhor tentativa do degrau mais alto alcançado."""
+        for rung in range(len(self.rungs) - 1, -1, -1):
+            if self.results[rung]:
+                trial_id = max(self.results[rung], key=lambda t: (self.results[rung][t], -t))
+                return trial_id, rung, self.results[rung][trial_id]
+        raise ValueError("nenhuma tentativa terminou")
+
+
+@dataclass
+class Trial:
+    trial_id: int
+    config: Dict[str, object]
+    run_id: Optional[str] = None
+    checkpoint: Optional[Dict[str, object]] = None
+
+
+# estado global de cada processo do pool (preenchido por ``_init_worker``)
+_WORKER: Dict[str, object] = {}
+
+
+def _init_worker(data, num_classes: int, threads: int) -> None:
+    torch.set_num_threads(threads)
+    _WORKER.update(data=data, num_classes=num_classes)
+
+
+def _make_trainer(data, num_classes: int, config: Dict[str, object]) -> GNNTrainer:
+    return GNNTrainer(
+        data,
+        num_classes,
+        random_seed=config["random_seed"],
+        hidden_channels=config["hidden_channels"],
+        lr=config["lr"],
+        batch_size=config["batch_size"],
+        fanouts=config.get("fanouts", (10, 10)),
+        val_fraction=config["val_fraction"],
+    )
+
+
+def _run_segment(config: Dict[str, object], checkpoint, epochs: int):
+    """Treina do checkpoint até ``epochs`` épocas; devolve métrica de validação, checkpoint e histórico."""
+    trainer = _make_trainer(_WORKER["data"], _WORKER["num_classes"], config)
+    if checkpoint is not None:
+        trainer.load_state_dict(checkpoint)
+    history = []
+    start = time.perf_counter()
+    while trainer.epoch < epochs:
+        loss, train_acc = trainer.train_epoch()
+        history += [(trainer.epoch, "train_loss", loss), (trainer.epoch, "train_accuracy", train_acc)]
+    score = trainer.evaluate(fresh=True, split="val")
+    history += [(epochs, "val_accuracy", score), (epochs, "segment_seconds", time.perf_counter() - start)]
+    return score, trainer.state_dict(), history
+
+
+def _log_trial(client: MlflowClient, trial: Trial, history, params: bool) -> None:
+    """Envia parâmetros (na primeira vez) e as métricas do segmento com um único ``log_batch``."""
+    timestamp = int(time.time() * 1000)
+    metrics = [Metric(key, float(value), timestamp, step) for step, key, value in history]
+    logged = []
+    if params:
+        logged = [Param(k, json.dumps(v) if isinstance(v, list) else str(v)) for k, v in trial.config.items()]
+    client.log_batch(trial.run_id, metrics=metrics, params=logged)
+
+
+def run_search(
+    data,
+    num_classes: int,
+    n_trials: int = 27,
+    max_epochs: int = 81,
+    min_epochs: int = 3,
+    eta: int = 3,
+    workers: int = 2,
+    threads_per_trial: int = 1,
+    batch_size: Optional[int] = None,
+    seed: int = 0,
+    run_name: str = "gnn_hparam_search",
+    val_fraction: float = 0.2,
+) -> Dict[str, object]:
+    """Executa a busca ASHA e devolve a melhor configuração (com ``epochs`` e métricas).
+
+    As tentativas são comparadas pela acurácia na validação (``val_fraction``
+    dos nós de treino); só a configuração escolhida é avaliada no teste.
+    Deve ser chamada com uma URI de tracking do MLflow já configurada; a busca
+    é a execução pai e cada tentativa uma execução aninhada.
+    """
+    if not 0.0 < val_fraction < 1.0:
+        raise ValueError(f"val_fraction precisa estar em (0, 1) (recebido {val_fraction})")
+    scheduler = ASHAScheduler(min_epochs, max_epochs, eta)
+    rng = np.random.default_rng(seed)
+    trials: List[Trial] = []
+    client = MlflowClient()
+    saved_env = {var: os.environ.get(var) for var in THREAD_ENV_VARS}
+    os.environ.update({var: str(threads_per_trial) for var in THREAD_ENV_VARS})
+    try:
+        with mlflow.start_run(run_name=run_name) as parent:
+            mlflow.log_params({
+                "n_trials": n_trials, "max_epochs": max_epochs, "min_epochs": min_epochs, "eta": eta,
+                "workers": workers, "threads_per_trial": threads_per_trial, "seed": seed,
+                "batch_size": "full" if batch_size is None else batch_size, "val_fraction": val_fraction,
+            })
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(data, num_classes, threads_per_trial),
+            )
+            running = {}
+
+            def submit() -> bool:
+                job = scheduler.promotion()
+                if job is None and len(trials) < n_trials:
+                    trial = Trial(len(trials), sample_config(rng, batch_size, val_fraction))
+                    trial.run_id = client.create_run(
+                        parent.info.experiment_id,
+                        tags={"mlflow.parentRunId": parent.info.run_id, "mlflow.runName": f"trial_{trial.trial_id:03d}"},
+                    ).info.run_id
+                    trials.append(trial)
+                    job = (trial.trial_id, 0)
+                if job is None:
+                    return False
+                trial = trials[job[0]]
+                future = pool.submit(_run_segment, trial.config, trial.checkpoint, scheduler.rungs[job[1]])
+                running[future] = job
+                return True
+
+            with pool:
+                while len(running) < workers and submit():
+                    pass
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        trial_id, rung = running.pop(future)
+                        trial = trials[trial_id]
+                        score, trial.checkpoint, history = future.result()
+                        scheduler.report(trial_id, rung, score)
+                        _log_trial(client, trial, history, params=rung == 0)
+                        print(f"tentativa {trial_id:03d} degrau {rung} ({scheduler.rungs[rung]} épocas): val {score:.4f}")
+                    while len(running) < workers and submit():
+                        pass
+            for trial in trials:
+                reached = max(r for r in range(len(scheduler.rungs)) if trial.trial_id in scheduler.results[r])
+                client.log_batch(trial.run_id, params=[Param("epochs", str(scheduler.rungs[reached]))])
+                client.set_terminated(trial.run_id)
+            best_id, best_rung, best_score = scheduler.best()
+            # o teste é avaliado uma única vez, no checkpoint escolhido pela validação
+            trainer = _make_trainer(data, num_classes, trials[best_id].config)
+            trainer.load_state_dict(trials[best_id].checkpoint)
+            test_score = trainer.evaluate(fresh=True)
+            best = {**trials[best_id].config, "epochs": scheduler.rungs[best_rung], "val_accuracy": best_score,
+                    "test_accuracy": test_score, "trial_id": best_id, "trial_run_id": trials[best_id].run_id}
+            mlflow.log_metrics({"best_val_accuracy": best_score, "best_test_accuracy": test_score})
+            mlflow.log_dict({**best, "command": reproduce_command(best)}, "best_config.json")
+    finally:
+        for var, value in saved_env.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+    return best
+
+
+def reproduce_command(best: Dict[str, object], graph_path: str = "data/graph.json") -> str:
+    """Linha de comando de ``train_gnn.py`` que treina novamente a melhor configuração."""
+    parts = [
+        "python ml/train_gnn.py", f"--graph-path {graph_path}",
+        f"--hidden-channels {best['hidden_channels']}", f"--lr {best['lr']!r}",
+        f"--epochs {best['epochs']}", f"--random-seed {best['random_seed']}",
+    ]
+    if best.get("val_fraction"):
+        parts.append(f"--val-fraction {best['val_fraction']!r}")
+    if best.get("batch_size") is not None:
+        parts += [f"--batch-size {best['batch_size']}", "--fanouts " + " ".join(str(f) for f in best["fanouts"])]
+    return " ".join(parts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Busca de hiperparâmetros ASHA para o GraphSAGE")
+    parser.add_argument("--graph-path", type=str, required=True, help="Grafo: JSON ou CSR .npz")
+    parser.add_argument("--n-trials", type=int, default=27, help="Número máximo de configurações sorteadas")
+    parser.add_argument("--max-epochs", type=int, default=81, help="Orçamento do último degrau")
+    parser.add_argument("--min-epochs", type=int, default=3, help="Orçamento do primeiro degrau")
+    parser.add_argument("--eta", type=int, default=3, help="Fator de redução entre degraus")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Tentativas simultâneas")
+    parser.add_argument("--threads-per-trial", type=int, default=1, help="Threads de CPU por tentativa")
+    parser.add_argument("--batch-size", type=int, default=None, help="Mini-batch (também sorteia fanouts)")
+    parser.add_argument("--seed", type=int, default=0, help="Semente da busca")
+    parser.add_argument(
+        "--val-fraction", type=float, default=0.2, help="Fração dos nós de treino usada para comparar tentativas"
+    )
+    parser.add_argument("--feature-seed", type=int, default=0, help="Semente das features aleatórias dos nós")
+    parser.add_argument("--dataset-cache-dir", type=str, default=".cache/gnn_datasets", help="Cache do dataset")
+    parser.add_argument("--run-name", type=str, default="gnn_hparam_search", help="Nome da execução do MLflow")
+    parser.add_argument("--mlflow-uri", type=str, default="http://127.0.0.1:5000", help="URI do tracking do MLflow")
+    args = parser.parse_args()
+    mlflow.set_tracking_uri(args.mlflow_uri)
+    data, categories = load_dataset(args.graph_path, args.dataset_cache_dir, feature_seed=args.feature_seed)
+    best = run_search(
+        data,
+        len(categories),
+        n_trials=args.n_trials,
+        max_epochs=args.max_epochs,
+        min_epochs=args.min_epochs,
+        eta=args.eta,
+        workers=args.workers,
+        threads_per_trial=args.threads_per_trial,
+        batch_size=args.batch_size,
+        seed=args.seed,
+        run_name=args.run_name,
+        val_fraction=args.val_fraction,
+    )
+    print(json.dumps(best, indent=2))
+    print(reproduce_command(best, args.graph_path) + f" --feature-seed {args.feature_seed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+neighbor_sampler.py
+-------------------
+
+Amostragem de vizinhança k-hop para treinar o GraphSAGE em mini-batches.  Os
+vizinhos de entrada de cada nó (origens das arestas que chegam nele, a direção
+em que ``SAGEConv`` agrega mensagens) ficam em um CSR NumPy; para cada lote de
+nós semente, cada camada sorteia até ``fanouts[i]`` vizinhos dos nós da
+fronteira anterior (``-1`` mantém todos).  O subgrafo resultante tem os nós
+semente nas primeiras posições, de modo que ``model(x, edge_index)[:batch_size]``
+são as saídas do lote.
+
+A memória de cada lote depende só de ``batch_size`` e dos fanouts
+(no máximo ``batch_size * (1 + f1 + f1*f2 + ...)`` nós), não do tamanho do
+grafo.  O amostrador é um ``collate_fn`` serializável; com
+``torch.utils.data.DataLoader(num_workers > 0)`` cada worker amostra lotes em
+paralelo com a sua própria semente (derivada de ``torch.initial_seed()``).
+
+Exemplo:
+
+```python
+from ml.neighbor_sampler import NeighborSampler, neighbor_loader
+
+sampler = NeighborSampler(data, fanouts=[10, 10])
+for batch in neighbor_loader(sampler, train_idx, batch_size=512, shuffle=True, num_workers=4):
+    out = model(batch.x, batch.edge_index)[: batch.batch_size]
+```
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+import torch
+
+try:
+    from torch_geometric.data import Data
+except ImportError:
+    raise ImportError(
+        "PyTorch Geometric não está instalado. Instale com `pip install torch-geometric` "
+        "e consulte a documentação https://pytorch-geometric.readthedocs.io para mais detalhes."
+    )
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatena ``arange(s, s + c)`` para cada par sem laço Python."""
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + np.arange(total, dtype=np.int64) - offsets
+
+
+class NeighborSampler:
+    """Amostrador de vizinhança k-hop sobre um CSR de vizinhos de entrada.
+
+    Args:
+        data: grafo com ``x``, ``y`` e ``edge_index`` (``[origem, destino]``).
+        fanouts: vizinhos sorteados por nó em cada camada, da semente para
+            fora (``-1`` usa todos os vizinhos).
+        seed: semente base; ``None`` usa ``torch.initial_seed()``, que o
+            ``DataLoader`` torna distinta em cada worker.
+    """
+
+    def __init__(self, data: Data, fanouts: Sequence[int], seed: Optional[int] = None):
+        self.x = data.x
+        self.y = data.y
+        self.fanouts = [int(f) for f in fanouts]
+        self.seed = seed
+        self._rng: Optional[np.random.Generator] = None
+        src, dst = data.edge_index.cpu().numpy().astype(np.int64)
+        order = np.argsort(dst, kind="stable")
+        self.indptr = np.zeros(data.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=data.num_nodes), out=self.indptr[1:])
+        self.indices = src[order]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_rng"] = None
+        return state
+
+    def reset(self) -> None:
+        """Reinicia o gerador (a próxima amostragem recomeça da semente)."""
+        self._rng = None
+
+    @property
+    def rng(self) -> np.random.Generator:
+        if self._rng is None:
+            self._rng = np.random.default_rng(self.seed if self.seed is not None else torch.initial_seed())
+        return self._rng
+
+    def _sample_layer(self, frontier: np.ndarray, fanout: int):
+        """Sorteia até ``fanout`` vizinhos de entrada de cada nó da fronteira."""
+        starts = self.indptr[frontier]
+        deg = self.indptr[frontier + 1] - starts
+        if fanout < 0:
+            full = np.ones(len(frontier), dtype=bool)
+        else:
+            full = deg <= fanout
+        # nós com poucos vizinhos: todos; demais: ``fanout`` posições sorteadas (sem repetição no resultado)
+        pos = _ranges(starts[full], deg[full])
+        dst = np.repeat(frontier[full], deg[full])
+        many = ~full
+        if many.any():
+            n_many = int(many.sum())
+            picks = starts[many, None] + (self.rng.random((n_many, fanout)) * deg[many, None]).astype(np.int64)
+            picks = np.unique(picks)
+            owner = np.searchsorted(self.indptr, picks, side="right") - 1
+            pos = np.concatenate([pos, picks])
+            dst = np.concatenate([dst, owner])
+        return self.indices[pos], dst
+
+    def sample(self, seeds: np.ndarray):
+        """Nós do subgrafo (sementes primeiro) e arestas amostradas ``[origem, destino]`` globais."""
+        seeds = np.asarray(seeds, dtype=np.int64)
+        n_id = [seeds]
+        seen = np.unique(seeds)
+        frontier = seeds
+        src_parts, dst_parts = [], []
+        for fanout in self.fanouts:
+            if not len(frontier):
+                break
+            src, dst = self._sample_layer(frontier, fanout)
+            src_parts.append(src)
+            dst_parts.append(dst)
+            new = np.unique(src)
+            new = new[~np.isin(new, seen, assume_unique=True)]
+            seen = np.union1d(seen, new)
+            n_id.append(new)
+            frontier = new
+        n_id = np.concatenate(n_id)
+        src = np.concatenate(src_parts) if src_parts else np.empty(0, dtype=np.int64)
+        dst = np.concatenate(dst_parts) if dst_parts else np.empty(0, dtype=np.int64)
+        return n_id, src, dst
+
+    def __call__(self, batch) -> Data:
+        """``collate_fn``: converte índices semente em um subgrafo ``Data`` local."""
+        seeds = np.asarray([int(i) for i in batch], dtype=np.int64)
+        n_id, src, dst = self.sample(seeds)
+        # renumera os ids globais para posições em ``n_id``
+        order = np.argsort(n_id, kind="stable")
+
+        def local(ids: np.ndarray) -> np.ndarray:
+            return order[np.searchsorted(n_id, ids, sorter=order)]
+
+        edge_index = np.stack([local(src), local(dst)]) if len(src) else np.empty((2, 0), dtype=np.int64)
+        n_id_t = torch.from_numpy(n_id)
+        return Data(
+            x=self.x[n_id_t],
+            edge_index=torch.from_numpy(edge_index.astype(np.int64)),
+            y=self.y[n_id_t[: len(seeds)]],
+            n_id=n_id_t,
+            batch_size=len(seeds),
+        )
+
+
+def neighbor_loader(
+    sampler: NeighborSampler,
+    node_idx,
+    batch_size: int,
+    shuffle: bool = False,
+    num_workers: int = 0,
+    seed: Optional[int] = None,
+) -> torch.utils.data.DataLoader:
+    """``DataLoader`` de lotes amostrados sobre ``node_idx`` (workers amostram em paralelo)."""
+    generator = None if seed is None else torch.Generator().manual_seed(seed)
+    return torch.utils.data.DataLoader(
+        np.asarray(node_idx, dtype=np.int64),
+        batch_size=batch_size,
+        shuffle=shuffle,
+        collate_fn=sampler,
+        num_workers=num_workers,
+        persistent_workers=num_workers > 0,
+        generator=generator,
+    )
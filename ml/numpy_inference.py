@@ -0,0 +1,138 @@
+"""
+numpy_inference.py
+------------------
+
+Inferência do ``GraphSAGEModel`` sem PyTorch.  O exportador grava os pesos das
+duas camadas ``SAGEConv`` (agregação ``mean``, ``root_weight=True``, sem
+normalização) em um ``.npz`` compacto; ``NumpyGraphSAGE`` refaz a passada
+direta com NumPy e uma matriz esparsa SciPy de agregação:
+
+    h   = relu(A @ x @ W1_l.T + b1 + x @ W1_r.T)
+    out = A @ h @ W2_l.T + b2 + h @ W2_r.T
+
+em que ``A`` é a adjacência de entrada normalizada por linha (média sobre as
+arestas que chegam em cada nó, como o ``SAGEConv``).  O módulo não importa
+``torch`` nem ``mlflow``: serviços que só fazem inferência sobem em uma fração
+do tempo e da memória.  O exportador apenas lê ``state_dict()`` do modelo.
+
+Uso:
+
+```bash
+# converte um modelo registrado no MLflow
+python -m ml.numpy_inference --model-uri runs:/<run_id>/model --output graphsage.npz
+```
+
+```python
+from ml.numpy_inference import NumpyGraphSAGE
+
+model = NumpyGraphSAGE.load("graphsage.npz")
+logits = model(x, edge_index)
+```
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+try:
+    import scipy.sparse as sp
+except ImportError:
+    raise ImportError("SciPy não está instalado. Instale com `pip install scipy` para usar a inferência NumPy.")
+
+FORMAT_VERSION = 1
+LAYERS = ("conv1", "conv2")
+
+
+def export_npz(model, path: Union[str, Path], categories: Optional[List[str]] = None) -> Path:
+    """Grava os pesos das camadas ``SAGEConv`` de ``model`` em ``path`` (``.npz``)."""
+    state = {k: v.detach().cpu().numpy().astype(np.float32) for k, v in model.state_dict().items()}
+    arrays: Dict[str, np.ndarray] = {}
+    for layer in LAYERS:
+        arrays[f"{layer}.lin_l.weight"] = state[f"{layer}.lin_l.weight"]
+        arrays[f"{layer}.lin_l.bias"] = state[f"{layer}.lin_l.bias"]
+        arrays[f"{layer}.lin_r.weight"] = state[f"{layer}.lin_r.weight"]
+    meta = {"format_version": FORMAT_VERSION, "categories": list(categories or [])}
+    np.savez(path, meta=np.asarray(json.dumps(meta)), **arrays)
+    return Path(path)
+
+
+def mean_adjacency(edge_index: np.ndarray, num_nodes: int) -> sp.csr_matrix:
+    """Matriz ``(N, N)`` com ``A[v, u] = 1/grau_entrada(v)`` para cada aresta ``u -> v``.
+
+    Arestas repetidas contam várias vezes, como na agregação do PyG; nós sem
+    arestas de entrada ficam com linha nula.
+    """
+    src, dst = np.asarray(edge_index, dtype=np.int64)
+    deg = np.bincount(dst, minlength=num_nodes).astype(np.float32)
+    weights = 1.0 / deg[dst] if len(dst) else np.empty(0, dtype=np.float32)
+    return sp.csr_matrix((weights.astype(np.float32), (dst, src)), shape=(num_nodes, num_nodes))
+
+
+class NumpyGraphSAGE:
+    """Passada direta do GraphSAGE de duas camadas com NumPy/SciPy."""
+
+    def __init__(self, weights: Dict[str, np.ndarray], categories: Optional[List[str]] = None):
+        self.weights = weights
+        self.categories = list(categories or [])
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "NumpyGraphSAGE":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("format_version") != FORMAT_VERSION:
+                raise ValueError(f"formato de {path} não suportado: {meta.get('format_version')}")
+            weights = {k: np.ascontiguousarray(data[k]) for k in data.files if k != "meta"}
+        return cls(weights, meta.get("categories"))
+
+    @property
+    def in_channels(self) -> int:
+        return int(self.weights["conv1.lin_r.weight"].shape[1])
+
+    def _conv(self, layer: str, x: np.ndarray, adj: sp.csr_matrix) -> np.ndarray:
+        w_l = self.weights[f"{layer}.lin_l.weight"]
+        w_r = self.weights[f"{layer}.lin_r.weight"]
+        # projeta antes de agregar quando a saída é menor que a entrada (menos trabalho na esparsa)
+        if w_l.shape[0] < w_l.shape[1]:
+            agg = adj @ (x @ w_l.T)
+        else:
+            agg = (adj @ x) @ w_l.T
+        return np.asarray(agg, dtype=np.float32) + self.weights[f"{layer}.lin_l.bias"] + x @ w_r.T
+
+    def embed(self, x: np.ndarray, edge_index=None, adj: Optional[sp.csr_matrix] = None) -> Dict[str, np.ndarray]:
+        """``hidden`` e ``output`` de todos os nós (como ``GraphSAGEModel.embed``)."""
+        x = np.asarray(x, dtype=np.float32)
+        if adj is None:
+            if edge_index is None:
+                edge_index = np.empty((2, 0), dtype=np.int64)
+            adj = mean_adjacency(edge_index, len(x))
+        hidden = np.maximum(self._conv("conv1", x, adj), 0.0)
+        return {"hidden": hidden, "output": self._conv("conv2", hidden, adj)}
+
+    def __call__(self, x: np.ndarray, edge_index=None, adj: Optional[sp.csr_matrix] = None) -> np.ndarray:
+        return self.embed(x, edge_index, adj)["output"]
+
+
+def main() -> None:
+    import mlflow
+
+    parser = argparse.ArgumentParser(description="Exporta um GraphSAGE do MLflow para o formato .npz sem torch")
+    parser.add_argument("--model-uri", type=str, required=True, help="URI do modelo no MLflow")
+    parser.add_argument("--output", type=str, default="graphsage.npz", help="Arquivo .npz de saída")
+    parser.add_argument("--category-mapping", type=str, default=None, help="JSON com a lista de categorias")
+    parser.add_argument("--mlflow-uri", type=str, default=None, help="URI do tracking do MLflow")
+    args = parser.parse_args()
+    if args.mlflow_uri:
+        mlflow.set_tracking_uri(args.mlflow_uri)
+    categories = None
+    if args.category_mapping:
+        with open(args.category_mapping, "r", encoding="utf-8") as f:
+            categories = json.load(f)
+    path = export_npz(mlflow.pytorch.load_model(args.model_uri), args.output, categories)
+    print(f"pesos gravados em {path} ({path.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+subgraph.py
+-----------
+
+Extração do subgrafo k-hop de nós semente para inferência do GraphSAGE sem
+processar o grafo inteiro.  A saída de uma camada ``SAGEConv`` em ``v`` só
+depende de ``v`` e das origens das arestas que chegam em ``v``; com ``k``
+camadas basta o grafo computacional formado pelas arestas de entrada dos nós a
+distância ``< k`` de cada semente.  Rodar o modelo nesse subgrafo dá, nas
+sementes, exatamente a mesma saída que no grafo completo.
+
+As arestas ficam em um CSR NumPy de vizinhos de entrada e cada subgrafo é
+guardado como o vetor de posições das suas arestas nesse CSR (arestas
+repetidas do grafo continuam contando várias vezes, como no PyG).  Os
+subgrafos por semente ficam em um cache LRU limitado pelo total de arestas
+guardadas; uma requisição com várias sementes une os subgrafos de cada uma.
+O módulo não importa ``torch``.
+
+Exemplo:
+
+```python
+from ml.subgraph import KHopExtractor
+
+extractor = KHopExtractor(edge_index, num_nodes, num_hops=2, max_cached_edges=1_000_000)
+nodes, local_edge_index, seed_pos = extractor.subgraph(rows)
+logits = model(features[nodes], local_edge_index)[seed_pos]
+```
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatena ``arange(s, s + c)`` para cada par sem laço Python."""
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + np.arange(total, dtype=np.int64) - offsets
+
+
+class KHopExtractor:
+    """Subgrafos k-hop (arestas de entrada) com cache LRU por nó semente.
+
+    Args:
+        edge_index: arestas ``[origem, destino]`` em linhas ``0..num_nodes-1``.
+        num_nodes: número de nós do grafo.
+        num_hops: camadas do modelo (profundidade do subgrafo).
+        max_cached_edges: total de arestas guardadas no cache (``0`` desativa);
+            cada entrada conta pelo menos 1, de modo que sementes isoladas
+            (subgrafo sem arestas) também limitam e saem do cache.
+    """
+
+    def __init__(self, edge_index: np.ndarray, num_nodes: int, num_hops: int = 2, max_cached_edges: int = 1_000_000):
+        src, dst = np.asarray(edge_index, dtype=np.int64)
+        order = np.argsort(dst, kind="stable")
+        self.num_nodes = int(num_nodes)
+        self.num_hops = int(num_hops)
+        self.max_cached_edges = int(max_cached_edges)
+        self.indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=self.num_nodes), out=self.indptr[1:])
+        self.src = src[order]
+        self.dst = dst[order]
+        self._cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._cached_edges = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _extract(self, seed: int) -> np.ndarray:
+        """Posições no CSR das arestas do grafo computacional de ``seed``."""
+        frontier = np.array([seed], dtype=np.int64)
+        visited = frontier
+        parts = []
+        for _ in range(self.num_hops):
+            if not len(frontier):
+                break
+            ids = _ranges(self.indptr[frontier], self.indptr[frontier + 1] - self.indptr[frontier])
+            parts.append(ids)
+            # nós já visitados tiveram as arestas de entrada incluídas em um salto anterior
+            frontier = np.setdiff1d(self.src[ids], visited)
+            visited = np.union1d(visited, frontier)
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def edge_ids(self, seed: int) -> np.ndarray:
+        """Arestas do subgrafo de ``seed``, do cache quando possível."""
+        seed = int(seed)
+        with self._lock:
+            cached = self._cache.get(seed)
+            if cached is not None:
+                self._cache.move_to_end(seed)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        ids = self._extract(seed)
+        if self.max_cached_edges <= 0 or len(ids) > self.max_cached_edges:
+            return ids
+        with self._lock:
+            if seed not in self._cache:
+                self._cache[seed] = ids
+                self._cached_edges += max(1, len(ids))
+            while self._cached_edges > self.max_cached_edges:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_edges -= max(1, len(evicted))
+        return ids
+
+    def subgraph(self, seeds) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """União dos subgrafos de ``seeds`` (linhas).
+
+        Returns:
+            ``nodes`` (linhas globais, ordenadas), ``edge_index`` local em
+            posições de ``nodes`` e a posição de cada semente em ``nodes``.
+        """
+        seeds = np.asarray(seeds, dtype=np.int64)
+        if len(seeds) and (seeds.min() < 0 or seeds.max() >= self.num_nodes):
+            raise IndexError("linha semente fora do grafo")
+        parts = [self.edge_ids(s) for s in np.unique(seeds)]
+        ids = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        src, dst = self.src[ids], self.dst[ids]
+        nodes = np.unique(np.concatenate([seeds, src, dst]))
+        edge_index = np.stack([np.searchsorted(nodes, src), np.searchsorted(nodes, dst)])
+        return nodes, edge_index, np.searchsorted(nodes, seeds)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._cache),
+                "cached_edges": self._cached_edges,
+                "max_cached_edges": self.max_cached_edges,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._cached_edges = 0
@@ -19,21 +19,36 @@ Uso:
         --mlflow-uri http://localhost:5000
 
 O script espera um arquivo JSON com nós e arestas no formato gerado por
-`generate_graph.py`.  Caso você ainda não tenha features para os nós, o
-script irá gerar vetores de atributos aleatórios e codificações one-hot das
-categorias.  O objetivo supervisionado de exemplo é classificar o tipo de nó
-(serviço, data_store, etc.), mas você pode adaptar para tarefas de
-recomendação, predição de links, etc.
+`generate_graph.py`.  Caso você ainda não tenha features para os nós, o script
+irá gerar vetores de atributos aleatórios (semente ``--feature-seed``) e
+codificações one-hot das categorias.  O grafo também pode ser lido no formato
+CSR ``.npz`` de ``sim/graph_csr.py``; os tensores construídos ficam em cache
+em disco (``--dataset-cache-dir``), indexados pelo hash do arquivo e das
+configurações de features.  Para grafos grandes, ``--batch-size`` treina em
+mini-batches com vizinhança k-hop amostrada (``--fanouts``, veja
+``neighbor_sampler.py``) e ``--num-workers`` paraleliza a amostragem.  Ao
+final do treino os embeddings de todos os nós são gravados no store versionado
+de ``embedding_store.py`` (``--embedding-dir``) para uso pelos serviços.  O
+objetivo supervisionado de exemplo é classificar o tipo de nó (serviço,
+data_store, etc.), mas você pode adaptar para tarefas de recomendação,
+predição de links, etc.
 """
 
 import argparse
+import copy
+import hashlib
 import json
 import os
+import tempfile
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import mlflow
 import numpy as np
+from mlflow.entities import Metric
+from mlflow.tracking import MlflowClient
 import torch
 import torch.nn.functional as F
 
@@ -46,48 +61,129 @@ except ImportError:
         "e consulte a documentação https://pytorch-geometric.readthedocs.io para mais detalhes."
     )
 
+try:
+    from .embedding_store import EmbeddingStore, write_embeddings
+    from .neighbor_sampler import NeighborSampler, neighbor_loader
+    from .numpy_inference import export_npz
+except ImportError:  # executado como script: ``python train_gnn.py``
+    from embedding_store import EmbeddingStore, write_embeddings
+    from neighbor_sampler import NeighborSampler, neighbor_loader
+    from numpy_inference import export_npz
+
+GraphArrays = Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]
+
+# Incrementar quando a construção das features mudar, invalidando caches antigos
+DATASET_CACHE_VERSION = 1
+
 
 def load_graph(graph_path: str) -> Dict[str, List[Dict[str, object]]]:
     with open(graph_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
-def build_dataset(graph: Dict[str, List[Dict[str, object]]]):
-    """Constrói tensores de features e labels a partir do grafo.
-
-    Para cada nó, gera features combinando um vetor aleatório e uma codificação
-    one‑hot da categoria.  O label é o índice da categoria.
-    """
+def graph_arrays_from_json(graph: Dict[str, List[Dict[str, object]]]) -> GraphArrays:
+    """Converte o grafo JSON em ``(categorias, código da categoria por nó, origens, destinos)``."""
     nodes = graph["nodes"]
     edges = graph["edges"]
     # mapeia categoria para índice
     categories = sorted(set(n["category"] for n in nodes))
     cat_to_idx = {cat: i for i, cat in enumerate(categories)}
-    num_nodes = len(nodes)
+    row = {n["id"]: i for i, n in enumerate(nodes)}
+    node_category = np.fromiter((cat_to_idx[n["category"]] for n in nodes), dtype=np.int64, count=len(nodes))
+    src = np.fromiter((row[e["source"]] for e in edges), dtype=np.int64, count=len(edges))
+    dst = np.fromiter((row[e["target"]] for e in edges), dtype=np.int64, count=len(edges))
+    return categories, node_category, src, dst
+
+
+def load_graph_arrays(graph_path: str) -> GraphArrays:
+    """Lê o grafo em JSON ou no formato CSR ``.npz`` de ``sim/graph_csr.py``."""
+    if str(graph_path).endswith(".npz"):
+        with np.load(graph_path, allow_pickle=False) as data:
+            indptr = data["indptr"]
+            src = np.repeat(np.arange(len(indptr) - 1, dtype=np.int64), np.diff(indptr))
+            return data["categories"].tolist(), data["node_category"].astype(np.int64), src, data["indices"].astype(np.int64)
+    return graph_arrays_from_json(load_graph(graph_path))
+
+
+def build_dataset_from_arrays(
+    categories: List[str],
+    node_category: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    rand_dim: int = 16,
+    feature_seed: Optional[int] = None,
+):
+    """Constrói o ``Data`` (features aleatórias + one-hot, labels e arestas nos dois sentidos)."""
+    num_nodes = len(node_category)
     num_cats = len(categories)
-    # gera features aleatórias (dim=16)
-    rand_dim = 16
-    x_rand = np.random.randn(num_nodes, rand_dim).astype(np.float32)
-    # gera one-hot
-    x_onehot = np.zeros((num_nodes, num_cats), dtype=np.float32)
-    for i, n in enumerate(nodes):
-        cat_idx = cat_to_idx[n["category"]]
-        x_onehot[i, cat_idx] = 1.0
-    # concatena
+    rng = np.random.default_rng(feature_seed)
+    x_rand = rng.standard_normal((num_nodes, rand_dim), dtype=np.float32)
+    x_onehot = np.eye(num_cats, dtype=np.float32)[node_category]
     x = np.concatenate([x_rand, x_onehot], axis=1)
-    # labels
-    y = np.array([cat_to_idx[n["category"]] for n in nodes], dtype=np.int64)
-    # edge_index
-    # edges são direcionados; vamos converter para array 2xE
-    edge_list = []
-    for e in edges:
-        source = e["source"] - 1  # ids começam em 1
-        target = e["target"] - 1
-        edge_list.append((source, target))
-        # adiciona também a aresta reversa para tornar não direcionado
-        edge_list.append((target, source))
-    edge_index = torch.tensor(edge_list, dtype=torch.long).t().contiguous()
-    data = Data(x=torch.tensor(x, dtype=torch.float32), edge_index=edge_index, y=torch.tensor(y))
+    # edges são direcionados; adiciona também a aresta reversa para tornar não direcionado
+    edge_index = np.stack([np.concatenate([src, dst]), np.concatenate([dst, src])])
+    data = Data(
+        x=torch.from_numpy(x),
+        edge_index=torch.from_numpy(edge_index.astype(np.int64)),
+        y=torch.from_numpy(node_category.astype(np.int64)),
+    )
+    return data, categories
+
+
+def build_dataset(graph: Dict[str, List[Dict[str, object]]], rand_dim: int = 16, feature_seed: Optional[int] = None):
+    """Constrói tensores de features e labels a partir do grafo.
+
+    Para cada nó, gera features combinando um vetor aleatório e uma codificação
+    one‑hot da categoria.  O label é o índice da categoria.
+    """
+    return build_dataset_from_arrays(*graph_arrays_from_json(graph), rand_dim=rand_dim, feature_seed=feature_seed)
+
+
+def load_node_ids(graph_path: str) -> np.ndarray:
+    """Ids dos nós na ordem das linhas de ``x`` (JSON ou CSR ``.npz``)."""
+    if str(graph_path).endswith(".npz"):
+        with np.load(graph_path, allow_pickle=False) as data:
+            return data["nodes"]
+    return np.asarray([n["id"] for n in load_graph(graph_path)["nodes"]])
+
+
+def dataset_cache_key(graph_path: str, rand_dim: int, feature_seed: int) -> str:
+    """Resumo do arquivo do grafo e das configurações de features."""
+    digest = hashlib.sha256()
+    with open(graph_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    settings = {"version": DATASET_CACHE_VERSION, "rand_dim": rand_dim, "feature_seed": feature_seed}
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_dataset(
+    graph_path: str,
+    cache_dir: Optional[str] = None,
+    rand_dim: int = 16,
+    feature_seed: int = 0,
+):
+    """Carrega o ``Data`` do cache em disco ou o constrói e grava.
+
+    A chave combina o hash do arquivo do grafo (JSON ou ``.npz``) com as
+    configurações de features, de modo que execuções repetidas pulam todo o
+    pré-processamento; ``cache_dir=None`` desativa o cache.
+    """
+    path = None
+    if cache_dir is not None:
+        path = Path(cache_dir) / f"{dataset_cache_key(graph_path, rand_dim, feature_seed)}.pt"
+        if path.exists():
+            cached = torch.load(path, weights_only=True)
+            return Data(x=cached["x"], edge_index=cached["edge_index"], y=cached["y"]), cached["categories"]
+    data, categories = build_dataset_from_arrays(
+        *load_graph_arrays(graph_path), rand_dim=rand_dim, feature_seed=feature_seed
+    )
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        torch.save({"x": data.x, "edge_index": data.edge_index, "y": data.y, "categories": categories}, tmp)
+        os.replace(tmp, path)
     return data, categories
 
 
@@ -103,6 +199,228 @@ class GraphSAGEModel(torch.nn.Module):
         x = self.conv2(x, edge_index)
         return x
 
+    def embed(self, x, edge_index) -> Dict[str, torch.Tensor]:
+        """Embeddings ``hidden`` (primeira camada após ReLU) e ``output`` (camada final)."""
+        hidden = F.relu(self.conv1(x, edge_index))
+        return {"hidden": hidden, "output": self.conv2(hidden, edge_index)}
+
+
+class MetricBuffer:
+    """Acumula métricas e as envia ao MLflow em lotes com ``log_batch``.
+
+    Cada ``log_metric`` é uma ida ao servidor de tracking; o buffer junta as
+    métricas de várias épocas e as grava com uma chamada por lote (no máximo
+    ``MAX_BATCH`` métricas, o limite da API).
+    """
+
+    MAX_BATCH = 1000
+
+    def __init__(self, run_id: str, client: Optional[MlflowClient] = None):
+        self.run_id = run_id
+        self.client = client or MlflowClient()
+        self.pending: List[Metric] = []
+
+    def add(self, metrics: Dict[str, float], step: int) -> None:
+        timestamp = int(time.time() * 1000)
+        self.pending.extend(Metric(key, float(value), timestamp, step) for key, value in metrics.items())
+
+    def flush(self) -> None:
+        for start in range(0, len(self.pending), self.MAX_BATCH):
+            self.client.log_batch(self.run_id, metrics=self.pending[start : start + self.MAX_BATCH])
+        self.pending = []
+
+
+class PhaseTimer:
+    """Tempo acumulado por fase do treino (``with timer.phase("train"): ...``)."""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+
+    def breakdown(self, epochs: int) -> Dict[str, Dict[str, float]]:
+        """Total, média por época e fração do tempo de cada fase."""
+        total = sum(self.totals.values()) or 1.0
+        return {
+            name: {"total_s": t, "per_epoch_ms": 1000.0 * t / max(epochs, 1), "share": t / total}
+            for name, t in self.totals.items()
+        }
+
+
+def format_breakdown(breakdown: Dict[str, Dict[str, float]]) -> str:
+    """Tabela de texto do ``PhaseTimer.breakdown``."""
+    lines = [f"{'fase':<10} {'total (s)':>10} {'ms/época':>10} {'fração':>8}"]
+    for name, row in breakdown.items():
+        lines.append(f"{name:<10} {row['total_s']:>10.3f} {row['per_epoch_ms']:>10.2f} {row['share']:>8.1%}")
+    return "\n".join(lines)
+
+
+def _train_mode_is_eval_mode(model: torch.nn.Module) -> bool:
+    """Sem dropout/batch norm as saídas de ``train()`` e ``eval()`` coincidem."""
+    return not any(
+        isinstance(m, (torch.nn.modules.dropout._DropoutNd, torch.nn.modules.batchnorm._NormBase))
+        for m in model.modules()
+    )
+
+
+@torch.no_grad()
+def compute_embeddings(model: GraphSAGEModel, data: Data) -> Dict[str, np.ndarray]:
+    """Embeddings de todos os nós em uma única passada sobre o grafo."""
+    model.eval()
+    device = next(model.parameters()).device
+    layers = model.embed(data.x.to(device), data.edge_index.to(device))
+    return {name: values.cpu().numpy().astype(np.float32) for name, values in layers.items()}
+
+
+def export_embeddings(
+    model: GraphSAGEModel,
+    data: Data,
+    node_ids: np.ndarray,
+    embedding_dir: str,
+    version: str,
+    meta: Optional[Dict[str, object]] = None,
+) -> EmbeddingStore:
+    """Materializa os embeddings em ``embedding_dir/version`` e publica a versão.
+
+    O grafo de origem (features e arestas) é guardado junto, permitindo
+    atualizações incrementais (``embedding_refresh.py``).  Dentro de uma
+    execução ativa do MLflow, a versão também é registrada como artefato em
+    ``embeddings/<version>``.
+    """
+    graph = (data.x.cpu().numpy(), data.edge_index.cpu().numpy())
+    store = write_embeddings(embedding_dir, version, node_ids, compute_embeddings(model, data), meta, graph=graph)
+    if mlflow.active_run() is not None:
+        mlflow.log_artifacts(str(store.path), artifact_path=f"embeddings/{version}")
+    return store
+
+
+class GNNTrainer:
+    """Estado de treino do GraphSAGE (modelo, otimizador, divisão treino/validação/teste e lotes).
+
+    ``val_fraction`` separa essa fração dos nós de treino como validação
+    (``evaluate(split="val")``), para escolher hiperparâmetros sem olhar o
+    teste; os nós de teste são os mesmos com ou sem validação.  Avança uma época por vez e pode ser salvo/restaurado com
+    ``state_dict``/``load_state_dict`` — inclusive os estados aleatórios dos
+    lotes com ``num_workers=0`` — de modo que retomar um treino de um checkpoint
+    produz os mesmos pesos de um treino contínuo com a mesma semente.
+    """
+
+    def __init__(
+        self,
+        data: Data,
+        num_classes: int,
+        random_seed: int = 42,
+        hidden_channels: int = 32,
+        lr: float = 0.01,
+        batch_size: Optional[int] = None,
+        fanouts: Sequence[int] = (10, 10),
+        num_workers: int = 0,
+        timer: Optional[PhaseTimer] = None,
+        val_fraction: float = 0.0,
+    ):
+        if not 0.0 <= val_fraction < 1.0:
+            raise ValueError(f"val_fraction precisa estar em [0, 1) (recebido {val_fraction})")
+        # define semente para reprodutibilidade
+        np.random.seed(random_seed)
+        torch.manual_seed(random_seed)
+        if torch.cuda.is_available():
+            torch.cuda.manual_seed_all(random_seed)
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model = GraphSAGEModel(data.x.size(1), hidden_channels, num_classes).to(self.device)
+        self.optimizer = torch.optim.Adam(self.model.parameters(), lr=lr)
+        self.reuse_logits = _train_mode_is_eval_mode(self.model)
+        self.batch_size = batch_size
+        self.timer = timer or PhaseTimer()
+        self.epoch = 0
+        self._pred = None
+        # divisão simples: usa 80% para treino, 20% para teste; a validação sai do treino
+        idx = np.arange(data.num_nodes)
+        np.random.shuffle(idx)
+        split = int(0.8 * data.num_nodes)
+        n_train = split - int(round(val_fraction * split))
+        splits = {"train": idx[:n_train], "val": idx[n_train:split], "test": idx[split:]}
+        if batch_size is None:
+            self.data = data.to(self.device)
+            self.train_idx, self.val_idx, self.test_idx = (
+                torch.tensor(splits[name], dtype=torch.long, device=self.device) for name in ("train", "val", "test")
+            )
+        else:
+            # mini-batch: o grafo fica na CPU e só os subgrafos amostrados vão para o device
+            self.data = data
+            self.sampler = NeighborSampler(data, fanouts)
+            self.train_loader = neighbor_loader(
+                self.sampler, splits["train"], batch_size, shuffle=True, num_workers=num_workers, seed=random_seed
+            )
+            # a avaliação usa um amostrador próprio, reiniciado a cada chamada, para não alterar os lotes de treino
+            self.eval_sampler = copy.copy(self.sampler)
+            self.eval_sampler.seed = random_seed
+            self.val_loader, self.test_loader = (
+                neighbor_loader(self.eval_sampler, splits[name], batch_size, num_workers=num_workers)
+                for name in ("val", "test")
+            )
+
+    def train_epoch(self) -> Tuple[float, float]:
+        """Uma época de treino; devolve perda e acurácia de treino."""
+        self.epoch += 1
+        if self.batch_size is not None:
+            return _train_epoch_sampled(self.model, self.optimizer, self.train_loader, self.device, self.timer)
+        data, train_idx = self.data, self.train_idx
+        with self.timer.phase("train"):
+            self.model.train()
+            self.optimizer.zero_grad()
+            out = self.model(data.x, data.edge_index)
+            loss = F.cross_entropy(out[train_idx], data.y[train_idx])
+            loss.backward()
+            self.optimizer.step()
+            self._pred = out.detach().argmax(dim=1)
+            train_acc = (self._pred[train_idx] == data.y[train_idx]).float().mean().item()
+        return loss.item(), train_acc
+
+    def evaluate(self, fresh: bool = False, split: str = "test") -> float:
+        """Acurácia em ``split`` (``"test"`` ou ``"val"``); ``fresh`` força uma passada com os pesos atuais."""
+        if split not in ("test", "val"):
+            raise ValueError(f"split desconhecido: {split!r}")
+        with self.timer.phase("eval"):
+            if self.batch_size is not None:
+                self.eval_sampler.reset()
+                loader = self.val_loader if split == "val" else self.test_loader
+                return _evaluate_sampled(self.model, loader, self.device)
+            pred = self._pred
+            if fresh or not self.reuse_logits or pred is None:
+                self.model.eval()
+                with torch.no_grad():
+                    pred = self.model(self.data.x, self.data.edge_index).argmax(dim=1)
+            idx = self.val_idx if split == "val" else self.test_idx
+            if not len(idx):
+                return float("nan")
+            return (pred[idx] == self.data.y[idx]).float().mean().item()
+
+    def state_dict(self) -> Dict[str, object]:
+        state = {
+            "epoch": self.epoch,
+            "model": self.model.state_dict(),
+            "optimizer": self.optimizer.state_dict(),
+        }
+        if self.batch_size is not None:
+            state["loader_rng"] = self.train_loader.generator.get_state()
+            state["sampler_rng"] = self.sampler.rng.bit_generator.state
+        return state
+
+    def load_state_dict(self, state: Dict[str, object]) -> None:
+        self.epoch = int(state["epoch"])
+        self.model.load_state_dict(state["model"])
+        self.optimizer.load_state_dict(state["optimizer"])
+        self._pred = None
+        if self.batch_size is not None:
+            self.train_loader.generator.set_state(state["loader_rng"])
+            self.sampler.rng.bit_generator.state = state["sampler_rng"]
+
 
 def train_model(
     data: Data,
@@ -111,6 +429,19 @@ def train_model(
     mlflow_uri: str,
     dataset_version: str = "unknown",
     random_seed: int = 42,
+    batch_size: Optional[int] = None,
+    fanouts: Sequence[int] = (10, 10),
+    num_workers: int = 0,
+    epochs: int = 50,
+    eval_every: int = 1,
+    log_every: int = 10,
+    node_ids: Optional[np.ndarray] = None,
+    embedding_dir: Optional[str] = None,
+    embedding_meta: Optional[Dict[str, object]] = None,
+    hidden_channels: int = 32,
+    lr: float = 0.01,
+    categories: Optional[List[str]] = None,
+    val_fraction: float = 0.0,
 ) -> GraphSAGEModel:
     """Treina o modelo GraphSAGE e registra parâmetros/artefatos no MLflow.
 
@@ -121,62 +452,144 @@ def train_model(
         mlflow_uri: URI do servidor de tracking do MLflow.
         dataset_version: string que identifica a versão do conjunto de dados utilizado.
         random_seed: semente para aleatoriedade, garantindo reprodutibilidade.
+        batch_size: nós semente por mini-batch; ``None`` treina com o grafo
+            inteiro (full-batch) a cada época.
+        fanouts: vizinhos amostrados por camada no modo mini-batch (``-1``
+            usa todos); um valor por camada do modelo.
+        num_workers: processos do ``DataLoader`` que amostram os lotes.
+        epochs: número de épocas.
+        eval_every: calcula ``test_accuracy`` a cada ``eval_every`` épocas (e
+            sempre na última).
+        log_every: envia as métricas acumuladas ao MLflow a cada
+            ``log_every`` épocas com um único ``log_batch``.
+        node_ids: id de cada nó (linhas de ``data.x``); padrão ``0..N-1``.
+        embedding_dir: raiz do store de embeddings; se informado, os
+            embeddings de todos os nós são gravados ao final do treino em uma
+            versão com o id da execução do MLflow (veja ``embedding_store.py``).
+        embedding_meta: informações extras gravadas no ``meta.json`` do store
+            (ex.: categorias e semente das features).
+        hidden_channels: dimensão da camada oculta.
+        lr: taxa de aprendizado do Adam.
+        categories: nome de cada classe (índice do label), gravado junto com
+            os pesos exportados para inferência sem torch
+            (``model_numpy/graphsage.npz``, veja ``numpy_inference.py``).
+        val_fraction: fração dos nós de treino reservada para validação (fora
+            do treino); usada para reproduzir configurações escolhidas por
+            ``hparam_search.py``.
 
     Returns:
         Instância treinada do ``GraphSAGEModel``.
+
+    As acurácias de treino vêm das saídas do próprio passo de treino
+    (parâmetros do início da época).  No modo full-batch, quando o modelo não
+    tem dropout/batch norm, as acurácias de teste também reaproveitam essas
+    saídas; na última época há sempre uma avaliação separada com os pesos
+    finais.  O tempo de cada fase (treino, amostragem, avaliação e log) é
+    impresso ao final e registrado como ``epoch_time_breakdown.json``.
     """
-    # define semente para reprodutibilidade
-    np.random.seed(random_seed)
-    torch.manual_seed(random_seed)
-    if torch.cuda.is_available():
-        torch.cuda.manual_seed_all(random_seed)
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    data = data.to(device)
-    model = GraphSAGEModel(in_channels=data.x.size(1), hidden_channels=32, out_channels=num_classes).to(device)
-    optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
-    # divisão simples: usa 80% para treino, 20% para teste
+    if eval_every < 1 or log_every < 1:
+        raise ValueError(f"eval_every e log_every precisam ser >= 1 (recebidos {eval_every} e {log_every})")
+    timer = PhaseTimer()
+    trainer = GNNTrainer(
+        data, num_classes, random_seed, hidden_channels, lr, batch_size, fanouts, num_workers, timer, val_fraction
+    )
+    model = trainer.model
     num_nodes = data.num_nodes
-    idx = np.arange(num_nodes)
-    np.random.shuffle(idx)
-    split = int(0.8 * num_nodes)
-    train_idx = torch.tensor(idx[:split], dtype=torch.long, device=device)
-    test_idx = torch.tensor(idx[split:], dtype=torch.long, device=device)
-    with mlflow.start_run(run_name=run_name):
-        # registra parâmetros
-        mlflow.log_param("num_nodes", int(num_nodes))
-        mlflow.log_param("num_classes", int(num_classes))
-        mlflow.log_param("dataset_version", dataset_version)
-        mlflow.log_param("random_seed", random_seed)
-        mlflow.log_param("framework", "pytorch_geometric")
-        for epoch in range(1, 51):
-            model.train()
+    with mlflow.start_run(run_name=run_name) as run:
+        # registra parâmetros (uma única chamada)
+        params = {
+            "num_nodes": int(num_nodes),
+            "num_classes": int(num_classes),
+            "dataset_version": dataset_version,
+            "random_seed": random_seed,
+            "framework": "pytorch_geometric",
+            "batch_size": "full" if batch_size is None else batch_size,
+            "epochs": epochs,
+            "eval_every": eval_every,
+            "hidden_channels": hidden_channels,
+            "lr": lr,
+            "val_fraction": val_fraction,
+        }
+        if batch_size is not None:
+            params.update(fanouts=",".join(str(f) for f in fanouts), num_workers=num_workers)
+        mlflow.log_params(params)
+        metrics = MetricBuffer(run.info.run_id)
+        for epoch in range(1, epochs + 1):
+            last = epoch == epochs
+            loss, train_acc = trainer.train_epoch()
+            test_acc = trainer.evaluate(fresh=last) if last or epoch % eval_every == 0 else None
+            with timer.phase("log"):
+                values = {"train_loss": loss, "train_accuracy": train_acc}
+                if test_acc is not None:
+                    values["test_accuracy"] = test_acc
+                metrics.add(values, step=epoch)
+                if last or epoch % log_every == 0:
+                    metrics.flush()
+            shown = "" if test_acc is None else f" test_acc={test_acc:.3f}"
+            print(f"Epoch {epoch:02d} loss={loss:.4f} train_acc={train_acc:.3f}{shown}")
+        breakdown = timer.breakdown(epochs)
+        print(format_breakdown(breakdown))
+        mlflow.log_dict(breakdown, "epoch_time_breakdown.json")
+        if embedding_dir is not None:
+            ids = np.arange(num_nodes) if node_ids is None else node_ids
+            meta = {"run_id": run.info.run_id, "dataset_version": dataset_version, **(embedding_meta or {})}
+            if categories is not None:
+                meta.setdefault("categories", list(categories))
+            export_embeddings(model, data, ids, embedding_dir, run.info.run_id, meta)
+        # salva modelo e registra artefato (também nos formatos sem torch)
+        mlflow.pytorch.log_model(model, artifact_path="model")
+        with tempfile.TemporaryDirectory() as tmp:
+            mlflow.log_artifact(str(export_npz(model, Path(tmp) / "graphsage.npz", categories)), "model_numpy")
+    return model
+
+
+def _train_epoch_sampled(
+    model: GraphSAGEModel, optimizer, loader, device, timer: Optional[PhaseTimer] = None
+) -> Tuple[float, float]:
+    """Uma época em mini-batches; devolve perda e acurácia médias sobre os nós semente."""
+    timer = timer or PhaseTimer()
+    model.train()
+    total_loss = total_correct = total = 0
+    batches = iter(loader)
+    while True:
+        with timer.phase("sample"):
+            batch = next(batches, None)
+        if batch is None:
+            break
+        with timer.phase("train"):
+            batch = batch.to(device)
             optimizer.zero_grad()
-            out = model(data.x, data.edge_index)
-            loss = F.cross_entropy(out[train_idx], data.y[train_idx])
+            out = model(batch.x, batch.edge_index)[: batch.batch_size]
+            loss = F.cross_entropy(out, batch.y)
             loss.backward()
             optimizer.step()
-            # avalia
-            model.eval()
-            with torch.no_grad():
-                logits = model(data.x, data.edge_index)
-                pred = logits.argmax(dim=1)
-                train_acc = (pred[train_idx] == data.y[train_idx]).float().mean().item()
-                test_acc = (pred[test_idx] == data.y[test_idx]).float().mean().item()
-            # loga métricas
-            mlflow.log_metric("train_loss", loss.item(), step=epoch)
-            mlflow.log_metric("train_accuracy", train_acc, step=epoch)
-            mlflow.log_metric("test_accuracy", test_acc, step=epoch)
-            print(
-                f"Epoch {epoch:02d} loss={loss.item():.4f} train_acc={train_acc:.3f} test_acc={test_acc:.3f}"
-            )
-        # salva modelo e registra artefato
-        mlflow.pytorch.log_model(model, artifact_path="model")
-    return model
+            total_loss += loss.item() * batch.batch_size
+            total_correct += (out.argmax(dim=1) == batch.y).sum().item()
+            total += batch.batch_size
+    return total_loss / total, total_correct / total
+
+
+@torch.no_grad()
+def _evaluate_sampled(model: GraphSAGEModel, loader, device) -> float:
+    """Acurácia sobre os nós do ``loader`` com vizinhanças amostradas."""
+    model.eval()
+    correct = total = 0
+    for batch in loader:
+        batch = batch.to(device)
+        pred = model(batch.x, batch.edge_index)[: batch.batch_size].argmax(dim=1)
+        correct += (pred == batch.y).sum().item()
+        total += batch.batch_size
+    return correct / total if total else float("nan")
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Treina um GNN GraphSAGE e registra no MLflow")
-    parser.add_argument("--graph-path", type=str, required=True, help="Caminho para o arquivo JSON do grafo gerado")
+    parser.add_argument(
+        "--graph-path",
+        type=str,
+        required=True,
+        help="Grafo gerado: JSON ou CSR .npz (python -m sim.graph_csr)",
+    )
     parser.add_argument("--run-name", type=str, default="gnn_experiment", help="Nome da execução do MLflow")
     parser.add_argument(
         "--mlflow-uri",
@@ -196,11 +609,55 @@ def main() -> None:
         default=42,
         help="Semente para geração de números aleatórios",
     )
+    parser.add_argument("--feature-seed", type=int, default=0, help="Semente das features aleatórias dos nós")
+    parser.add_argument(
+        "--dataset-cache-dir",
+        type=str,
+        default=".cache/gnn_datasets",
+        help="Diretório do cache de tensores pré-processados",
+    )
+    parser.add_argument("--no-dataset-cache", action="store_true", help="Reconstrói o dataset sem usar o cache")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Nós semente por mini-batch com vizinhança amostrada (padrão: full-batch)",
+    )
+    parser.add_argument(
+        "--fanouts",
+        type=int,
+        nargs="+",
+        default=[10, 10],
+        help="Vizinhos amostrados por camada no modo mini-batch (-1 usa todos)",
+    )
+    parser.add_argument("--num-workers", type=int, default=0, help="Workers do DataLoader que amostram os lotes")
+    parser.add_argument("--epochs", type=int, default=50, help="Número de épocas")
+    parser.add_argument("--hidden-channels", type=int, default=32, help="Dimensão da camada oculta")
+    parser.add_argument("--lr", type=float, default=0.01, help="Taxa de aprendizado do Adam")
+    parser.add_argument(
+        "--embedding-dir",
+        type=str,
+        default="artifacts/embeddings",
+        help="Raiz do store de embeddings gerado ao final do treino ('none' desativa)",
+    )
+    parser.add_argument(
+        "--val-fraction",
+        type=float,
+        default=0.0,
+        help="Fração dos nós de treino reservada para validação (como em hparam_search.py)",
+    )
+    parser.add_argument("--eval-every", type=int, default=1, help="Intervalo (épocas) entre avaliações no teste")
+    parser.add_argument(
+        "--log-every",
+        type=int,
+        default=10,
+        help="Intervalo (épocas) entre envios das métricas acumuladas ao MLflow",
+    )
     args = parser.parse_args()
     # configura MLflow
     mlflow.set_tracking_uri(args.mlflow_uri)
-    graph = load_graph(args.graph_path)
-    data, categories = build_dataset(graph)
+    cache_dir = None if args.no_dataset_cache else args.dataset_cache_dir
+    data, categories = load_dataset(args.graph_path, cache_dir, feature_seed=args.feature_seed)
     train_model(
         data,
         num_classes=len(categories),
@@ -208,6 +665,19 @@ def main() -> None:
         mlflow_uri=args.mlflow_uri,
         dataset_version=args.dataset_version,
         random_seed=args.random_seed,
+        batch_size=args.batch_size,
+        fanouts=args.fanouts,
+        num_workers=args.num_workers,
+        epochs=args.epochs,
+        eval_every=args.eval_every,
+        log_every=args.log_every,
+        node_ids=load_node_ids(args.graph_path),
+        embedding_dir=None if args.embedding_dir.lower() == "none" else args.embedding_dir,
+        embedding_meta={"feature_seed": args.feature_seed},
+        hidden_channels=args.hidden_channels,
+        lr=args.lr,
+        categories=categories,
+        val_fraction=args.val_fraction,
     )
 
 
@@ -0,0 +1,516 @@
+"""
+train_linkpred.py
+-----------------
+
+Treino de predição de links usuário-item sobre ``data/transactions.csv``.
+As interações positivas (``label == 1``) formam um grafo bipartido esparso
+(CSR usuário -> itens e CSC item -> usuários); cada usuário e cada item tem um
+embedding próprio, e a representação final concatena esse embedding com a
+média dos embeddings de até ``fanout`` vizinhos amostrados (uma camada
+GraphSAGE bipartida, implementada com ``embedding_bag`` para não materializar
+subgrafos).  O escore de um par é o produto interno das representações; o
+treino usa entropia cruzada binária contra ``num_neg`` itens negativos
+sorteados uniformemente por lote e compartilhados por todos os positivos do
+lote (como no PyTorch-BigGraph): os escores negativos saem de um único
+produto de matrizes e só ``num_neg`` vizinhanças extras são codificadas.
+
+Pensado para centenas de milhões de interações em CPU:
+
+* o CSV é lido em blocos (``--chunksize``) apenas com as colunas necessárias,
+  e a divisão treino/teste é sorteada bloco a bloco sem reler o arquivo;
+* os pares ficam em vetores ``int32`` e o grafo em CSR SciPy (memória linear
+  no número de interações);
+* cada lote recorta só as linhas de embeddings que usa (sem repetição) e as
+  atualiza com Adagrad por linha, um escalar de estado por linha;
+* a avaliação é em lotes: AUC amostrada (positivo de teste vs. item
+  aleatório) e recall@k sobre uma amostra de usuários, pontuando todos os
+  itens em blocos e ignorando itens já vistos no treino.
+
+Ao final, os embeddings de usuários e itens são gravados em stores
+versionados (``embedding_store.py``) em ``<embedding-dir>/users`` e
+``<embedding-dir>/items``.
+
+Uso:
+
+```bash
+python ml/train_linkpred.py --transactions data/transactions.csv --epochs 5 \
+  --mlflow-uri http://localhost:5000
+```
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import mlflow
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import torch
+import torch.nn.functional as F
+
+try:
+    from .embedding_store import write_embeddings
+    from .train_gnn import MetricBuffer, PhaseTimer, format_breakdown
+except ImportError:  # executado como script: ``python train_linkpred.py``
+    from embedding_store import write_embeddings
+    from train_gnn import MetricBuffer, PhaseTimer, format_breakdown
+
+
+@dataclass
+class Interactions:
+    """Pares positivos ``[usuário, item]`` (índices densos) divididos em treino e teste.
+
+    ``test`` tem só pares únicos que não aparecem no treino (recompras não
+    contam como acerto, já que itens vistos são excluídos do ranking).
+    """
+
+    user_ids: np.ndarray
+    item_ids: np.ndarray
+    train: np.ndarray
+    test: np.ndarray
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_ids)
+
+
+def load_interactions(
+    path: str,
+    chunksize: int = 1_000_000,
+    test_fraction: float = 0.1,
+    seed: int = 0,
+) -> Interactions:
+    """Lê o CSV em blocos e devolve as interações positivas com ids densos.
+
+    O sorteio treino/teste consome o gerador em sequência, então o resultado
+    não depende de ``chunksize``.
+    """
+    rng = np.random.default_rng(seed)
+    users, items, is_test = [], [], []
+    columns = ["user_id", "item_id", "label"]
+    dtypes = {"user_id": np.int64, "item_id": np.int64, "label": np.int8}
+    for chunk in pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunksize):
+        draw = rng.random(len(chunk)) < test_fraction
+        positive = chunk["label"].to_numpy() == 1
+        users.append(chunk["user_id"].to_numpy()[positive])
+        items.append(chunk["item_id"].to_numpy()[positive])
+        is_test.append(draw[positive])
+    user_ids, u = np.unique(np.concatenate(users), return_inverse=True)
+    item_ids, i = np.unique(np.concatenate(items), return_inverse=True)
+    pairs = np.stack([u, i]).astype(np.int32)
+    is_test = np.concatenate(is_test)
+    train, test = pairs[:, ~is_test], pairs[:, is_test]
+    def keys(p: np.ndarray) -> np.ndarray:
+        return p[0].astype(np.int64) * len(item_ids) + p[1]
+
+    test_keys = np.setdiff1d(keys(test), keys(train))
+    test = np.stack([test_keys // len(item_ids), test_keys % len(item_ids)]).astype(np.int32)
+    return Interactions(user_ids, item_ids, train, test)
+
+
+@dataclass
+class BipartiteGraph:
+    """Vizinhos de treino: ``user_items`` em CSR por usuário e ``item_users`` por item (sem repetição)."""
+
+    user_indptr: np.ndarray
+    user_items: np.ndarray
+    item_indptr: np.ndarray
+    item_users: np.ndarray
+
+    @classmethod
+    def from_pairs(cls, pairs: np.ndarray, n_users: int, n_items: int) -> "BipartiteGraph":
+        ones = np.ones(pairs.shape[1], dtype=np.float32)
+        adj = sp.csr_matrix((ones, (pairs[0], pairs[1])), shape=(n_users, n_items))
+        adj.sum_duplicates()
+        adj_t = adj.tocsc()
+        return cls(adj.indptr, adj.indices, adj_t.indptr, adj_t.indices)
+
+
+def sample_neighbors(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    nodes: np.ndarray,
+    fanout: int,
+    rng: np.random.Generator,
+    exclude: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Até ``fanout`` vizinhos por nó (todos se couberem), no formato ``(flat, offsets)`` do ``embedding_bag``.
+
+    ``exclude[n]`` (``-1`` = nenhum) é um vizinho retirado da amostra do nó
+    ``nodes[n]``: no treino, a aresta do próprio par que está sendo pontuado.
+    """
+    starts = indptr[nodes]
+    deg = indptr[nodes + 1] - starts
+    take = np.minimum(deg, fanout)
+    offsets = np.cumsum(take) - take
+    owner = np.repeat(np.arange(len(nodes)), take)
+    within = np.arange(int(take.sum()), dtype=np.int64) - offsets[owner]
+    big = deg[owner] > fanout
+    within[big] = (rng.random(int(big.sum())) * deg[owner][big]).astype(np.int64)
+    flat = indices[starts[owner] + within]
+    if exclude is not None:
+        keep = flat != np.asarray(exclude)[owner]
+        flat, owner = flat[keep], owner[keep]
+        take = np.bincount(owner, minlength=len(nodes))
+        offsets = np.cumsum(take) - take
+    return flat, offsets
+
+
+class BipartiteSAGE(torch.nn.Module):
+    """Embeddings de usuários/itens com uma camada de agregação média sobre o grafo bipartido.
+
+    As tabelas de embeddings não recebem gradiente do autograd: o treino
+    recorta as linhas do lote (``encode_batch``) e as atualiza com
+    ``RowAdagrad``; só as camadas de saída usam o otimizador denso.
+    """
+
+    def __init__(self, n_users: int, n_items: int, dim: int = 64):
+        super().__init__()
+        self.user_emb = torch.nn.Embedding(n_users, dim)
+        self.item_emb = torch.nn.Embedding(n_items, dim)
+        with torch.no_grad():
+            torch.nn.init.normal_(self.user_emb.weight, std=0.1)
+            torch.nn.init.normal_(self.item_emb.weight, std=0.1)
+        self.user_emb.weight.requires_grad_(False)
+        self.item_emb.weight.requires_grad_(False)
+        self.user_out = torch.nn.Linear(2 * dim, dim)
+        self.item_out = torch.nn.Linear(2 * dim, dim)
+
+    def encode_users(self, user_vecs, item_table, neighbors, offsets) -> torch.Tensor:
+        agg = F.embedding_bag(neighbors, item_table, offsets, mode="mean")
+        return self.user_out(torch.cat([user_vecs, agg], dim=1))
+
+    def encode_items(self, item_vecs, user_table, neighbors, offsets) -> torch.Tensor:
+        agg = F.embedding_bag(neighbors, user_table, offsets, mode="mean")
+        return self.item_out(torch.cat([item_vecs, agg], dim=1))
+
+
+class RowAdagrad:
+    """Adagrad por linha para tabelas de embeddings (um acumulador escalar por linha).
+
+    Atualiza apenas as linhas do lote, já sem repetição, e guarda um ``float``
+    por linha em vez dos dois momentos por coordenada do ``SparseAdam``.
+    """
+
+    def __init__(self, weight: torch.Tensor, lr: float = 0.1, eps: float = 1e-10):
+        self.weight = weight
+        self.lr = lr
+        self.eps = eps
+        self.state = torch.zeros(weight.shape[0])
+
+    @torch.no_grad()
+    def step(self, rows: torch.Tensor, grad: torch.Tensor) -> None:
+        acc = self.state[rows] + grad.pow(2).mean(dim=1)
+        self.state[rows] = acc
+        self.weight[rows] -= self.lr * grad / (acc.sqrt() + self.eps).unsqueeze(1)
+
+
+def _tensors(*arrays: np.ndarray):
+    return [torch.from_numpy(np.ascontiguousarray(a, dtype=np.int64)) for a in arrays]
+
+
+def encode(
+    model: BipartiteSAGE, graph: BipartiteGraph, side: str, nodes: np.ndarray, fanout: int, rng: np.random.Generator
+) -> torch.Tensor:
+    """Representações de ``nodes`` (``side`` = ``"user"`` ou ``"item"``) com vizinhos amostrados."""
+    users, items = model.user_emb.weight, model.item_emb.weight
+    if side == "user":
+        flat, offsets = sample_neighbors(graph.user_indptr, graph.user_items, nodes, fanout, rng)
+        nodes, flat, offsets = _tensors(nodes, flat, offsets)
+        return model.encode_users(users[nodes], items, flat, offsets)
+    flat, offsets = sample_neighbors(graph.item_indptr, graph.item_users, nodes, fanout, rng)
+    nodes, flat, offsets = _tensors(nodes, flat, offsets)
+    return model.encode_items(items[nodes], users, flat, offsets)
+
+
+@torch.no_grad()
+def encode_all(
+    model: BipartiteSAGE, graph: BipartiteGraph, side: str, n: int, fanout: int, seed: int, chunk: int = 65536
+) -> np.ndarray:
+    """Representações de todos os nós de um lado, em blocos (ordem dos índices densos)."""
+    model.eval()
+    rng = np.random.default_rng(seed)
+    parts = [encode(model, graph, side, np.arange(s, min(s + chunk, n)), fanout, rng).numpy() for s in range(0, n, chunk)]
+    return np.concatenate(parts) if parts else np.empty((0, model.user_out.out_features), dtype=np.float32)
+
+
+def encode_batch(
+    model: BipartiteSAGE,
+    graph: BipartiteGraph,
+    users: np.ndarray,
+    items: np.ndarray,
+    fanout: int,
+    rng: np.random.Generator,
+):
+    """Representações de um lote de treino sobre recortes das tabelas de embeddings.
+
+    Os primeiros ``len(users)`` itens são os positivos de cada usuário.  A
+    aresta ``(u, i)`` de cada positivo é tirada das vizinhanças amostradas de
+    ``u`` e de ``i``: do contrário ``z_u`` agregaria o próprio ``i`` e o modelo
+    aprenderia a reconhecer o vizinho em vez de generalizar.
+
+    Cada tabela é recortada nas linhas únicas que o lote usa (nós do lote e
+    vizinhos amostrados do outro lado) e o recorte é uma folha do autograd: o
+    gradiente sai já agregado por linha.
+
+    Returns:
+        ``z_users``, ``z_items`` e os pares ``(linhas, recorte)`` de usuários e
+        de itens para ``RowAdagrad.step``.
+    """
+    positives = items[: len(users)]
+    item_targets = np.full(len(items), -1, dtype=np.int64)
+    item_targets[: len(users)] = users
+    user_nbrs, user_offsets = sample_neighbors(
+        graph.user_indptr, graph.user_items, users, fanout, rng, exclude=positives
+    )
+    item_nbrs, item_offsets = sample_neighbors(
+        graph.item_indptr, graph.item_users, items, fanout, rng, exclude=item_targets
+    )
+    user_rows, user_local = np.unique(np.concatenate([users, item_nbrs]), return_inverse=True)
+    item_rows, item_local = np.unique(np.concatenate([items, user_nbrs]), return_inverse=True)
+    user_rows, user_local, item_rows, item_local, user_offsets, item_offsets = _tensors(
+        user_rows, user_local, item_rows, item_local, user_offsets, item_offsets
+    )
+    user_table = model.user_emb.weight[user_rows].requires_grad_()
+    item_table = model.item_emb.weight[item_rows].requires_grad_()
+    z_users = model.encode_users(
+        user_table[user_local[: len(users)]], item_table, item_local[len(items) :], user_offsets
+    )
+    z_items = model.encode_items(
+        item_table[item_local[: len(items)]], user_table, user_local[len(users) :], item_offsets
+    )
+    return z_users, z_items, (user_rows, user_table), (item_rows, item_table)
+
+
+def iter_batches(
+    pairs: np.ndarray, batch_size: int, n_items: int, num_neg: int, rng: np.random.Generator
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Lotes embaralhados ``(usuários, itens positivos, itens negativos compartilhados pelo lote)``."""
+    order = rng.permutation(pairs.shape[1])
+    for start in range(0, len(order), batch_size):
+        idx = order[start : start + batch_size]
+        yield pairs[0, idx], pairs[1, idx], rng.integers(n_items, size=num_neg)
+
+
+def make_optimizers(model: BipartiteSAGE, lr: float = 0.01, emb_lr: float = 0.1):
+    """Adam para as camadas densas e ``RowAdagrad`` para as tabelas de usuários e itens."""
+    dense = torch.optim.Adam([p for p in model.parameters() if p.requires_grad], lr=lr)
+    return dense, (RowAdagrad(model.user_emb.weight, emb_lr), RowAdagrad(model.item_emb.weight, emb_lr))
+
+
+def train_epoch(
+    model: BipartiteSAGE,
+    graph: BipartiteGraph,
+    pairs: np.ndarray,
+    optimizers,
+    batch_size: int,
+    num_neg: int,
+    fanout: int,
+    rng: np.random.Generator,
+) -> float:
+    """Uma passada sobre os pares positivos; devolve a perda média por lote."""
+    dense, row_opts = optimizers
+    model.train()
+    n_items = model.item_emb.num_embeddings
+    total_loss, n_batches = 0.0, 0
+    for users, items, negatives in iter_batches(pairs, batch_size, n_items, num_neg, rng):
+        z_u, z_i, *tables = encode_batch(model, graph, users, np.concatenate([items, negatives]), fanout, rng)
+        pos = (z_u * z_i[: len(users)]).sum(dim=1)
+        neg = z_u @ z_i[len(users) :].T
+        loss = F.binary_cross_entropy_with_logits(pos, torch.ones_like(pos)) + \
+            F.binary_cross_entropy_with_logits(neg, torch.zeros_like(neg))
+        dense.zero_grad()
+        loss.backward()
+        dense.step()
+        for opt, (rows, table) in zip(row_opts, tables):
+            opt.step(rows, table.grad)
+        total_loss += loss.item()
+        n_batches += 1
+    return total_loss / max(n_batches, 1)
+
+
+# Escores por bloco da avaliação (~48 MB com os índices int64 do argpartition)
+EVAL_BLOCK_SCORES = 1 << 22
+
+
+def auc_from_scores(pos: np.ndarray, neg: np.ndarray) -> float:
+    """AUC pareada: fração de pares ``(pos, neg)`` ordenados corretamente (empates valem 1/2)."""
+    return float(np.mean((pos > neg) + 0.5 * (pos == neg)))
+
+
+@torch.no_grad()
+def evaluate(
+    model: BipartiteSAGE,
+    graph: BipartiteGraph,
+    data: Interactions,
+    k: int = 20,
+    eval_users: int = 2000,
+    fanout: int = 10,
+    seed: int = 0,
+    user_chunk: Optional[int] = None,
+) -> Dict[str, float]:
+    """AUC amostrada e recall@k nos pares de teste, em lotes.
+
+    ``user_chunk`` (padrão: derivado de ``EVAL_BLOCK_SCORES``) limita os
+    usuários pontuados por bloco: cada bloco aloca a matriz de escores e os
+    índices do ``argpartition``, ambos ``user_chunk x n_items``.
+    """
+    rng = np.random.default_rng(seed)
+    z_items = encode_all(model, graph, "item", data.n_items, fanout, seed)
+    test_users = np.unique(data.test[0])
+    if len(test_users) > eval_users:
+        test_users = np.sort(rng.choice(test_users, eval_users, replace=False))
+    z_users = np.zeros((data.n_users, z_items.shape[1]), dtype=np.float32)
+    z_users[test_users] = encode(model, graph, "user", test_users, fanout, rng).numpy()
+    # AUC: positivo de teste contra item sorteado
+    sel = np.isin(data.test[0], test_users)
+    u, i = data.test[0, sel], data.test[1, sel]
+    j = rng.integers(data.n_items, size=len(u))
+    pos = np.einsum("nd,nd->n", z_users[u], z_items[i])
+    neg = np.einsum("nd,nd->n", z_users[u], z_items[j])
+    # recall@k: todos os itens pontuados em blocos de usuários, sem itens do treino
+    test_csr = sp.csr_matrix((np.ones(len(u), dtype=np.int8), (u, i)), shape=(data.n_users, data.n_items))
+    test_csr.sum_duplicates()
+    k = min(k, data.n_items)
+    if user_chunk is None:
+        user_chunk = max(1, min(256, EVAL_BLOCK_SCORES // max(data.n_items, 1)))
+    recalls = []
+    for start in range(0, len(test_users), user_chunk):
+        users = test_users[start : start + user_chunk]
+        scores = z_users[users] @ z_items.T
+        rows = np.repeat(np.arange(len(users)), np.diff(graph.user_indptr)[users])
+        seen = np.concatenate([graph.user_items[graph.user_indptr[v] : graph.user_indptr[v + 1]] for v in users])
+        # nega no lugar: ``-scores`` copiaria o bloco inteiro
+        np.negative(scores, out=scores)
+        scores[rows, seen] = np.inf
+        top = np.argpartition(scores, k - 1, axis=1)[:, :k]
+        truth = test_csr[users]
+        hits = np.asarray(truth[np.arange(len(users))[:, None], top].sum(axis=1)).ravel()
+        recalls.append(hits / np.diff(truth.indptr))
+    return {"auc": auc_from_scores(pos, neg), f"recall_at_{k}": float(np.concatenate(recalls).mean())}
+
+
+def train_linkpred(
+    data: Interactions,
+    run_name: str = "linkpred",
+    dim: int = 64,
+    epochs: int = 5,
+    batch_size: int = 4096,
+    num_neg: int = 256,
+    fanout: int = 10,
+    lr: float = 0.01,
+    emb_lr: float = 0.1,
+    k: int = 20,
+    eval_users: int = 2000,
+    eval_every: int = 1,
+    random_seed: int = 42,
+    embedding_dir: Optional[str] = None,
+) -> Tuple[BipartiteSAGE, Dict[str, float]]:
+    """Treina o ``BipartiteSAGE`` e registra parâmetros, métricas e embeddings no MLflow.
+
+    Returns:
+        Modelo treinado e as métricas da última avaliação.
+    """
+    if eval_every < 1:
+        raise ValueError(f"eval_every precisa ser >= 1 (recebido {eval_every})")
+    torch.manual_seed(random_seed)
+    rng = np.random.default_rng(random_seed)
+    graph = BipartiteGraph.from_pairs(data.train, data.n_users, data.n_items)
+    model = BipartiteSAGE(data.n_users, data.n_items, dim)
+    optimizers = make_optimizers(model, lr, emb_lr)
+    timer = PhaseTimer()
+    metrics: Dict[str, float] = {}
+    with mlflow.start_run(run_name=run_name) as run:
+        mlflow.log_params({
+            "n_users": data.n_users, "n_items": data.n_items, "n_train": data.train.shape[1],
+            "n_test": data.test.shape[1], "dim": dim, "epochs": epochs, "batch_size": batch_size,
+            "num_neg": num_neg, "fanout": fanout, "lr": lr, "emb_lr": emb_lr, "k": k, "random_seed": random_seed,
+        })
+        buffer = MetricBuffer(run.info.run_id)
+        for epoch in range(1, epochs + 1):
+            with timer.phase("train"):
+                loss = train_epoch(model, graph, data.train, optimizers, batch_size, num_neg, fanout, rng)
+            values = {"train_loss": loss}
+            if epoch == epochs or epoch % eval_every == 0:
+                with timer.phase("eval"):
+                    metrics = evaluate(model, graph, data, k, eval_users, fanout, seed=random_seed)
+                values.update(metrics)
+            with timer.phase("log"):
+                buffer.add(values, step=epoch)
+                buffer.flush()
+            print(f"Epoch {epoch:02d} " + " ".join(f"{key}={value:.4f}" for key, value in values.items()))
+        breakdown = timer.breakdown(epochs)
+        print(format_breakdown(breakdown))
+        mlflow.log_dict(breakdown, "epoch_time_breakdown.json")
+        if embedding_dir is not None:
+            version = run.info.run_id
+            meta = {"run_id": version, "model": "bipartite_sage", "fanout": fanout}
+            for side, ids, n in (("user", data.user_ids, data.n_users), ("item", data.item_ids, data.n_items)):
+                z = encode_all(model, graph, side, n, fanout, random_seed)
+                store = write_embeddings(Path(embedding_dir) / f"{side}s", version, ids, {"output": z}, meta)
+                mlflow.log_artifacts(str(store.path), artifact_path=f"embeddings/{side}s/{version}")
+    return model, metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Treina predição de links usuário-item e registra no MLflow")
+    parser.add_argument("--transactions", type=str, default="data/transactions.csv", help="CSV de interações")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="Linhas do CSV lidas por bloco")
+    parser.add_argument("--test-fraction", type=float, default=0.1, help="Fração das interações para teste")
+    parser.add_argument("--dim", type=int, default=64, help="Dimensão dos embeddings")
+    parser.add_argument("--epochs", type=int, default=5, help="Número de épocas")
+    parser.add_argument("--batch-size", type=int, default=4096, help="Pares positivos por lote")
+    parser.add_argument("--num-neg", type=int, default=256, help="Itens negativos sorteados por lote (compartilhados)")
+    parser.add_argument("--fanout", type=int, default=10, help="Vizinhos amostrados por nó")
+    parser.add_argument("--lr", type=float, default=0.01, help="Taxa de aprendizado das camadas densas (Adam)")
+    parser.add_argument("--emb-lr", type=float, default=0.1, help="Taxa de aprendizado dos embeddings (RowAdagrad)")
+    parser.add_argument("--k", type=int, default=20, help="Corte do recall@k")
+    parser.add_argument("--eval-users", type=int, default=2000, help="Usuários amostrados na avaliação")
+    parser.add_argument("--eval-every", type=int, default=1, help="Intervalo (épocas) entre avaliações")
+    parser.add_argument("--threads", type=int, default=None, help="Threads de CPU do torch")
+    parser.add_argument("--random-seed", type=int, default=42, help="Semente do treino e da divisão")
+    parser.add_argument(
+        "--embedding-dir",
+        type=str,
+        default="artifacts/linkpred",
+        help="Raiz dos stores de embeddings de usuários/itens ('none' desativa)",
+    )
+    parser.add_argument("--run-name", type=str, default="linkpred", help="Nome da execução do MLflow")
+    parser.add_argument("--mlflow-uri", type=str, default="http://127.0.0.1:5000", help="URI do tracking do MLflow")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    mlflow.set_tracking_uri(args.mlflow_uri)
+    start = time.perf_counter()
+    data = load_interactions(args.transactions, args.chunksize, args.test_fraction, args.random_seed)
+    print(
+        f"{data.train.shape[1]} pares de treino, {data.test.shape[1]} de teste, {data.n_users} usuários, "
+        f"{data.n_items} itens (carregados em {time.perf_counter() - start:.1f}s)"
+    )
+    train_linkpred(
+        data,
+        run_name=args.run_name,
+        dim=args.dim,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        num_neg=args.num_neg,
+        fanout=args.fanout,
+        lr=args.lr,
+        emb_lr=args.emb_lr,
+        k=args.k,
+        eval_users=args.eval_users,
+        eval_every=args.eval_every,
+        random_seed=args.random_seed,
+        embedding_dir=None if args.embedding_dir.lower() == "none" else args.embedding_dir,
+    )
+
+
+if __name__ == "__main__":
+    main()
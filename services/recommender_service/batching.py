@@ -0,0 +1,178 @@
+"""
+batching.py
+-----------
+
+Micro-batching dinâmico de requisições concorrentes.  Cada requisição entra
+em uma fila ``asyncio`` com a sua lista de itens; uma tarefa em segundo plano
+junta requisições até somar ``max_items`` itens ou até ``max_wait_ms`` depois
+da primeira, chama a função de lote uma única vez com todos os itens e
+devolve a cada requisição a fatia correspondente do resultado.  Sob carga
+concorrente o custo fixo de cada passada do modelo (montar a adjacência,
+multiplicações pequenas) é dividido entre as requisições do lote; sem
+concorrência a espera extra é no máximo ``max_wait_ms``.
+
+Com ``runner`` (por exemplo ``BoundedExecutor.run`` de ``executor.py``), a
+função de lote roda fora do loop de eventos e vários lotes podem estar em
+execução ao mesmo tempo; erros do ``runner`` (como fila cheia) chegam a todas
+as requisições do lote.
+
+Métricas Prometheus (rótulo ``batcher``):
+
+* ``recommender_batch_items`` / ``recommender_batch_requests`` – histogramas
+  do tamanho de cada lote em itens e em requisições;
+* ``recommender_batch_queue_seconds`` – espera de cada requisição na fila até
+  o lote ser despachado;
+* ``recommender_batch_run_seconds`` – duração do despacho (inclui a espera
+  no ``runner``, se houver).
+
+Exemplo:
+
+```python
+batcher = MicroBatcher(lambda rows: model_predict(rows), max_items=256, max_wait_ms=2.0)
+labels = await batcher.submit([3, 17, 42])
+```
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Set
+
+try:
+    from prometheus_client import Histogram
+except ImportError:
+    raise ImportError("prometheus-client não está instalado. Instale com `pip install prometheus-client`.")
+
+_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+_TIME_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+BATCH_ITEMS = Histogram(
+    "recommender_batch_items", "Itens por lote despachado", ["batcher"], buckets=_SIZE_BUCKETS
+)
+BATCH_REQUESTS = Histogram(
+    "recommender_batch_requests", "Requisições por lote despachado", ["batcher"], buckets=_SIZE_BUCKETS
+)
+QUEUE_SECONDS = Histogram(
+    "recommender_batch_queue_seconds", "Espera na fila até o despacho do lote", ["batcher"], buckets=_TIME_BUCKETS
+)
+RUN_SECONDS = Histogram(
+    "recommender_batch_run_seconds", "Duração do despacho do lote", ["batcher"], buckets=_TIME_BUCKETS
+)
+
+
+@dataclass
+class _Pending:
+    items: Sequence[Any]
+    future: asyncio.Future
+    enqueued: float
+
+
+class MicroBatcher:
+    """Coalesce requisições concorrentes em chamadas únicas de ``fn``.
+
+    Args:
+        fn: recebe a lista de itens do lote e devolve um resultado por item,
+            na mesma ordem.
+        max_items: itens a partir dos quais o lote é despachado sem esperar.
+        max_wait_ms: espera máxima, contada da primeira requisição do lote.
+        name: valor do rótulo ``batcher`` nas métricas.
+        runner: ``await runner(fn, items)`` executa o lote (padrão: chamada
+            direta no loop).
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], Sequence[Any]],
+        max_items: int = 256,
+        max_wait_ms: float = 2.0,
+        name: str = "predict",
+        runner: Optional[Callable[..., Awaitable[Sequence[Any]]]] = None,
+    ):
+        self.fn = fn
+        self.max_items = max(1, int(max_items))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self.runner = runner
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        """Inicia a tarefa de despacho no loop corrente (chamado também por ``submit``)."""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, items: Sequence[Any]) -> List[Any]:
+        """Enfileira ``items`` e espera os seus resultados."""
+        if not len(items):
+            return []
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Pending(items, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[_Pending]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        n_items = len(batch[0].items)
+        deadline = loop.time() + self.max_wait
+        while n_items < self.max_items:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                pending = self._queue.get_nowait()
+            batch.append(pending)
+            n_items += len(pending.items)
+        return batch
+
+    async def _dispatch(self, batch: List[_Pending]) -> None:
+        start = time.perf_counter()
+        items = [item for pending in batch for item in pending.items]
+        for pending in batch:
+            QUEUE_SECONDS.labels(self.name).observe(start - pending.enqueued)
+        BATCH_ITEMS.labels(self.name).observe(len(items))
+        BATCH_REQUESTS.labels(self.name).observe(len(batch))
+        try:
+            if self.runner is None:
+                results = self.fn(items)
+            else:
+                results = await self.runner(self.fn, items)
+        except Exception as exc:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(exc)
+            return
+        finally:
+            RUN_SECONDS.labels(self.name).observe(time.perf_counter() - start)
+        offset = 0
+        for pending in batch:
+            size = len(pending.items)
+            if not pending.future.done():
+                pending.future.set_result(list(results[offset : offset + size]))
+            offset += size
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            if self.runner is None:
+                await self._dispatch(batch)
+                continue
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
@@ -0,0 +1,161 @@
+"""
+cache.py
+--------
+
+Cache de predições em memória, versionado pelo modelo.  Cada entrada é
+guardada sob ``(versão do modelo, entrada normalizada)`` e expira após
+``ttl_seconds``; acima de ``max_entries`` as entradas menos usadas são
+descartadas (LRU).  Ao ver uma versão diferente da atual o cache se esvazia
+sozinho, de modo que um modelo novo nunca responde com predições do antigo, e
+gravações que chegam com a versão anterior (uma inferência que terminou
+depois da troca) são ignoradas.
+
+As operações trabalham com listas de chaves: ``get_many`` devolve ``None``
+nas posições ausentes, o chamador calcula só essas e grava com ``put_many``.
+Um ``threading.Lock`` protege o dicionário, então o cache pode ser usado
+tanto no loop de eventos quanto nas threads de inferência.
+
+Métricas Prometheus (rótulo ``cache``):
+
+* ``recommender_prediction_cache_hits_total`` / ``..._misses_total`` –
+  consultas respondidas pelo cache e consultas que foram ao modelo;
+* ``recommender_prediction_cache_evictions_total`` – descartes, com rótulo
+  ``reason`` (``ttl``, ``size`` ou ``version``);
+* ``recommender_prediction_cache_entries`` – entradas atuais.
+
+Exemplo:
+
+```python
+cache = PredictionCache(max_entries=100_000, ttl_seconds=60)
+cached = cache.get_many("v3", [17, 42])
+cache.put_many("v3", [42], ["Electronics"])
+```
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+try:
+    from prometheus_client import Counter, Gauge
+except ImportError:
+    raise ImportError("prometheus-client não está instalado. Instale com `pip install prometheus-client`.")
+
+HITS = Counter("recommender_prediction_cache_hits_total", "Consultas respondidas pelo cache", ["cache"])
+MISSES = Counter("recommender_prediction_cache_misses_total", "Consultas ausentes no cache", ["cache"])
+EVICTIONS = Counter(
+    "recommender_prediction_cache_evictions_total", "Entradas descartadas do cache", ["cache", "reason"]
+)
+ENTRIES = Gauge("recommender_prediction_cache_entries", "Entradas no cache de predições", ["cache"])
+
+
+class PredictionCache:
+    """Cache LRU com TTL para predições, invalidado pela troca de versão do modelo.
+
+    Args:
+        max_entries: entradas mantidas; ``0`` desliga o cache.
+        ttl_seconds: validade de cada entrada; ``0`` desliga a expiração.
+        name: valor do rótulo ``cache`` nas métricas.
+        clock: relógio monotônico (substituível nos testes).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100_000,
+        ttl_seconds: float = 60.0,
+        name: str = "predict",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = max(0.0, float(ttl_seconds))
+        self.name = name
+        self.clock = clock
+        self.version: Optional[Hashable] = None
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _switch(self, version: Hashable) -> None:
+        # chamado com o lock: uma versão nova descarta tudo que veio da anterior
+        if version != self.version:
+            if self._entries:
+                EVICTIONS.labels(self.name, "version").inc(len(self._entries))
+                self._entries.clear()
+            self.version = version
+
+    def get_many(self, version: Hashable, keys: Sequence[Hashable]) -> List[Optional[Any]]:
+        """Valores em cache para ``keys`` (``None`` onde não há entrada válida)."""
+        if not self.enabled:
+            return [None] * len(keys)
+        now = self.clock()
+        out: List[Optional[Any]] = []
+        expired = 0
+        with self._lock:
+            self._switch(version)
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl and entry[0] <= now:
+                    del self._entries[key]
+                    expired += 1
+                    entry = None
+                if entry is None:
+                    out.append(None)
+                    continue
+                self._entries.move_to_end(key)
+                out.append(entry[1])
+            hits = sum(v is not None for v in out)
+            self._hits += hits
+            self._misses += len(keys) - hits
+            size = len(self._entries)
+        if expired:
+            EVICTIONS.labels(self.name, "ttl").inc(expired)
+        HITS.labels(self.name).inc(hits)
+        MISSES.labels(self.name).inc(len(keys) - hits)
+        ENTRIES.labels(self.name).set(size)
+        return out
+
+    def put_many(self, version: Hashable, keys: Sequence[Hashable], values: Sequence[Any]) -> None:
+        """Grava ``values`` sob ``version``; ignora a gravação se a versão já foi trocada."""
+        if not self.enabled:
+            return
+        expires = self.clock() + self.ttl
+        evicted = 0
+        with self._lock:
+            if self.version is None:
+                self.version = version
+            if version != self.version:
+                return
+            for key, value in zip(keys, values):
+                self._entries[key] = (expires, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            size = len(self._entries)
+        if evicted:
+            EVICTIONS.labels(self.name, "size").inc(evicted)
+        ENTRIES.labels(self.name).set(size)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        ENTRIES.labels(self.name).set(0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,103 @@
+"""
+executor.py
+-----------
+
+Execução da inferência fora do loop de eventos, com concorrência limitada.
+As chamadas síncronas (NumPy/SciPy ou torch) rodam em um ``ThreadPoolExecutor``
+de ``workers`` threads; as bibliotecas numéricas liberam o GIL nas operações
+pesadas, e as threads compartilham o modelo, as features mapeadas e os caches
+sem cópia por processo.  A admissão é limitada: no máximo ``workers`` tarefas
+executando e ``max_queue`` esperando.  Acima disso ``run`` levanta
+``Overloaded`` na hora, sem enfileirar, e o handler responde 503 com
+``Retry-After``.  Assim o loop continua livre para ``/health`` e para as
+demais rotas mesmo com a inferência saturada.
+
+Métricas Prometheus (rótulo ``executor``):
+
+* ``recommender_inference_queue_seconds`` – histograma da espera entre a
+  admissão e o início da execução em uma thread;
+* ``recommender_inference_run_seconds`` – duração da execução;
+* ``recommender_inference_admitted`` – tarefas admitidas (executando ou na fila);
+* ``recommender_inference_rejected_total`` – tarefas recusadas por fila cheia.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+except ImportError:
+    raise ImportError("prometheus-client não está instalado. Instale com `pip install prometheus-client`.")
+
+_TIME_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+QUEUE_SECONDS = Histogram(
+    "recommender_inference_queue_seconds", "Espera na fila do executor de inferência", ["executor"],
+    buckets=_TIME_BUCKETS,
+)
+RUN_SECONDS = Histogram(
+    "recommender_inference_run_seconds", "Duração da inferência no executor", ["executor"], buckets=_TIME_BUCKETS
+)
+ADMITTED = Gauge("recommender_inference_admitted", "Tarefas admitidas (executando ou na fila)", ["executor"])
+REJECTED = Counter("recommender_inference_rejected_total", "Tarefas recusadas por fila cheia", ["executor"])
+
+
+class Overloaded(Exception):
+    """A fila de admissão do executor está cheia."""
+
+
+class BoundedExecutor:
+    """Pool de threads com fila de admissão limitada.
+
+    Args:
+        workers: threads de inferência.
+        max_queue: tarefas que podem esperar além das em execução.
+        name: valor do rótulo ``executor`` nas métricas.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 64, name: str = "inference"):
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self.name = name
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{name}-worker")
+        # alterado só no loop de eventos (uma thread): dispensa lock
+        self._admitted = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Executa ``fn(*args)`` em uma thread do pool; levanta ``Overloaded`` se não houver vaga."""
+        if self._admitted >= self.capacity:
+            REJECTED.labels(self.name).inc()
+            raise Overloaded(f"fila de inferência cheia ({self.capacity} tarefas)")
+        self._admitted += 1
+        ADMITTED.labels(self.name).set(self._admitted)
+        enqueued = time.perf_counter()
+
+        def job():
+            start = time.perf_counter()
+            QUEUE_SECONDS.labels(self.name).observe(start - enqueued)
+            try:
+                return fn(*args)
+            finally:
+                RUN_SECONDS.labels(self.name).observe(time.perf_counter() - start)
+
+        # A vaga só é liberada quando a tarefa do pool termina: cancelar quem
+        # espera (timeout, cliente desconectado) não interrompe a thread
+        future = asyncio.get_running_loop().run_in_executor(self._pool, job)
+        future.add_done_callback(self._release)
+        return await asyncio.shield(future)
+
+    def _release(self, _future) -> None:
+        self._admitted -= 1
+        ADMITTED.labels(self.name).set(self._admitted)
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": self.workers, "max_queue": self.max_queue, "admitted": self._admitted}
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
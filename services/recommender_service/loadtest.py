@@ -0,0 +1,82 @@
+"""
+loadtest.py
+-----------
+
+Teste de carga concorrente do ``/predict`` do Recommender Service.  Dispara
+``--requests`` requisições com até ``--concurrency`` em voo, cada uma com
+``--ids-per-request`` ids sorteados de ``--ids`` (ou do ``data/graph.json``),
+e relata vazão e latências.  Para medir o ganho do micro-batching, rode o
+serviço com ``PREDICT_BATCHING=1`` e com ``PREDICT_BATCHING=0`` e compare.
+
+Uso:
+
+```bash
+PREDICT_BATCHING=1 uvicorn services.recommender_service.main:app --port 8001 &
+python -m services.recommender_service.loadtest --url http://localhost:8001 --concurrency 64 --requests 5000
+```
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import List
+
+import numpy as np
+
+try:
+    import httpx
+except ImportError:
+    raise ImportError("httpx não está instalado. Instale com `pip install httpx` para rodar o teste de carga.")
+
+
+async def run_load(url: str, node_ids: List[int], n_requests: int, concurrency: int, ids_per_request: int, seed: int = 0):
+    """Latências (s) de cada requisição e duração total do teste."""
+    rng = random.Random(seed)
+    payloads = [{"node_ids": rng.sample(node_ids, min(ids_per_request, len(node_ids)))} for _ in range(n_requests)]
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+
+        async def one(payload):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/predict", json=payload)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        await client.post("/predict", json=payloads[0])  # aquece conexão e caches
+        start = time.perf_counter()
+        await asyncio.gather(*(one(p) for p in payloads))
+        elapsed = time.perf_counter() - start
+    return np.asarray(latencies), elapsed, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga concorrente do /predict")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:8001", help="URL base do serviço")
+    parser.add_argument("--graph", type=str, default="data/graph.json", help="Grafo de onde sortear os ids")
+    parser.add_argument("--requests", type=int, default=2000, help="Total de requisições")
+    parser.add_argument("--concurrency", type=int, default=64, help="Requisições simultâneas")
+    parser.add_argument("--ids-per-request", type=int, default=4, help="Ids por requisição")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do sorteio de ids")
+    args = parser.parse_args()
+    with open(args.graph, "r", encoding="utf-8") as f:
+        node_ids = [int(n["id"]) for n in json.load(f)["nodes"]]
+    latencies, elapsed, errors = asyncio.run(
+        run_load(args.url, node_ids, args.requests, args.concurrency, args.ids_per_request, args.seed)
+    )
+    ms = latencies * 1000.0
+    print(
+        f"{args.requests} requisições em {elapsed:.2f}s: {args.requests / elapsed:.0f} req/s, "
+        f"p50 {np.percentile(ms, 50):.1f} ms, p99 {np.percentile(ms, 99):.1f} ms, erros {errors}"
+    )
+
+
+if __name__ == "__main__":
+    main()
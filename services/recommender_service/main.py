@@ -7,17 +7,60 @@ to integrate model artifacts with a microservice and provides a starting point
 for implementing proper recommendation logic (e.g., top‑k item ranking, user
 embedding lookup, etc.).  The current implementation performs node
 classification: given a node identifier, it returns the predicted category.
+
+At startup the service loads the graph and node features saved with the
+latest version of the embedding store (``GRAPH_STORE_PATH``, written by
+``ml/train_gnn.py``).  For each request it extracts the k-hop subgraph of the
+requested nodes (``k`` = number of model layers) and runs the model on it, so
+the predictions match full-graph inference while the work depends only on the
+neighbourhood of the request.  Per-node subgraphs are kept in an LRU cache
+bounded by the total number of cached edges (``SUBGRAPH_CACHE_EDGES``); its
+counters are exposed at ``/stats``.
+
+``/recommend?node_id=...&k=...`` returns the ``k`` most similar nodes using the
+IVF index built by ``ml/ann_index.py`` (``ANN_INDEX_PATH``), optionally
+filtered by ``category`` (repeatable); ``nprobe`` trades recall for latency
+(default ``ANN_NPROBE``).  An index built from a different store version is
+still served, but a warning is logged at startup and ``/health`` reports it as
+``stale`` until the index is rebuilt.
+
+Concurrent ``/predict`` calls are coalesced by ``batching.MicroBatcher``: rows
+from requests arriving within ``PREDICT_BATCH_WAIT_MS`` (or until
+``PREDICT_BATCH_MAX_ITEMS`` rows) share one subgraph extraction and one
+forward pass (``PREDICT_BATCHING=0`` runs each request on its own).  Batch
+sizes and queue times are exported at ``/metrics`` in Prometheus format.
+
+Model and index work never runs on the event loop: it goes to
+``executor.BoundedExecutor``, a pool of ``INFERENCE_WORKERS`` threads with room
+for ``INFERENCE_QUEUE`` waiting tasks.  When that admission queue is full the
+request is answered immediately with 503 and ``Retry-After`` instead of piling
+up, so ``/health`` and the other routes stay responsive under overload.  The
+queue wait is exported as the ``recommender_inference_queue_seconds``
+histogram.
+
+Predicted labels are cached per node by ``cache.PredictionCache`` under the
+model version (model path and mtime plus the store version), with a TTL of
+``PREDICT_CACHE_TTL`` seconds and at most ``PREDICT_CACHE_SIZE`` entries
+(``0`` disables it).  Only the node ids missing from the cache go to the
+model; a different model version empties the cache.  Hit/miss counters are at
+``/stats`` and ``/metrics``.
+
+When ``NUMPY_MODEL_PATH`` points to weights exported by
+``ml/numpy_inference.py`` (``model_numpy/graphsage.npz`` in the training run),
+inference runs on NumPy/SciPy and neither torch nor mlflow is imported, which
+keeps worker cold starts and RSS small.  Otherwise the MLflow/torch model at
+``MLFLOW_MODEL_URI`` is loaded as before.
 """
 
+import logging
 import os
 import sys
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
-import mlflow
 import numpy as np
-import torch
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
 
 # Ajusta sys.path para localizar pacotes internos
@@ -25,6 +68,22 @@ PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
+from ml.ann_index import IVFIndex  # noqa: E402
+from ml.embedding_store import EmbeddingStore  # noqa: E402
+from ml.numpy_inference import LAYERS, NumpyGraphSAGE  # noqa: E402
+from ml.subgraph import KHopExtractor  # noqa: E402
+
+# Módulos irmãos com import relativo: o mesmo arquivo importado por dois nomes
+# registraria duas vezes as métricas Prometheus
+try:
+    from .batching import MicroBatcher
+    from .cache import PredictionCache
+    from .executor import BoundedExecutor, Overloaded
+except ImportError:  # executado como script: ``python services/recommender_service/main.py``
+    from services.recommender_service.batching import MicroBatcher
+    from services.recommender_service.cache import PredictionCache
+    from services.recommender_service.executor import BoundedExecutor, Overloaded
+
 
 class PredictRequest(BaseModel):
     node_ids: List[int]
@@ -34,26 +93,117 @@ class PredictResponse(BaseModel):
     predictions: List[str]
 
 
+class RecommendedItem(BaseModel):
+    node_id: int
+    score: float
+    category: Optional[str] = None
+
+
+class RecommendResponse(BaseModel):
+    node_id: int
+    items: List[RecommendedItem]
+
+
 app = FastAPI(title="Recommender Service", version="0.1.0")
+log = logging.getLogger("uvicorn")
 
 # Configurações: path do modelo e dicionário de categorias
 MLFLOW_MODEL_URI = os.environ.get("MLFLOW_MODEL_URI", "mlruns/0/model")
+NUMPY_MODEL_PATH = os.environ.get("NUMPY_MODEL_PATH", "")
 CATEGORY_MAPPING_PATH = os.environ.get("CATEGORY_MAPPING_PATH", "category_mapping.json")
+GRAPH_STORE_PATH = os.environ.get("GRAPH_STORE_PATH", "artifacts/embeddings")
+SUBGRAPH_CACHE_EDGES = int(os.environ.get("SUBGRAPH_CACHE_EDGES", "1000000"))
+ANN_INDEX_PATH = os.environ.get("ANN_INDEX_PATH", "artifacts/ann_index")
+ANN_NPROBE = int(os.environ.get("ANN_NPROBE", "8"))
+PREDICT_BATCHING = os.environ.get("PREDICT_BATCHING", "1") != "0"
+PREDICT_BATCH_MAX_ITEMS = int(os.environ.get("PREDICT_BATCH_MAX_ITEMS", "256"))
+PREDICT_BATCH_WAIT_MS = float(os.environ.get("PREDICT_BATCH_WAIT_MS", "2"))
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+INFERENCE_QUEUE = int(os.environ.get("INFERENCE_QUEUE", "64"))
+PREDICT_CACHE_SIZE = int(os.environ.get("PREDICT_CACHE_SIZE", "100000"))
+PREDICT_CACHE_TTL = float(os.environ.get("PREDICT_CACHE_TTL", "60"))
 
 
 def load_model():
-    """Carrega modelo a partir do MLflow.
+    """Carrega o modelo: pesos ``.npz`` sem torch, se configurados, ou o modelo do MLflow.
 
-    Usa mlflow.pytorch.load_model para carregar o módulo TorchScript salvando
-    durante o treinamento.
+    No caminho MLflow usa mlflow.pytorch.load_model para carregar o módulo
+    salvo durante o treinamento; torch e mlflow só são importados aqui.
     """
+    if NUMPY_MODEL_PATH:
+        try:
+            return NumpyGraphSAGE.load(NUMPY_MODEL_PATH)
+        except Exception as exc:
+            raise RuntimeError(f"Falha ao carregar pesos de {NUMPY_MODEL_PATH}: {exc}")
     try:
+        import mlflow
+
         model = mlflow.pytorch.load_model(MLFLOW_MODEL_URI)
         return model
     except Exception as exc:
         raise RuntimeError(f"Falha ao carregar modelo de {MLFLOW_MODEL_URI}: {exc}")
 
 
+def model_version(store: EmbeddingStore) -> str:
+    """Identifica o modelo servido: origem dos pesos, seu mtime e a versão do store de grafo."""
+    source = NUMPY_MODEL_PATH or MLFLOW_MODEL_URI
+    try:
+        stamp = os.stat(source).st_mtime_ns
+    except OSError:  # URI remota (``models:/``, ``runs:/``)
+        stamp = 0
+    return f"{source}@{stamp}:store-{store.version}"
+
+
+def forward(model, x: np.ndarray, edge_index: np.ndarray) -> np.ndarray:
+    """Logits do modelo carregado (NumPy ou torch) como ``np.ndarray``."""
+    if isinstance(model, NumpyGraphSAGE):
+        return model(x, edge_index)
+    import torch
+
+    with torch.no_grad():
+        return model(torch.from_numpy(x), torch.from_numpy(edge_index)).numpy()
+
+
+def load_graph_store() -> EmbeddingStore:
+    """Abre a versão mais recente do store de embeddings, que precisa conter o grafo."""
+    try:
+        store = EmbeddingStore.open_latest(GRAPH_STORE_PATH)
+    except Exception as exc:
+        raise RuntimeError(f"Falha ao abrir o store de grafo em {GRAPH_STORE_PATH}: {exc}")
+    if not store.has_graph:
+        raise RuntimeError(f"A versão {store.version} de {GRAPH_STORE_PATH} não contém o grafo de origem")
+    return store
+
+
+def load_ann_index(store: EmbeddingStore) -> Optional[IVFIndex]:
+    """Carrega o índice IVF de ``ANN_INDEX_PATH``; ``None`` se ainda não foi construído.
+
+    Um índice construído sobre outra versão do store continua servindo, mas
+    gera um aviso e aparece como ``stale`` em ``/health`` até ser reconstruído.
+    """
+    if not os.path.exists(os.path.join(ANN_INDEX_PATH, "meta.json")):
+        return None
+    try:
+        index = IVFIndex.load(ANN_INDEX_PATH)
+    except Exception as exc:
+        raise RuntimeError(f"Falha ao carregar o índice ANN de {ANN_INDEX_PATH}: {exc}")
+    if ann_index_stale(index, store):
+        log.warning(
+            "Índice ANN em %s foi construído sobre a versão %s do store; a versão servida é %s. "
+            "Reconstrua com `python -m ml.ann_index --store %s --output %s`.",
+            ANN_INDEX_PATH,
+            index.meta.get("store_version"),
+            store.version,
+            GRAPH_STORE_PATH,
+            ANN_INDEX_PATH,
+        )
+    return index
+
+
+def ann_index_stale(index: IVFIndex, store: EmbeddingStore) -> bool:
+    return str(index.meta.get("store_version")) != store.version
+
+
 def load_category_mapping() -> List[str]:
     """Carrega arquivo JSON contendo a lista de categorias por índice."""
     import json
@@ -66,35 +216,153 @@ def load_category_mapping() -> List[str]:
 # Carrega modelo e categorias na inicialização
 MODEL = None
 CATEGORIES: List[str] = []
+STORE: Optional[EmbeddingStore] = None
+FEATURES: Optional[np.ndarray] = None
+EXTRACTOR: Optional[KHopExtractor] = None
+INDEX: Optional[IVFIndex] = None
+BATCHER: Optional[MicroBatcher] = None
+EXECUTOR: Optional[BoundedExecutor] = None
+MODEL_VERSION = ""
+CACHE = PredictionCache(PREDICT_CACHE_SIZE, PREDICT_CACHE_TTL)
 
 
 @app.on_event("startup")
 def startup_event():
-    global MODEL, CATEGORIES
+    global MODEL, CATEGORIES, STORE, FEATURES, EXTRACTOR, INDEX, BATCHER, EXECUTOR, MODEL_VERSION
     MODEL = load_model()
-    CATEGORIES = load_category_mapping()
+    STORE = load_graph_store()
+    MODEL_VERSION = model_version(STORE)
+    FEATURES, edge_index = STORE.load_graph()
+    in_channels = getattr(MODEL, "in_channels", FEATURES.shape[1])
+    if FEATURES.shape[1] != in_channels:
+        raise RuntimeError(f"Features do grafo têm {FEATURES.shape[1]} colunas; o modelo espera {in_channels}")
+    EXTRACTOR = KHopExtractor(edge_index, len(STORE), num_hops=len(LAYERS), max_cached_edges=SUBGRAPH_CACHE_EDGES)
+    # os pesos exportados trazem a ordem de categorias usada no treino
+    CATEGORIES = (
+        getattr(MODEL, "categories", None) or list(STORE.meta.get("categories", [])) or load_category_mapping()
+    )
+    INDEX = load_ann_index(STORE)
+    EXECUTOR = BoundedExecutor(INFERENCE_WORKERS, INFERENCE_QUEUE)
+    if PREDICT_BATCHING:
+        BATCHER = MicroBatcher(predict_rows, PREDICT_BATCH_MAX_ITEMS, PREDICT_BATCH_WAIT_MS, runner=EXECUTOR.run)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if BATCHER is not None:
+        await BATCHER.stop()
+    if EXECUTOR is not None:
+        EXECUTOR.shutdown()
+
+
+def overloaded(exc: Overloaded) -> HTTPException:
+    """Resposta rápida quando a fila de inferência está cheia."""
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+
+
+def predict_rows(rows) -> List[str]:
+    """Categorias previstas para as linhas ``rows`` (uma passada no subgrafo k-hop de todas)."""
+    # inferência só no subgrafo k-hop das sementes: mesma saída que no grafo completo
+    nodes, edge_index, seed_pos = EXTRACTOR.subgraph(rows)
+    feat = np.asarray(FEATURES[nodes], dtype=np.float32)
+    preds = forward(MODEL, feat, edge_index)[seed_pos].argmax(axis=1)
+    return [CATEGORIES[p] for p in preds]
 
 
 @app.post("/predict", response_model=PredictResponse)
 async def predict(req: PredictRequest):
     """Recebe uma lista de IDs de nós e retorna as categorias previstas."""
-    if MODEL is None or not CATEGORIES:
+    if MODEL is None or not CATEGORIES or EXTRACTOR is None:
         raise HTTPException(status_code=500, detail="Modelo não carregado corretamente")
-    node_ids = req.node_ids
-    # Constrói matriz de features sintética: apenas one-hot dos IDs para exemplo
-    # Em um serviço real, aqui você buscaria embeddings ou atributos do grafo.
-    num_nodes = len(node_ids)
-    feat = np.eye(num_nodes, dtype=np.float32)
-    x = torch.tensor(feat)
-    # Cria um grafo vazio sem arestas para inferência isolada
-    edge_index = torch.empty((2, 0), dtype=torch.long)
-    with torch.no_grad():
-        logits = MODEL(x, edge_index)
-        preds = logits.argmax(dim=1).tolist()
-    labels = [CATEGORIES[p] for p in preds]
+    if not req.node_ids:
+        return PredictResponse(predictions=[])
+    rows = STORE.rows(req.node_ids)
+    if (rows < 0).any():
+        unknown = [n for n, r in zip(req.node_ids, rows) if r < 0]
+        raise HTTPException(status_code=404, detail=f"Nós desconhecidos: {unknown[:10]}")
+    # só os nós fora do cache vão para o modelo
+    version = MODEL_VERSION
+    labels = CACHE.get_many(version, rows.tolist())
+    missing = [r for r, label in zip(rows.tolist(), labels) if label is None]
+    if missing:
+        try:
+            if BATCHER is not None:
+                computed = await BATCHER.submit(missing)
+            else:
+                computed = await EXECUTOR.run(predict_rows, np.asarray(missing))
+        except Overloaded as exc:
+            raise overloaded(exc)
+        CACHE.put_many(version, missing, computed)
+        fresh = iter(computed)
+        labels = [label if label is not None else next(fresh) for label in labels]
     return PredictResponse(predictions=labels)
 
 
+@app.get("/recommend", response_model=RecommendResponse)
+async def recommend(
+    node_id: int,
+    k: int = Query(10, ge=1, le=1000),
+    category: Optional[List[str]] = Query(None),
+    nprobe: Optional[int] = Query(None, ge=1),
+):
+    """Os ``k`` nós mais similares a ``node_id`` no índice ANN, opcionalmente filtrados por categoria."""
+    if INDEX is None:
+        raise HTTPException(status_code=503, detail=f"Índice ANN não encontrado em {ANN_INDEX_PATH}")
+    try:
+        query = INDEX.vector_of(node_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Nó {node_id} não está no índice")
+    try:
+        ids, scores = await EXECUTOR.run(
+            lambda: INDEX.search(query, k=k, nprobe=nprobe or ANN_NPROBE, categories=category, exclude_ids=[node_id])
+        )
+    except KeyError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except Overloaded as exc:
+        raise overloaded(exc)
+    codes = INDEX.codes[INDEX.positions(ids)]
+    items = [
+        RecommendedItem(
+            node_id=int(i), score=float(s), category=INDEX.categories[c] if c >= 0 and INDEX.categories else None
+        )
+        for i, s, c in zip(ids, scores, codes)
+    ]
+    return RecommendResponse(node_id=node_id, items=items)
+
+
+@app.get("/health")
+async def health():
+    """Responde no loop de eventos, sem passar pela fila de inferência."""
+    ready = MODEL is not None and EXTRACTOR is not None and EXECUTOR is not None
+    return {
+        "status": "ok" if ready else "starting",
+        "ann_index": None if INDEX is None else {
+            "store_version": INDEX.meta.get("store_version"),
+            "stale": ann_index_stale(INDEX, STORE),
+        },
+        "inference": EXECUTOR.stats() if EXECUTOR is not None else None,
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas Prometheus (lotes do ``/predict``, fila de inferência e cache de predições)."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/stats")
+async def stats():
+    """Contadores do cache de subgrafos e do cache de predições."""
+    if EXTRACTOR is None:
+        raise HTTPException(status_code=500, detail="Grafo não carregado")
+    return {
+        "store_version": STORE.version,
+        "model_version": MODEL_VERSION,
+        "subgraph_cache": EXTRACTOR.stats(),
+        "prediction_cache": CACHE.stats(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,125 @@
+"""
+architectures.py
+----------------
+
+Topologias das arquiteturas comparadas no relatório de simulação
+(``deliverable/sim/report.ipynb``): a arquitetura Legada (região única, com
+SPOFs) e a Resiliente (multirregião, réplicas e fallback).  Os grafos são os
+mesmos do notebook; além disso, cada nó resiliente informa o componente
+lógico da arquitetura Legada que substitui (``component``) e o índice da
+réplica (``replica``: 0 na região primária, 1 na secundária).  Essa
+correspondência permite que experimentos pareados usem os mesmos números
+aleatórios para o "mesmo" componente nas duas arquiteturas.
+
+As arestas seguem a convenção de ``data/graph.json`` (``u -> v``: ``u``
+depende de ``v``) e têm ``type`` ``depends_on``, ``calls`` ou ``replicates``
+(pares primário/secundário da arquitetura Resiliente), usados pela
+propagação por tipo de ``network_failure_sim``.
+
+Exemplo:
+
+```python
+from sim.architectures import ARCHITECTURES, critical_nodes
+
+G = ARCHITECTURES["resilient"]()
+print(len(G), sorted(critical_nodes(G))[:3])
+```
+"""
+
+from typing import Callable, Dict, Hashable, Set, Tuple
+
+import networkx as nx
+
+
+def create_legacy_graph() -> nx.DiGraph:
+    """Cria o grafo da arquitetura Legada (Single-Region, SPOF)."""
+    G = nx.DiGraph()
+    # nós críticos (todos em us-east-1, como no main.tf)
+    G.add_node("mlflow_tracker", region="us-east-1", type="critical_control")
+    G.add_node("grafana_core", region="us-east-1", type="critical_control")
+    G.add_node("reco_engine", region="us-east-1", type="critical_ia")
+    G.add_node("llm_router", region="us-east-1", type="critical_ia")
+    G.add_node("telemetry_gateway", region="us-east-1", type="critical_ingest")
+    G.add_node("rds_db", region="us-east-1", type="critical_data")
+    # nós de borda
+    G.add_node("edge_device_1", region="edge", type="edge")
+    G.add_node("edge_device_2", region="edge", type="edge")
+    G.add_edge("edge_device_1", "telemetry_gateway", type="calls")
+    G.add_edge("edge_device_2", "telemetry_gateway", type="calls")
+    G.add_edge("telemetry_gateway", "rds_db", type="depends_on")
+    G.add_edge("telemetry_gateway", "grafana_core", type="calls")
+    G.add_edge("telemetry_gateway", "reco_engine", type="calls")
+    G.add_edge("reco_engine", "rds_db", type="depends_on")
+    G.add_edge("reco_engine", "mlflow_tracker", type="depends_on")
+    G.add_edge("llm_router", "reco_engine", type="calls")
+    G.add_edge("grafana_core", "rds_db", type="depends_on")
+    return G
+
+
+def create_resilient_graph() -> nx.DiGraph:
+    """Cria o grafo da arquitetura Resiliente (Multi-Region, HA, Fallback)."""
+    G = nx.DiGraph()
+    # região primária (us-east-1)
+    G.add_node("reco_engine_p", region="us-east-1", type="critical_ia", has_fallback=True,
+               component="reco_engine", replica=0)
+    G.add_node("llm_router_p", region="us-east-1", type="critical_ia", has_fallback=True,
+               component="llm_router", replica=0)
+    G.add_node("telemetry_gateway_p", region="us-east-1", type="critical_ingest", has_circuit_breaker=True,
+               component="telemetry_gateway", replica=0)
+    G.add_node("grafana_core_p", region="us-east-1", type="critical_control", replicas=3,
+               component="grafana_core", replica=0)
+    # região secundária (us-west-2)
+    G.add_node("reco_engine_s", region="us-west-2", type="critical_ia", has_fallback=True,
+               component="reco_engine", replica=1)
+    G.add_node("llm_router_s", region="us-west-2", type="critical_ia", has_fallback=True,
+               component="llm_router", replica=1)
+    G.add_node("grafana_core_s", region="us-west-2", type="critical_control", replicas=3,
+               component="grafana_core", replica=1)
+    # recursos globais / Multi-AZ / replicados
+    G.add_node("kafka_buffer", region="global", type="critical_buffer")
+    G.add_node("rds_db_multi_az", region="global", type="critical_data", replicas=2, component="rds_db")
+    G.add_node("mlflow_s3_crr", region="global", type="critical_data", replicas=2, component="mlflow_tracker")
+    # nós de borda
+    G.add_node("edge_device_1", region="edge", type="edge")
+    G.add_node("edge_device_2", region="edge", type="edge")
+    G.add_edge("edge_device_1", "kafka_buffer", type="calls")
+    G.add_edge("edge_device_2", "kafka_buffer", type="calls")
+    G.add_edge("telemetry_gateway_p", "kafka_buffer", type="depends_on")
+    G.add_edge("reco_engine_p", "rds_db_multi_az", type="depends_on")
+    G.add_edge("reco_engine_p", "mlflow_s3_crr", type="depends_on")
+    G.add_edge("reco_engine_s", "rds_db_multi_az", type="depends_on")
+    G.add_edge("reco_engine_s", "mlflow_s3_crr", type="depends_on")
+    # roteamento primário -> secundário (links de failover)
+    G.add_edge("llm_router_p", "reco_engine_p", type="calls")
+    G.add_edge("llm_router_p", "reco_engine_s", type="calls")
+    G.add_edge("llm_router_s", "reco_engine_s", type="calls")
+    G.add_edge("llm_router_s", "reco_engine_p", type="calls")
+    G.add_edge("grafana_core_p", "rds_db_multi_az", type="depends_on")
+    G.add_edge("grafana_core_s", "rds_db_multi_az", type="depends_on")
+    # réplicas ativas entre regiões (failover)
+    G.add_edge("reco_engine_p", "reco_engine_s", type="replicates")
+    G.add_edge("llm_router_p", "llm_router_s", type="replicates")
+    G.add_edge("grafana_core_p", "grafana_core_s", type="replicates")
+    return G
+
+
+ARCHITECTURES: Dict[str, Callable[[], nx.DiGraph]] = {
+    "legacy": create_legacy_graph,
+    "resilient": create_resilient_graph,
+}
+
+
+def critical_nodes(G: nx.DiGraph) -> Set[Hashable]:
+    """Nós críticos (IA, dados, controle): ``type`` começa com ``critical``."""
+    return {n for n, d in G.nodes(data=True) if d.get("type", "").startswith("critical")}
+
+
+def node_draw_key(G: nx.DiGraph, node: Hashable) -> Tuple[str, Hashable, int]:
+    """Chave do número aleatório de falha inicial de ``node``: ``(componente, réplica)``."""
+    attr = G.nodes[node]
+    return ("node", attr.get("component", node), attr.get("replica", 0))
+
+
+def edge_draw_key(G: nx.DiGraph, u: Hashable, v: Hashable) -> Tuple[str, Tuple, Tuple]:
+    """Chave da moeda de propagação da aresta ``u -> v`` entre componentes lógicos."""
+    return ("edge", node_draw_key(G, u)[1:], node_draw_key(G, v)[1:])
@@ -8,23 +8,44 @@ exponencial e tempo de serviço exponencial.  Pode-se ajustar a capacidade do
 servidor (número de atendentes) para ver como o backlog evolui e medir o
 tempo médio de espera.
 
+Para parâmetros estáveis de uma fila M/M/c o tempo médio de espera em regime
+estacionário possui forma fechada (fórmula de Erlang C).  A função
+``estimate_backpressure`` utiliza esse atalho analítico quando as hipóteses do
+modelo são válidas e recorre à simulação SimPy nos demais casos (horizonte
+transitório, fila limitada ou sistema instável).  O campo ``method`` de cada
+resultado indica qual caminho o produziu.
+
 Exemplo:
 
 ```python
-from sim.backpressure_sim import simulate_backpressure
+from sim.backpressure_sim import estimate_backpressure, simulate_backpressure
 metrics = simulate_backpressure(arrival_rate=5.0, service_rate=6.0, capacity=2, sim_time=1000)
 print(metrics)
+fast = estimate_backpressure(arrival_rate=5.0, service_rate=6.0, capacity=2, sim_time=1000)
+print(fast["method"], fast["avg_wait"])
 ```
 
 """
 
+import math
 import random
-from typing import Dict
+from typing import Dict, Optional, Union
 
 import simpy
 
+# Número mínimo de tempos de relaxação contidos no horizonte simulado para que
+# a média estacionária (Erlang C) represente bem a média observada.
+MIN_RELAXATION_MULTIPLE = 10.0
+
 
-def simulate_backpressure(arrival_rate: float, service_rate: float, capacity: int, sim_time: float) -> Dict[str, float]:
+def simulate_backpressure(
+    arrival_rate: float,
+    service_rate: float,
+    capacity: int,
+    sim_time: float,
+    queue_limit: Optional[int] = None,
+    rng: Optional[random.Random] = None,
+) -> Dict[str, float]:
     """Executa uma simulação de fila M/M/c.
 
     Args:
@@ -32,33 +53,43 @@ def simulate_backpressure(arrival_rate: float, service_rate: float, capacity: in
         service_rate: taxa média de atendimento (mu) por atendente.
         capacity: número de atendentes (servidores) simultâneos.
         sim_time: tempo total de simulação.
+        queue_limit: tamanho máximo da fila de espera.  ``None`` significa
+            fila ilimitada; quando definido, chegadas com a fila cheia são
+            rejeitadas.
+        rng: gerador aleatório dedicado; por padrão usa o módulo global
+            ``random``.
 
     Returns:
         Dicionário com métricas: tempo médio de espera, tempo máximo de espera,
-        número total de requisições processadas e número total de rejeições (caso
-        a fila esteja cheia; neste modelo não há limite de fila, portanto
-        rejeições = 0).
+        número total de requisições processadas e número total de rejeições
+        (sempre 0 quando ``queue_limit`` é ``None``).
     """
+    expovariate = rng.expovariate if rng is not None else random.expovariate
     env = simpy.Environment()
     server = simpy.Resource(env, capacity)
     wait_times = []
     completed = 0
+    dropped = 0
 
     def arrival_generator():
-        nonlocal completed
+        nonlocal dropped
         while True:
             # aguarda tempo entre chegadas
-            yield env.timeout(random.expovariate(arrival_rate))
+            yield env.timeout(expovariate(arrival_rate))
+            if queue_limit is not None and len(server.queue) >= queue_limit:
+                dropped += 1
+                continue
             env.process(handle_request())
 
     def handle_request():
+        nonlocal completed
         arrive_time = env.now
         with server.request() as req:
             yield req
             wait = env.now - arrive_time
             wait_times.append(wait)
             # tempo de serviço exponencial
-            service_time = random.expovariate(service_rate)
+            service_time = expovariate(service_rate)
             yield env.timeout(service_time)
             completed += 1
 
@@ -70,5 +101,116 @@ def simulate_backpressure(arrival_rate: float, service_rate: float, capacity: in
         "avg_wait": avg_wait,
         "max_wait": max_wait,
         "completed": completed,
+        "dropped": dropped,
+    }
+
+
+def erlang_c(arrival_rate: float, service_rate: float, capacity: int) -> float:
+    """Probabilidade de espera (Erlang C) de uma fila M/M/c estável.
+
+    Usa a recursão de Erlang B, numericamente estável mesmo para ``capacity``
+    grande, e converte o resultado para Erlang C.
+    """
+    offered_load = arrival_rate / service_rate
+    rho = offered_load / capacity
+    if rho >= 1.0:
+        raise ValueError(f"Fila instável: utilização {rho:.3f} >= 1")
+    erlang_b = 1.0
+    for k in range(1, capacity + 1):
+        erlang_b = offered_load * erlang_b / (k + offered_load * erlang_b)
+    return erlang_b / (1.0 - rho * (1.0 - erlang_b))
+
+
+def relaxation_time(arrival_rate: float, service_rate: float, capacity: int) -> float:
+    """Tempo de relaxação aproximado de uma fila M/M/c partindo vazia.
+
+    Aproximação de heavy traffic ``1 / (sqrt(c * mu) - sqrt(lambda))^2``, que
+    coincide com o resultado exato de Morse para ``c = 1``.
+    """
+    gap = math.sqrt(capacity * service_rate) - math.sqrt(arrival_rate)
+    return math.inf if gap <= 0 else 1.0 / gap ** 2
+
+
+def analytic_backpressure(
+    arrival_rate: float, service_rate: float, capacity: int, sim_time: float
+) -> Dict[str, float]:
+    """Métricas estacionárias de uma fila M/M/c pela fórmula de Erlang C.
+
+    ``avg_wait`` é a espera média exata ``C / (c * mu - lambda)``.  Como a
+    espera condicionada a haver fila é exponencial, ``max_wait`` é estimado
+    pelo quantil ``1 - 1/n`` da distribuição de espera, com ``n`` chegadas
+    esperadas no horizonte ``sim_time``.  ``completed`` é a vazão esperada.
+    """
+    prob_wait = erlang_c(arrival_rate, service_rate, capacity)
+    drain_rate = capacity * service_rate - arrival_rate
+    expected_arrivals = arrival_rate * sim_time
+    tail_mass = prob_wait * expected_arrivals
+    return {
+        "avg_wait": prob_wait / drain_rate,
+        "max_wait": math.log(tail_mass) / drain_rate if tail_mass > 1.0 else 0.0,
+        "completed": int(round(expected_arrivals)),
         "dropped": 0,
-    }
\ No newline at end of file
+    }
+
+
+def analytic_applicable(
+    arrival_rate: float,
+    service_rate: float,
+    capacity: int,
+    sim_time: float,
+    queue_limit: Optional[int] = None,
+) -> bool:
+    """Indica se as hipóteses do atalho Erlang C valem para os parâmetros.
+
+    Exige fila ilimitada, sistema estável (``lambda < c * mu``) e um horizonte
+    de pelo menos ``MIN_RELAXATION_MULTIPLE`` tempos de relaxação, de modo que
+    o transitório inicial (fila vazia) não distorça a média.
+    """
+    if queue_limit is not None or capacity < 1 or arrival_rate <= 0 or service_rate <= 0:
+        return False
+    if arrival_rate >= capacity * service_rate:
+        return False
+    return sim_time >= MIN_RELAXATION_MULTIPLE * relaxation_time(arrival_rate, service_rate, capacity)
+
+
+def estimate_backpressure(
+    arrival_rate: float,
+    service_rate: float,
+    capacity: int,
+    sim_time: float,
+    queue_limit: Optional[int] = None,
+    method: str = "auto",
+    rng: Optional[random.Random] = None,
+) -> Dict[str, Union[float, str]]:
+    """Calcula métricas de fila usando Erlang C quando possível.
+
+    Args:
+        arrival_rate: taxa média de chegadas (lambda) por unidade de tempo.
+        service_rate: taxa média de atendimento (mu) por atendente.
+        capacity: número de atendentes (servidores) simultâneos.
+        sim_time: tempo total de simulação.
+        queue_limit: tamanho máximo da fila (``None`` = ilimitada).
+        method: ``"auto"`` escolhe o caminho analítico quando
+            ``analytic_applicable`` é verdadeiro e simula caso contrário;
+            ``"analytic"`` força Erlang C (erro se as hipóteses não valem) e
+            ``"simulation"`` força a simulação SimPy.
+        rng: gerador aleatório repassado à simulação.
+
+    Returns:
+        As mesmas métricas de ``simulate_backpressure`` acrescidas da chave
+        ``method`` (``"analytic"`` ou ``"simulation"``).
+    """
+    if method not in ("auto", "analytic", "simulation"):
+        raise ValueError(f"Método desconhecido: {method}")
+    applicable = analytic_applicable(arrival_rate, service_rate, capacity, sim_time, queue_limit)
+    if method == "analytic" and not applicable:
+        raise ValueError("Hipóteses do modelo Erlang C não são satisfeitas para estes parâmetros")
+    if method != "simulation" and applicable:
+        metrics: Dict[str, Union[float, str]] = dict(
+            analytic_backpressure(arrival_rate, service_rate, capacity, sim_time)
+        )
+        metrics["method"] = "analytic"
+    else:
+        metrics = dict(simulate_backpressure(arrival_rate, service_rate, capacity, sim_time, queue_limit, rng))
+        metrics["method"] = "simulation"
+    return metrics
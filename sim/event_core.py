@@ -0,0 +1,68 @@
+"""
+event_core.py
+-------------
+
+Núcleo mínimo de simulação de eventos discretos baseado em heap binário.
+Diferente do SimPy, não há corrotinas nem objetos por evento: cada evento é
+uma tupla ``(tempo, seq, tipo, a, b)`` e o despacho é feito por índice em uma
+tupla de handlers.  Isso reduz o custo por evento a algumas operações de heap,
+permitindo simular milhões de requisições em redes com milhares de filas.
+
+Exemplo:
+
+```python
+from sim.event_core import EventCore
+
+core = EventCore()
+log = []
+core.schedule(1.5, 0, 42)
+core.run(until=10.0, handlers=(lambda a, b: log.append((core.now, a)),))
+print(log)  # [(1.5, 42)]
+```
+"""
+
+from heapq import heappop, heappush
+from typing import Callable, List, Sequence, Tuple
+
+Handler = Callable[[int, int], None]
+
+
+class EventCore:
+    """Agenda de eventos ordenada por tempo com desempate FIFO."""
+
+    __slots__ = ("now", "processed", "_heap", "_seq")
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.processed = 0
+        self._heap: List[Tuple[float, int, int, int, int]] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, delay: float, kind: int, a: int = 0, b: int = 0) -> None:
+        """Agenda um evento do tipo ``kind`` para ``now + delay``.
+
+        ``a`` e ``b`` são inteiros repassados ao handler (tipicamente índices
+        de fila e de requisição).
+        """
+        self._seq += 1
+        heappush(self._heap, (self.now + delay, self._seq, kind, a, b))
+
+    def run(self, until: float, handlers: Sequence[Handler]) -> None:
+        """Processa eventos em ordem até ``until`` ou até esgotar a agenda.
+
+        Eventos agendados para depois de ``until`` permanecem na agenda, de
+        modo que ``run`` pode ser chamado novamente para estender o horizonte.
+        """
+        heap = self._heap
+        processed = 0
+        while heap and heap[0][0] <= until:
+            time, _, kind, a, b = heappop(heap)
+            self.now = time
+            handlers[kind](a, b)
+            processed += 1
+        self.processed += processed
+        if until != float("inf"):
+            self.now = until
@@ -0,0 +1,201 @@
+"""
+graph_csr.py
+------------
+
+Representação compacta (CSR) de grafos direcionados para os kernels
+vetorizados.  Os nós são numerados de ``0`` a ``N-1`` na ordem de inserção do
+grafo; os sucessores do nó ``i`` são ``indices[indptr[i]:indptr[i + 1]]``.
+Cada aresta guarda o código do seu tipo (atributo ``type`` em
+``data/graph.json``) e cada nó o código da sua categoria, de modo que
+simulações e o pipeline de ML possam ler o mesmo arquivo ``.npz`` sem
+reconstruir o grafo NetworkX.
+
+``compile_propagation`` separa as arestas em camadas CSR por tipo, já na
+direção em que a falha se propaga e com a probabilidade de cada tipo, além
+dos pares de réplicas usados no failover; os kernels em lote de
+``scenario_engine`` percorrem essas camadas sem consultar atributos.
+
+Uso:
+
+```bash
+python -m sim.graph_csr --graph-path data/graph.json --output data/graph.csr.npz
+```
+"""
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Hashable, List, Mapping, Optional
+
+import networkx as nx
+import numpy as np
+
+
+@dataclass
+class GraphCSR:
+    """Grafo em CSR com códigos de categoria dos nós e de tipo das arestas."""
+
+    nodes: List[Hashable]
+    indptr: np.ndarray
+    indices: np.ndarray
+    node_category: np.ndarray
+    categories: List[str]
+    edge_type: np.ndarray
+    edge_types: List[str]
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    @property
+    def src(self) -> np.ndarray:
+        """Origem de cada aresta (mesma ordem de ``indices``)."""
+        return np.repeat(np.arange(self.num_nodes, dtype=self.indices.dtype), np.diff(self.indptr))
+
+    def index(self) -> Dict[Hashable, int]:
+        return {n: i for i, n in enumerate(self.nodes)}
+
+    def mask(self, nodes) -> np.ndarray:
+        """Máscara booleana ``(N,)`` dos nós informados."""
+        index = self.index()
+        out = np.zeros(self.num_nodes, dtype=bool)
+        out[[index[n] for n in nodes]] = True
+        return out
+
+
+@dataclass
+class PropagationLayer:
+    """Arestas de um tipo em CSR: a falha exposta de ``i`` atinge ``indices[indptr[i]:indptr[i + 1]]``."""
+
+    edge_type: str
+    indptr: np.ndarray
+    indices: np.ndarray
+    p: float
+
+    @property
+    def src(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.indptr) - 1, dtype=self.indices.dtype), np.diff(self.indptr))
+
+
+@dataclass
+class CompiledPropagation:
+    """Camadas de propagação e pares ``(nó, réplica)`` (nos dois sentidos)."""
+
+    layers: List[PropagationLayer]
+    replica_node: np.ndarray
+    replica_peer: np.ndarray
+
+
+def _layer(edge_type: str, src: np.ndarray, dst: np.ndarray, num_nodes: int, p: float) -> PropagationLayer:
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+    return PropagationLayer(edge_type, indptr, dst[order].astype(np.int32), p)
+
+
+def compile_propagation(
+    csr: GraphCSR,
+    p_propagate: float,
+    edge_probs: Optional[Mapping[str, float]] = None,
+    replication_edge: str = "replicates",
+) -> CompiledPropagation:
+    """Pré-compila as regras de propagação de ``network_failure_sim.simulate_failure``.
+
+    Sem ``edge_probs`` há uma única camada com todas as arestas no sentido
+    ``u -> v``.  Com ``edge_probs`` cada tipo vira uma camada invertida (a
+    falha de ``v`` atinge ``u``), tipos com probabilidade nula são omitidos e
+    as arestas ``replication_edge`` viram pares de failover.
+    """
+    src, dst, n = csr.src, csr.indices, csr.num_nodes
+    if edge_probs is None:
+        return CompiledPropagation([_layer("*", src, dst, n, p_propagate)], np.empty(0, np.int32), np.empty(0, np.int32))
+    layers = []
+    replica_node, replica_peer = np.empty(0, np.int32), np.empty(0, np.int32)
+    for code, edge_type in enumerate(csr.edge_types):
+        sel = csr.edge_type == code
+        if edge_type == replication_edge:
+            replica_node = np.concatenate([src[sel], dst[sel]]).astype(np.int32)
+            replica_peer = np.concatenate([dst[sel], src[sel]]).astype(np.int32)
+            continue
+        p = edge_probs.get(edge_type, p_propagate)
+        if p > 0.0 and sel.any():
+            layers.append(_layer(edge_type, dst[sel], src[sel], n, p))
+    return CompiledPropagation(layers, replica_node, replica_peer)
+
+
+def from_networkx(G: nx.DiGraph, category_attr: str = "category", edge_type_attr: str = "type") -> GraphCSR:
+    """Converte um ``DiGraph`` para CSR (atributos ausentes viram ``""``)."""
+    nodes = list(G.nodes)
+    index = {n: i for i, n in enumerate(nodes)}
+    categories = sorted({str(G.nodes[n].get(category_attr, "")) for n in nodes})
+    cat_code = {c: i for i, c in enumerate(categories)}
+    edge_types = sorted({str(d.get(edge_type_attr, "")) for _, _, d in G.edges(data=True)})
+    type_code = {t: i for i, t in enumerate(edge_types)}
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    indices: List[int] = []
+    types: List[int] = []
+    for i, n in enumerate(nodes):
+        succ = sorted(G.successors(n), key=index.get)
+        indices.extend(index[v] for v in succ)
+        types.extend(type_code[str(G.edges[n, v].get(edge_type_attr, ""))] for v in succ)
+        indptr[i + 1] = len(indices)
+    return GraphCSR(
+        nodes=nodes,
+        indptr=indptr,
+        indices=np.asarray(indices, dtype=np.int32),
+        node_category=np.asarray([cat_code[str(G.nodes[n].get(category_attr, ""))] for n in nodes], dtype=np.int16),
+        categories=categories,
+        edge_type=np.asarray(types, dtype=np.int8),
+        edge_types=edge_types,
+    )
+
+
+def save_npz(csr: GraphCSR, path: Path) -> None:
+    """Grava o CSR em ``.npz`` (sem pickle)."""
+    ids = np.asarray(csr.nodes)
+    if ids.dtype.kind not in "iu":
+        ids = ids.astype(str)
+    np.savez_compressed(
+        path,
+        nodes=ids,
+        indptr=csr.indptr,
+        indices=csr.indices,
+        node_category=csr.node_category,
+        categories=np.asarray(csr.categories, dtype=str),
+        edge_type=csr.edge_type,
+        edge_types=np.asarray(csr.edge_types, dtype=str),
+    )
+
+
+def load_npz(path: Path) -> GraphCSR:
+    """Lê um CSR gravado por ``save_npz``."""
+    with np.load(path, allow_pickle=False) as data:
+        return GraphCSR(
+            nodes=data["nodes"].tolist(),
+            indptr=data["indptr"],
+            indices=data["indices"],
+            node_category=data["node_category"],
+            categories=data["categories"].tolist(),
+            edge_type=data["edge_type"],
+            edge_types=data["edge_types"].tolist(),
+        )
+
+
+def main() -> None:
+    from .monte_carlo_resilience import load_graph
+
+    parser = argparse.ArgumentParser(description="Converte um grafo JSON para CSR (.npz)")
+    parser.add_argument("--graph-path", type=Path, default=Path("data/graph.json"), help="Grafo JSON de entrada")
+    parser.add_argument("--output", type=Path, default=Path("data/graph.csr.npz"), help="Arquivo .npz de saída")
+    args = parser.parse_args()
+    csr = from_networkx(load_graph(args.graph_path))
+    save_npz(csr, args.output)
+    print(f"{csr.num_nodes} nós e {csr.num_edges} arestas gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,21 +21,60 @@ python sim/monte_carlo_resilience.py \
   --output-html sim_plots.html
 ```
 
+Com ``--workers N`` as tarefas ``(p_node, capacity, simulação)`` são executadas
+em um pool de processos.  Cada tarefa é semeada por uma ``SeedSequence``
+derivada de ``--seed``, logo o CSV é idêntico para qualquer número de
+processos.
+
+As tentativas de falha (que dependem apenas de ``p_node``) e de fila (que
+dependem apenas da capacidade) são simuladas separadamente e memorizadas pela
+tupla de parâmetros; com ``--cache-dir`` os resultados persistem em disco e
+varreduras repetidas reaproveitam o trabalho anterior.
+
+Os resultados são gravados em lotes (``--batch-size``) em um CSV append-only
+acompanhado de um manifesto ``<csv>.manifest.json``.  Se a execução for
+interrompida, ``--resume`` retoma a partir do último lote confirmado, pulando
+as tarefas já concluídas.
+
+No modo ``--adaptive`` cada célula ``(p_node, capacity)`` começa com
+``--n-sims`` tentativas piloto e continua amostrando até que a meia-largura do
+intervalo de confiança de ``--ci-metrics`` atinja ``--ci-target`` (ou até
+esgotar ``--max-total-sims``); o orçamento de cada rodada vai para as células
+mais imprecisas.  Um resumo por célula é salvo em ``<csv>.cells.csv``.
+
+Com ``--queue-db`` o script atua como coordenador: as sub-simulações são
+enfileiradas em uma tabela SQLite e executadas por workers
+(``python -m sim.work_queue worker --db ...``) em um ou mais hosts, com
+reatribuição de lotes cujo worker parou de enviar heartbeats.
+``--spawn-workers N`` inicia ``N`` workers locais junto com o coordenador.
+
 Dependências: networkx, simpy, pandas, numpy, plotly.
 """
 
 import argparse
+import hashlib
 import json
+import os
 import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Hashable, Iterator, List, Optional, Set, Tuple
 
 import networkx as nx
+import numpy as np
 import pandas as pd
-import plotly.express as px
 
 from .network_failure_sim import simulate_failure
-from .backpressure_sim import simulate_backpressure
+from .plot_aggregation import aggregate_csv, aggregate_frame, write_report
+from .backpressure_sim import analytic_applicable, estimate_backpressure
+from .result_cache import ResultCache, key_digest
+from .result_sink import CsvResultSink
+from .sequential_stopping import RunningStats, allocate_samples, precision_ratio
+from .work_queue import SqliteWorkQueueExecutor, WorkQueue
 
 
 def load_graph(graph_path: Path) -> nx.DiGraph:
@@ -50,6 +89,241 @@ def load_graph(graph_path: Path) -> nx.DiGraph:
     return G
 
 
+def graph_fingerprint(G: nx.DiGraph) -> str:
+    """Resumo estável da topologia e das categorias, usado nas chaves de cache."""
+    digest = hashlib.sha256()
+    for n, attr in sorted(G.nodes(data="category"), key=lambda item: repr(item[0])):
+        digest.update(repr((n, attr)).encode("utf-8"))
+    for u, v in sorted(G.edges, key=repr):
+        digest.update(repr((u, v)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def task_rng(entropy: int, key: Tuple[Hashable, ...]) -> random.Random:
+    """Cria o gerador de uma sub-simulação a partir de uma ``SeedSequence`` derivada.
+
+    O fluxo é identificado pelo resumo da chave de parâmetros (``spawn_key``),
+    de modo que o resultado não depende da ordem de execução, do número de
+    processos nem de quais outras combinações fazem parte da varredura.
+    """
+    spawn_key = (int(key_digest(key)[:16], 16),)
+    state = np.random.SeedSequence(entropy, spawn_key=spawn_key).generate_state(4)
+    return random.Random(int.from_bytes(state.tobytes(), "little"))
+
+
+# Estado compartilhado pelas tarefas de um processo (definido pelo initializer do pool)
+_TASK_CONTEXT: Dict[str, object] = {}
+
+
+def _init_task_context(G: nx.DiGraph, params: Dict[str, object]) -> None:
+    _TASK_CONTEXT["graph"] = G
+    _TASK_CONTEXT["user_nodes"] = {n for n, attr in G.nodes(data=True) if attr.get("category") == "user"}
+    _TASK_CONTEXT.update(params)
+
+
+def _run_subsimulation(key: Tuple[Hashable, ...]) -> Dict[str, object]:
+    """Executa a sub-simulação descrita por ``key`` (falha em grafo ou fila)."""
+    ctx = _TASK_CONTEXT
+    rng = task_rng(ctx["entropy"], key)
+    if key[0] == "failure":
+        _, _, p_node, p_propagate, _, _ = key
+        user_nodes = ctx["user_nodes"]
+        recovery_time, failed = simulate_failure(ctx["graph"], p_node, p_propagate, rng=rng)
+        # calcula percentual de usuários impactados
+        impacted_users = len(user_nodes & failed)
+        return {
+            "recovery_time": recovery_time,
+            "failed_nodes": len(failed),
+            "user_impact_pct": impacted_users / len(user_nodes) * 100 if user_nodes else 0.0,
+        }
+    _, arrival_rate, service_rate, capacity, sim_time, method, _, _ = key
+    # métricas de backpressure (Erlang C quando aplicável)
+    metrics = estimate_backpressure(arrival_rate, service_rate, capacity, sim_time, method=method, rng=rng)
+    return {"avg_wait": metrics["avg_wait"], "max_wait": metrics["max_wait"], "queue_method": metrics["method"]}
+
+
+class ProgressReporter:
+    """Exibe progresso, vazão (simulações/s) e ETA em ``stderr``."""
+
+    def __init__(self, total: int, enabled: bool = True, interval: float = 0.5):
+        self.total = total
+        self.enabled = enabled
+        self.interval = interval
+        self.done = 0
+        self._start = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, n: int = 1) -> None:
+        self.done += n
+        now = time.perf_counter()
+        if self.enabled and (now - self._last >= self.interval or self.done >= self.total):
+            self._last = now
+            elapsed = now - self._start
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            eta = (self.total - self.done) / rate if rate > 0 else float("inf")
+            sys.stderr.write(
+                f"\r[{self.done}/{self.total}] {self.done / max(self.total, 1):6.1%} "
+                f"{rate:,.1f} sims/s ETA {eta:,.0f}s"
+            )
+            if self.done >= self.total:
+                sys.stderr.write("\n")
+            sys.stderr.flush()
+
+
+class SubsimulationRunner:
+    """Executa e memoriza as sub-simulações de falha e de fila de uma varredura.
+
+    Mantém a entropia raiz, o cache e (quando ``workers > 1``) o pool de
+    processos, ou, com ``queue_db``, a fila SQLite atendida por workers
+    externos em lotes de ``task_batch`` chaves (veja ``work_queue``); monta as linhas de uma célula ``(p_node, capacity)`` para
+    quaisquer índices de tentativa.  Deve ser usado como gerenciador de
+    contexto para que o pool seja encerrado.
+    """
+
+    def __init__(
+        self,
+        G: nx.DiGraph,
+        p_propagate: float = 0.3,
+        arrival_rate: float = 10.0,
+        service_rate: float = 12.0,
+        queue_method: str = "auto",
+        seed: Optional[int] = None,
+        workers: int = 1,
+        cache: Optional[ResultCache] = None,
+        sim_time: float = 100.0,
+        queue_db: Optional[Path] = None,
+        task_batch: int = 32,
+    ):
+        self.G = G
+        self.p_propagate = p_propagate
+        self.arrival_rate = arrival_rate
+        self.service_rate = service_rate
+        self.queue_method = queue_method
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self.workers = workers
+        self.cache = cache if cache is not None else ResultCache()
+        self.sim_time = sim_time
+        self.queue_db = queue_db
+        self.task_batch = task_batch
+        self.fingerprint = graph_fingerprint(G)
+        self._stack = ExitStack()
+        self._pool = None
+
+    def __enter__(self) -> "SubsimulationRunner":
+        params = {"entropy": self.entropy}
+        if self.queue_db is not None:
+            executor = SqliteWorkQueueExecutor(self.queue_db, self.G, self.entropy)
+            self._stack.callback(executor.shutdown)
+            self._pool = executor
+        elif self.workers > 1:
+            self._pool = self._stack.enter_context(
+                ProcessPoolExecutor(max_workers=self.workers, initializer=_init_task_context, initargs=(self.G, params))
+            )
+        else:
+            _init_task_context(self.G, params)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._stack.close()
+        self._pool = None
+
+    def failure_key(self, p_node: float, i: int) -> Tuple[Hashable, ...]:
+        return ("failure", self.fingerprint, p_node, self.p_propagate, self.entropy, i)
+
+    def queue_key(self, capacity: int, i: int) -> Tuple[Hashable, ...]:
+        if self.queue_method != "simulation" and analytic_applicable(
+            self.arrival_rate, self.service_rate, capacity, self.sim_time
+        ):
+            i = 0  # resultado determinístico: uma única avaliação por capacidade
+        return ("queue", self.arrival_rate, self.service_rate, capacity, self.sim_time, self.queue_method, self.entropy, i)
+
+    def cell_rows(self, p_node: float, capacity: int, indices: List[int]) -> List[Dict[str, float]]:
+        """Linhas (sem ``simulation_id``) das tentativas ``indices`` de uma célula."""
+        keys = list(dict.fromkeys(
+            [self.failure_key(p_node, i) for i in indices] + [self.queue_key(capacity, i) for i in indices]
+        ))
+        done: Dict[Tuple[Hashable, ...], Dict[str, object]] = {}
+        pending = []
+        for key in keys:
+            cached = self.cache.get(key)
+            if cached is None:
+                pending.append(key)
+            else:
+                done[key] = cached
+        if self.queue_db is not None and pending:
+            computed = self._pool.map(_run_subsimulation, pending, chunksize=self.task_batch)
+        elif self._pool is not None and len(pending) > 1:
+            chunksize = max(1, len(pending) // (self.workers * 4))
+            computed = self._pool.map(_run_subsimulation, pending, chunksize=chunksize)
+        else:
+            computed = map(_run_subsimulation, pending)
+        for key, value in zip(pending, computed):
+            done[key] = value
+            self.cache.put(key, value)
+        rows = []
+        for i in indices:
+            failure = done[self.failure_key(p_node, i)]
+            queue = done[self.queue_key(capacity, i)]
+            rows.append({
+                "p_node": p_node,
+                "capacity": capacity,
+                "recovery_time": failure["recovery_time"],
+                "failed_nodes": failure["failed_nodes"],
+                "user_impact_pct": failure["user_impact_pct"],
+                "avg_wait": queue["avg_wait"],
+                "max_wait": queue["max_wait"],
+                "queue_method": queue["queue_method"],
+            })
+        return rows
+
+
+def iter_monte_carlo(
+    G: nx.DiGraph,
+    n_sims: int,
+    failure_probs: List[float],
+    capacities: List[int],
+    p_propagate: float = 0.3,
+    arrival_rate: float = 10.0,
+    service_rate: float = 12.0,
+    queue_method: str = "auto",
+    seed: Optional[int] = None,
+    workers: int = 1,
+    progress: bool = False,
+    cache: Optional[ResultCache] = None,
+    skip_ids: Optional[Set[int]] = None,
+    queue_db: Optional[Path] = None,
+) -> Iterator[Dict[str, float]]:
+    """Gera os resultados de ``monte_carlo`` célula a célula, em ordem de ``simulation_id``.
+
+    Cada célula ``(p_node, capacity)`` é emitida assim que suas
+    sub-simulações terminam, o que permite gravar resultados em lotes sem
+    manter a varredura inteira em memória.  Linhas cujo ``simulation_id``
+    está em ``skip_ids`` não são emitidas, e células totalmente puladas não
+    executam nenhuma sub-simulação (usado para retomar execuções).  Os demais
+    argumentos são descritos em ``monte_carlo``.
+    """
+    skip_ids = skip_ids or set()
+    total = len(failure_probs) * len(capacities) * n_sims
+    reporter = ProgressReporter(total - len(skip_ids & set(range(1, total + 1))), enabled=progress)
+    runner = SubsimulationRunner(
+        G, p_propagate, arrival_rate, service_rate, queue_method, seed=seed, workers=workers, cache=cache,
+        queue_db=queue_db,
+    )
+    with runner:
+        sim_id = 0
+        for p_node in failure_probs:
+            for capacity in capacities:
+                ids = range(sim_id + 1, sim_id + n_sims + 1)
+                sim_id += n_sims
+                wanted = [(i, sid) for i, sid in enumerate(ids) if sid not in skip_ids]
+                if not wanted:
+                    continue
+                rows = runner.cell_rows(p_node, capacity, [i for i, _ in wanted])
+                for (_, sid), row in zip(wanted, rows):
+                    yield {"simulation_id": sid, **row}
+                reporter.update(len(wanted))
+
+
 def monte_carlo(
     G: nx.DiGraph,
     n_sims: int,
@@ -58,9 +332,24 @@ def monte_carlo(
     p_propagate: float = 0.3,
     arrival_rate: float = 10.0,
     service_rate: float = 12.0,
+    queue_method: str = "auto",
+    seed: Optional[int] = None,
+    workers: int = 1,
+    progress: bool = False,
+    cache: Optional[ResultCache] = None,
+    queue_db: Optional[Path] = None,
 ) -> List[Dict[str, float]]:
     """Executa as simulações e retorna uma lista de resultados.
 
+    A propagação de falhas não depende da capacidade e a fila não depende de
+    ``p_node``; por isso cada linha ``(p_node, capacity, i)`` combina a
+    ``i``-ésima tentativa de falha de ``p_node`` com a ``i``-ésima tentativa de
+    fila de ``capacity``.  Cada sub-simulação é executada uma única vez, com um
+    gerador derivado de ``seed`` e da sua tupla de parâmetros, e memorizada em
+    ``cache``.  Quando o caminho analítico (Erlang C) se aplica, a fila é
+    calculada uma única vez por capacidade.  Os resultados são idênticos para
+    qualquer valor de ``workers``.
+
     Args:
         G: grafo de dependências.
         n_sims: número de simulações por combinação de parâmetros.
@@ -69,60 +358,149 @@ def monte_carlo(
         p_propagate: probabilidade de propagação da falha.
         arrival_rate: taxa média de chegada para a fila SimPy.
         service_rate: taxa média de serviço para cada atendente.
+        queue_method: caminho usado para as métricas de fila (``"auto"``,
+            ``"analytic"`` ou ``"simulation"``; veja ``estimate_backpressure``).
+        seed: semente raiz; ``None`` usa entropia do sistema operacional.
+        workers: número de processos; ``1`` executa no processo atual.
+        progress: exibe progresso, vazão e ETA em ``stderr``.
+        cache: cache de sub-simulações; ``None`` cria um cache em memória
+            restrito a esta chamada.
+        queue_db: arquivo SQLite da fila de trabalho; quando informado, as
+            sub-simulações são executadas por ``python -m sim.work_queue
+            worker`` (em um ou vários hosts) em vez de ``workers`` locais.
 
     Returns:
-        Lista de dicionários com métricas de cada simulação.
+        Lista de dicionários com métricas de cada simulação, ordenada por
+        ``simulation_id``.
     """
-    user_nodes = {n for n, attr in G.nodes(data=True) if attr.get("category") == "user"}
-    results: List[Dict[str, float]] = []
+    return list(
+        iter_monte_carlo(
+            G,
+            n_sims,
+            failure_probs,
+            capacities,
+            p_propagate=p_propagate,
+            arrival_rate=arrival_rate,
+            service_rate=service_rate,
+            queue_method=queue_method,
+            seed=seed,
+            workers=workers,
+            progress=progress,
+            cache=cache,
+            queue_db=queue_db,
+        )
+    )
+
+
+DEFAULT_CI_METRICS = ("user_impact_pct", "recovery_time", "avg_wait")
+
+
+def iter_adaptive_monte_carlo(
+    G: nx.DiGraph,
+    failure_probs: List[float],
+    capacities: List[int],
+    metrics: Tuple[str, ...] = DEFAULT_CI_METRICS,
+    target: float = 0.1,
+    relative: bool = True,
+    confidence: float = 0.95,
+    min_sims: int = 10,
+    batch_size: int = 10,
+    max_total_sims: int = 10000,
+    p_propagate: float = 0.3,
+    arrival_rate: float = 10.0,
+    service_rate: float = 12.0,
+    queue_method: str = "auto",
+    seed: Optional[int] = None,
+    workers: int = 1,
+    progress: bool = False,
+    cache: Optional[ResultCache] = None,
+    queue_db: Optional[Path] = None,
+) -> Iterator[Dict[str, float]]:
+    """Amostra cada célula ``(p_node, capacity)`` até atingir a precisão desejada.
+
+    Após ``min_sims`` tentativas piloto por célula, cada rodada calcula a
+    meia-largura do intervalo de confiança de ``metrics`` e distribui até
+    ``batch_size`` tentativas por célula ativa, concentrando o orçamento nas
+    células mais imprecisas (veja ``sequential_stopping.allocate_samples``).
+    A amostragem termina quando todas as células convergem ou quando
+    ``max_total_sims`` tentativas foram usadas.  As tentativas ``i`` de uma
+    célula são as mesmas de ``monte_carlo`` (mesma semente e cache), e os
+    ``simulation_id`` seguem a ordem de produção.
+
+    Args:
+        metrics: métricas cujo intervalo de confiança controla a parada.
+        target: meia-largura alvo; fração da média se ``relative`` for
+            verdadeiro, valor absoluto caso contrário.
+        confidence: nível de confiança do intervalo.
+        min_sims: tentativas piloto por célula.
+        batch_size: tentativas por célula ativa em cada rodada (orçamento da
+            rodada = ``batch_size`` x células ativas).
+        max_total_sims: orçamento total de tentativas.
+
+    Os demais argumentos são descritos em ``monte_carlo``.
+    """
+    cells = [(p_node, capacity) for p_node in failure_probs for capacity in capacities]
+    stats = {cell: {m: RunningStats() for m in metrics} for cell in cells}
+    counts = {cell: 0 for cell in cells}
+    reporter = ProgressReporter(max_total_sims, enabled=progress)
+    runner = SubsimulationRunner(
+        G, p_propagate, arrival_rate, service_rate, queue_method, seed=seed, workers=workers, cache=cache,
+        queue_db=queue_db,
+    )
+    used = 0
     sim_id = 0
-    for p_node in failure_probs:
-        for capacity in capacities:
-            for i in range(n_sims):
-                sim_id += 1
-                recovery_time, failed = simulate_failure(G, p_node, p_propagate)
-                # calcula percentual de usuários impactados
-                impacted_users = len(user_nodes & failed)
-                user_impact_pct = impacted_users / len(user_nodes) * 100 if user_nodes else 0.0
-                # simula backpressure
-                queue_metrics = simulate_backpressure(
-                    arrival_rate=arrival_rate,
-                    service_rate=service_rate,
-                    capacity=capacity,
-                    sim_time=100.0,
-                )
-                result = {
-                    "simulation_id": sim_id,
-                    "p_node": p_node,
-                    "capacity": capacity,
-                    "recovery_time": recovery_time,
-                    "failed_nodes": len(failed),
-                    "user_impact_pct": user_impact_pct,
-                    "avg_wait": queue_metrics["avg_wait"],
-                    "max_wait": queue_metrics["max_wait"],
-                }
-                results.append(result)
-    return results
+    pilot = max(1, min(min_sims, max_total_sims // len(cells)))
+    allocation = {cell: pilot for cell in cells}
+    with runner:
+        while allocation:
+            for cell, k in allocation.items():
+                start = counts[cell]
+                rows = runner.cell_rows(cell[0], cell[1], list(range(start, start + k)))
+                counts[cell] += k
+                used += k
+                for row in rows:
+                    for m in metrics:
+                        stats[cell][m].add(row[m])
+                    sim_id += 1
+                    yield {"simulation_id": sim_id, **row}
+                reporter.update(k)
+            remaining = max_total_sims - used
+            ratios = {cell: precision_ratio(stats[cell], target, relative, confidence) for cell in cells}
+            active = [cell for cell in cells if ratios[cell] > 1.0]
+            allocation = allocate_samples(ratios, counts, min(remaining, batch_size * len(active)))
+    reporter.total = used
+    reporter.update(0)
+
+
+def summarize_cells(
+    df: pd.DataFrame,
+    metrics: Tuple[str, ...] = DEFAULT_CI_METRICS,
+    target: float = 0.1,
+    relative: bool = True,
+    confidence: float = 0.95,
+) -> pd.DataFrame:
+    """Resume cada célula: tentativas, média e meia-largura de cada métrica e convergência."""
+    records = []
+    for (p_node, capacity), group in df.groupby(["p_node", "capacity"], sort=True):
+        stats = {m: RunningStats() for m in metrics}
+        record: Dict[str, object] = {"p_node": p_node, "capacity": capacity, "n_sims": len(group)}
+        for m in metrics:
+            stats[m].update(group[m].tolist())
+            record[f"{m}_mean"] = stats[m].mean
+            record[f"{m}_halfwidth"] = stats[m].halfwidth(confidence)
+        record["converged"] = precision_ratio(stats, target, relative, confidence) <= 1.0
+        records.append(record)
+    return pd.DataFrame(records)
 
 
 def generate_plots(df: pd.DataFrame, output_html: Path) -> None:
     """Gera gráficos interativos para explorar a distribuição das métricas.
 
-    Salva os gráficos em um único arquivo HTML contendo tabs para cada plot.
+    Os resultados são agregados antes da plotagem (histogramas com bins fixos,
+    densidade 2D e resumo por célula; veja ``plot_aggregation``), de modo que
+    o tamanho do HTML não depende do número de simulações.
     """
-    figs = []
-    # Histograma do tempo de recuperação
-    figs.append(px.histogram(df, x="recovery_time", nbins=20, title="Distribuição do Tempo de Recuperação"))
-    # Histograma do impacto em usuários
-    figs.append(px.histogram(df, x="user_impact_pct", nbins=20, title="Percentual de Usuários Impactados"))
-    # Scatter: tempo de recuperação vs impacto em usuários
-    figs.append(px.scatter(df, x="recovery_time", y="user_impact_pct", color="p_node", title="Recuperação vs Impacto"))
-    # Histograma do tempo médio de espera
-    figs.append(px.histogram(df, x="avg_wait", nbins=20, title="Tempo Médio de Espera (fila)"))
-    # Salva todos os gráficos em um único HTML
-    with open(output_html, "w", encoding="utf-8") as f:
-        for fig in figs:
-            f.write(fig.to_html(full_html=False, include_plotlyjs="cdn"))
+    write_report(aggregate_frame(df), output_html)
 
 
 def main() -> None:
@@ -132,29 +510,145 @@ def main() -> None:
     parser.add_argument("--output-csv", type=Path, default=Path("sim_results.csv"), help="Arquivo CSV para salvar resultados")
     parser.add_argument("--output-html", type=Path, default=Path("sim_plots.html"), help="Arquivo HTML para salvar gráficos")
     parser.add_argument("--seed", type=int, default=None, help="Semente para reprodutibilidade")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Número de processos paralelos (0 = todos os núcleos); resultados não dependem deste valor",
+    )
+    parser.add_argument("--no-progress", action="store_true", help="Desativa a exibição de progresso/ETA")
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Diretório para memorizar sub-simulações entre execuções (padrão: apenas em memória)",
+    )
+    parser.add_argument("--cache-max-mb", type=float, default=256.0, help="Tamanho máximo do cache em disco (MB)")
+    parser.add_argument(
+        "--queue-method",
+        choices=["auto", "analytic", "simulation"],
+        default="auto",
+        help="Caminho das métricas de fila: Erlang C quando aplicável (auto), sempre analítico ou sempre simulado",
+    )
+    parser.add_argument("--batch-size", type=int, default=1000, help="Linhas por lote gravado no CSV")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Retoma uma execução interrompida usando o manifesto ao lado do CSV, pulando tarefas concluídas",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Amostra cada célula até a meia-largura do IC atingir --ci-target (--n-sims vira o piloto por célula)",
+    )
+    parser.add_argument(
+        "--ci-metrics",
+        type=lambda v: tuple(v.split(",")),
+        default=DEFAULT_CI_METRICS,
+        help="Métricas (separadas por vírgula) que controlam a parada adaptativa",
+    )
+    parser.add_argument("--ci-target", type=float, default=0.1, help="Meia-largura alvo (fração da média por padrão)")
+    parser.add_argument("--ci-absolute", action="store_true", help="Interpreta --ci-target como meia-largura absoluta")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Nível de confiança dos intervalos")
+    parser.add_argument("--round-sims", type=int, default=10, help="Tentativas por célula ativa a cada rodada adaptativa")
+    parser.add_argument("--max-total-sims", type=int, default=10000, help="Orçamento total de tentativas no modo adaptativo")
+    parser.add_argument(
+        "--queue-db",
+        type=Path,
+        default=None,
+        help="Distribui as sub-simulações por uma fila SQLite atendida por 'python -m sim.work_queue worker'",
+    )
+    parser.add_argument("--spawn-workers", type=int, default=0, help="Workers locais iniciados junto com --queue-db")
     args = parser.parse_args()
-    if args.seed is not None:
-        random.seed(args.seed)
+    if args.spawn_workers and args.queue_db is None:
+        parser.error("--spawn-workers requer --queue-db")
+    if args.adaptive and args.resume:
+        parser.error("--resume não é suportado no modo --adaptive")
+    manifest_path = args.output_csv.with_name(args.output_csv.name + ".manifest.json")
+    manifest = CsvResultSink.load_manifest(manifest_path) if args.resume else None
+    if args.seed is None and manifest is not None:
+        args.seed = manifest["params"]["seed"]
+    if args.seed is None:
+        # registra a entropia usada para que a execução possa ser reproduzida
+        args.seed = np.random.SeedSequence().entropy
+        print(f"Semente raiz gerada: {args.seed}", file=sys.stderr)
     G = load_graph(args.graph_path)
     # definições de parâmetros: probabilidades de falha e capacidades de atendimento
-    failure_probs = [0.05, 0.1, 0.2]
-    capacities = [1, 2, 3]
-    results = monte_carlo(
-        G,
-        n_sims=args.n_sims,
-        failure_probs=failure_probs,
-        capacities=capacities,
-        p_propagate=0.3,
-        arrival_rate=10.0,
-        service_rate=12.0,
+    params = {
+        "graph": graph_fingerprint(G),
+        "n_sims": args.n_sims,
+        "failure_probs": [0.05, 0.1, 0.2],
+        "capacities": [1, 2, 3],
+        "p_propagate": 0.3,
+        "arrival_rate": 10.0,
+        "service_rate": 12.0,
+        "queue_method": args.queue_method,
+        "seed": args.seed,
+    }
+    if args.adaptive:
+        params["adaptive"] = {
+            "metrics": list(args.ci_metrics),
+            "target": args.ci_target,
+            "relative": not args.ci_absolute,
+            "confidence": args.confidence,
+            "round_sims": args.round_sims,
+            "max_total_sims": args.max_total_sims,
+        }
+    sink = CsvResultSink(args.output_csv, params, manifest_path, batch_size=args.batch_size, resume=args.resume)
+    if sink.completed_ids:
+        print(f"Retomando execução: {len(sink.completed_ids)} simulações já concluídas", file=sys.stderr)
+    common = dict(
+        failure_probs=params["failure_probs"],
+        capacities=params["capacities"],
+        p_propagate=params["p_propagate"],
+        arrival_rate=params["arrival_rate"],
+        service_rate=params["service_rate"],
+        queue_method=args.queue_method,
+        seed=args.seed,
+        workers=args.workers or os.cpu_count() or 1,
+        progress=not args.no_progress,
+        cache=ResultCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024)),
+        queue_db=args.queue_db,
     )
-    df = pd.DataFrame(results)
-    # salva CSV
-    df.to_csv(args.output_csv, index=False)
-    # gera e salva gráficos
-    generate_plots(df, args.output_html)
+    if args.queue_db is not None:
+        # reabre a fila antes de iniciar workers locais, que encerram ao encontrá-la fechada
+        queue = WorkQueue(args.queue_db)
+        queue.set_meta("closed", False)
+        queue.close()
+    spawned = [
+        subprocess.Popen([sys.executable, "-m", "sim.work_queue", "worker", "--db", str(args.queue_db)])
+        for _ in range(args.spawn_workers)
+    ]
+    with sink:
+        if args.adaptive:
+            rows = iter_adaptive_monte_carlo(
+                G,
+                metrics=args.ci_metrics,
+                target=args.ci_target,
+                relative=not args.ci_absolute,
+                confidence=args.confidence,
+                min_sims=args.n_sims,
+                batch_size=args.round_sims,
+                max_total_sims=args.max_total_sims,
+                **common,
+            )
+        else:
+            rows = iter_monte_carlo(G, n_sims=args.n_sims, skip_ids=set(sink.completed_ids), **common)
+        for row in rows:
+            sink.write(row)
+    for proc in spawned:
+        proc.wait()
+    if args.adaptive:
+        df = pd.read_csv(args.output_csv)
+        summary = summarize_cells(df, args.ci_metrics, args.ci_target, not args.ci_absolute, args.confidence)
+        summary_path = args.output_csv.with_suffix(".cells.csv")
+        summary.to_csv(summary_path, index=False)
+        print(summary[["p_node", "capacity", "n_sims", "converged"]].to_string(index=False))
+        print(f"Resumo por célula salvo em {summary_path}")
+    # gera e salva gráficos a partir de agregados lidos do CSV em blocos
+    write_report(aggregate_csv(args.output_csv), args.output_html)
     print(f"Resultados salvos em {args.output_csv}, gráficos em {args.output_html}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -7,7 +7,9 @@ NetworkX.  Estas funções são usadas pelo script de Monte Carlo para avaliar
 resiliência.  O modelo é simplificado: cada nó falha com uma probabilidade
 ``p_node``, e as falhas propagam-se aos vizinhos com probabilidade
 ``p_propagate``.  O tempo de recuperação é o número de steps até que não
-haja novas falhas.
+haja novas falhas.  Opcionalmente a propagação respeita o tipo das arestas
+(``depends_on`` mais forte que ``calls``, ``monitors`` sem propagação e
+``replicates`` como failover; veja ``edge_type_probabilities``).
 
 Exemplo de uso:
 
@@ -29,28 +31,63 @@ print(f"Tempo de recuperação: {recovery_time}, nós impactados: {len(failed_no
 """
 
 import random
-from typing import Set, Tuple
+from typing import Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
 
 import networkx as nx
 
 
-def simulate_failure(graph: nx.Graph, p_node: float, p_propagate: float) -> Tuple[int, Set[int]]:
+# Peso de cada tipo de aresta (``type`` em data/graph.json) sobre ``p_propagate``.
+# A falha de uma dependência atinge quem depende dela; ``monitors`` não propaga
+# e ``replicates`` não propaga, mas oferece failover (veja ``simulate_failure``).
+DEFAULT_EDGE_WEIGHTS: Dict[str, float] = {"depends_on": 1.0, "calls": 0.5, "monitors": 0.0, "replicates": 0.0}
+REPLICATION_EDGE = "replicates"
+
+
+def edge_type_probabilities(
+    p_propagate: float, weights: Mapping[str, float] = DEFAULT_EDGE_WEIGHTS
+) -> Dict[str, float]:
+    """Probabilidade de propagação por tipo de aresta: ``min(1, p_propagate * peso)``."""
+    return {edge_type: min(1.0, p_propagate * weight) for edge_type, weight in weights.items()}
+
+
+def simulate_failure(
+    graph: nx.Graph,
+    p_node: float,
+    p_propagate: float,
+    rng: Optional[random.Random] = None,
+    edge_probs: Optional[Mapping[str, float]] = None,
+) -> Tuple[int, Set[int]]:
     """Simula falhas iniciais e propagação em um grafo.
 
+    Sem ``edge_probs`` toda aresta ``u -> v`` propaga a falha de ``u`` para
+    ``v`` com ``p_propagate``.  Com ``edge_probs`` a propagação segue a
+    semântica dos tipos de aresta: a falha de ``v`` atinge quem depende dele
+    (``u`` na aresta ``u -> v``) com a probabilidade do tipo da aresta
+    (``p_propagate`` para tipos ausentes), e um nó com alguma réplica
+    (aresta ``replicates`` em qualquer sentido) ainda saudável não propaga sua
+    falha — os dependentes fazem failover até a última réplica cair.  Em grafo
+    não direcionado cada aresta vale como dependência nos dois sentidos.
+
     Args:
         graph: Grafo direcionado ou não direcionado do NetworkX.
         p_node: Probabilidade de cada nó falhar no início da simulação.
         p_propagate: Probabilidade de uma falha propagar-se de um nó para um vizinho.
+        rng: Gerador aleatório dedicado; por padrão usa o módulo global ``random``.
+        edge_probs: probabilidade de propagação por tipo de aresta (veja
+            ``edge_type_probabilities``).
 
     Returns:
         recovery_time: número de passos até cessar a propagação.
         failed_nodes: conjunto de IDs de nós que falharam durante a simulação.
     """
+    draw = rng.random if rng is not None else random.random
     # determina falhas iniciais
     failed: Set[int] = set()
     for node in graph.nodes:
-        if random.random() < p_node:
+        if draw() < p_node:
             failed.add(node)
+    if edge_probs is not None:
+        return _typed_cascade(graph, list(failed), p_propagate, edge_probs, lambda u, v: draw())
     # fila para BFS de propagação
     frontier = list(failed)
     recovery_time = 0
@@ -59,8 +96,92 @@ def simulate_failure(graph: nx.Graph, p_node: float, p_propagate: float) -> Tupl
         recovery_time += 1
         for node in frontier:
             for neighbor in graph.neighbors(node):
-                if neighbor not in failed and random.random() < p_propagate:
+                if neighbor not in failed and draw() < p_propagate:
+                    failed.add(neighbor)
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+    return recovery_time, failed
+
+
+def _typed_cascade(
+    graph: nx.Graph,
+    initial: List[Hashable],
+    p_propagate: float,
+    edge_probs: Mapping[str, float],
+    coin: Callable[[Hashable, Hashable], float],
+) -> Tuple[int, Set[Hashable]]:
+    """Propagação por tipo de aresta com failover entre réplicas.
+
+    ``coin(u, v)`` devolve o número aleatório da aresta ``u -> v``.  A cada
+    passo, os nós falhos sem réplica saudável ficam "expostos" e cada
+    dependente ainda saudável falha com a probabilidade do tipo da aresta.
+    Dependentes são os predecessores em ``DiGraph`` e os vizinhos em ``Graph``.
+    """
+    dependents_of = graph.predecessors if graph.is_directed() else graph.neighbors
+    replicas: Dict[Hashable, List[Hashable]] = {}
+    for u, v, edge_type in graph.edges(data="type"):
+        if edge_type == REPLICATION_EDGE:
+            replicas.setdefault(u, []).append(v)
+            replicas.setdefault(v, []).append(u)
+    failed = set(initial)
+    pending = list(initial)  # falhos ainda protegidos por alguma réplica
+    recovery_time = 0
+    while True:
+        frontier = [n for n in pending if all(r in failed for r in replicas.get(n, ()))]
+        if not frontier:
+            return recovery_time, failed
+        exposed = set(frontier)
+        pending = [n for n in pending if n not in exposed]
+        recovery_time += 1
+        for node in frontier:
+            for dependent in dependents_of(node):
+                if dependent in failed:
+                    continue
+                p = edge_probs.get(graph.edges[dependent, node].get("type"), p_propagate)
+                if p > 0.0 and coin(dependent, node) < p:
+                    failed.add(dependent)
+                    pending.append(dependent)
+
+
+def simulate_failure_with_draws(
+    graph: nx.Graph,
+    p_node: float,
+    p_propagate: float,
+    node_draws: Mapping[Hashable, float],
+    edge_draws: Mapping[Tuple[Hashable, Hashable], float],
+    initial_failed: Iterable[Hashable] = (),
+    edge_probs: Optional[Mapping[str, float]] = None,
+) -> Tuple[int, Set[Hashable]]:
+    """Variante de ``simulate_failure`` com números aleatórios fornecidos.
+
+    Cada nó falha inicialmente se ``node_draws[n] < p_node`` (além de
+    ``initial_failed``) e cada aresta ``(u, v)`` propaga se
+    ``edge_draws[(u, v)] < p_propagate`` (ou a probabilidade do seu tipo, com
+    ``edge_probs``).  Como cada aresta é testada no máximo uma vez, a
+    distribuição é a mesma de ``simulate_failure``; fixar os sorteios permite
+    comparar grafos com números aleatórios comuns.
+    """
+    failed: Set[Hashable] = set(initial_failed)
+    failed.update(n for n in graph.nodes if node_draws[n] < p_node)
+    if edge_probs is not None:
+        initial = [n for n in graph.nodes if n in failed]
+
+        def coin(u: Hashable, v: Hashable) -> float:
+            # em grafo não direcionado a aresta pode ter sido sorteada em qualquer orientação
+            if (u, v) in edge_draws or graph.is_directed():
+                return edge_draws[(u, v)]
+            return edge_draws[(v, u)]
+
+        return _typed_cascade(graph, initial, p_propagate, edge_probs, coin)
+    frontier = list(failed)
+    recovery_time = 0
+    while frontier:
+        next_frontier = []
+        recovery_time += 1
+        for node in frontier:
+            for neighbor in graph.neighbors(node):
+                if neighbor not in failed and edge_draws[(node, neighbor)] < p_propagate:
                     failed.add(neighbor)
                     next_frontier.append(neighbor)
         frontier = next_frontier
-    return recovery_time, failed
\ No newline at end of file
+    return recovery_time, failed
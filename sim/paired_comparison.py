@@ -0,0 +1,190 @@
+"""
+paired_comparison.py
+--------------------
+
+Comparação pareada das arquiteturas Legada e Resiliente com números
+aleatórios comuns (CRN).  Em cada tentativa, um único vetor de sorteios é
+gerado para a união das chaves lógicas das duas arquiteturas (falha inicial
+de cada componente/réplica e moeda de propagação de cada dependência entre
+componentes, veja ``architectures.node_draw_key``); as duas variantes são
+simuladas com esses mesmos sorteios.  Assim a diferença
+``resilient - legacy`` de cada tentativa não carrega o ruído de sorteios
+independentes e o intervalo de confiança da diferença média fica mais
+estreito com o mesmo número de execuções.
+
+O resumo traz, para cada métrica, as médias das duas arquiteturas, a
+diferença média com seu intervalo de confiança e o fator de redução de
+variância ``(Var[L] + Var[R]) / Var[R - L]`` — quantas vezes mais tentativas
+independentes seriam necessárias para a mesma precisão.
+
+Uso:
+
+```bash
+python -m sim.paired_comparison --n-runs 200 --p-node 0.05 \
+  --output-csv paired_runs.csv --summary-csv paired_summary.csv
+```
+"""
+
+import argparse
+import math
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from .architectures import ARCHITECTURES, critical_nodes, edge_draw_key, node_draw_key
+from .network_failure_sim import DEFAULT_EDGE_WEIGHTS, edge_type_probabilities, simulate_failure_with_draws
+from .sequential_stopping import t_quantile
+
+PAIRED_METRICS = ("RTO_steps", "failed_nodes_count", "failed_critical_fraction")
+
+# Propagação do cenário regional_outage do relatório (deliverable/sim/report.ipynb)
+DEFAULT_P_PROPAGATE = {"legacy": 1.0, "resilient": 0.1}
+
+
+class _Variant:
+    """Grafo de uma arquitetura com as chaves de sorteio pré-calculadas."""
+
+    def __init__(self, name: str, G: nx.DiGraph, region: Optional[str]):
+        self.name = name
+        self.G = G
+        self.critical = critical_nodes(G)
+        self.initial = {n for n, d in G.nodes(data=True) if region is not None and d.get("region") == region}
+        self.node_keys = {n: node_draw_key(G, n) for n in G.nodes}
+        self.edge_keys = {(u, v): edge_draw_key(G, u, v) for u, v in G.edges}
+
+    def run(
+        self,
+        p_node: float,
+        p_propagate: float,
+        table: Dict[Hashable, float],
+        edge_weights: Optional[Dict[str, float]] = DEFAULT_EDGE_WEIGHTS,
+    ) -> Dict[str, float]:
+        node_draws = {n: table[k] for n, k in self.node_keys.items()}
+        edge_draws = {e: table[k] for e, k in self.edge_keys.items()}
+        edge_probs = None if edge_weights is None else edge_type_probabilities(p_propagate, edge_weights)
+        rto, failed = simulate_failure_with_draws(
+            self.G, p_node, p_propagate, node_draws, edge_draws, self.initial, edge_probs
+        )
+        return {
+            "RTO_steps": rto,
+            "failed_nodes_count": len(failed),
+            "failed_critical_fraction": len(failed & self.critical) / len(self.critical) if self.critical else 0.0,
+        }
+
+
+def run_paired(
+    n_runs: int,
+    p_node: float = 0.0,
+    p_propagate: Optional[Dict[str, float]] = None,
+    region: Optional[str] = "us-east-1",
+    seed: Optional[int] = None,
+    common_random_numbers: bool = True,
+    architectures: Sequence[str] = ("legacy", "resilient"),
+    edge_weights: Optional[Dict[str, float]] = DEFAULT_EDGE_WEIGHTS,
+) -> pd.DataFrame:
+    """Executa ``n_runs`` tentativas pareadas do cenário de falha regional.
+
+    Args:
+        n_runs: número de tentativas (cada uma simula todas as arquiteturas).
+        p_node: probabilidade de falha inicial adicional de cada nó.
+        p_propagate: probabilidade de propagação por arquitetura
+            (padrão: ``DEFAULT_P_PROPAGATE``).
+        region: região cujos nós falham no início (``None`` desativa).
+        seed: semente raiz; cada tentativa usa ``SeedSequence(seed, spawn_key=(run,))``.
+        common_random_numbers: ``False`` sorteia cada arquitetura de forma
+            independente (útil para medir o ganho do pareamento).
+        architectures: nomes em ``ARCHITECTURES``.
+        edge_weights: peso de cada tipo de aresta sobre ``p_propagate``
+            (``None`` propaga uniformemente por todas as arestas).
+
+    Returns:
+        DataFrame no formato longo do relatório: uma linha por
+        ``(run_id, architecture)`` com as colunas de ``PAIRED_METRICS``.
+    """
+    p_propagate = {**DEFAULT_P_PROPAGATE, **(p_propagate or {})}
+    variants = [_Variant(name, ARCHITECTURES[name](), region) for name in architectures]
+    keys = sorted(
+        {k for v in variants for k in list(v.node_keys.values()) + list(v.edge_keys.values())}, key=repr
+    )
+    entropy = np.random.SeedSequence(seed).entropy
+    rows = []
+    for run in range(n_runs):
+        for idx, variant in enumerate(variants):
+            if idx == 0 or not common_random_numbers:
+                spawn_key = (run,) if common_random_numbers else (run, idx)
+                rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=spawn_key))
+                table = dict(zip(keys, rng.random(len(keys))))
+            metrics = variant.run(p_node, p_propagate[variant.name], table, edge_weights)
+            rows.append({"scenario": "regional_outage", "architecture": variant.name, **metrics, "run_id": run})
+    return pd.DataFrame(rows)
+
+
+def summarize_paired(
+    df: pd.DataFrame,
+    baseline: str = "legacy",
+    candidate: str = "resilient",
+    metrics: Sequence[str] = PAIRED_METRICS,
+    confidence: float = 0.95,
+) -> pd.DataFrame:
+    """Diferença média ``candidate - baseline`` por métrica, com IC pareado."""
+    wide = df.pivot(index="run_id", columns="architecture", values=list(metrics))
+    n = len(wide)
+    t = t_quantile(confidence, n - 1)
+    rows = []
+    for metric in metrics:
+        base = wide[(metric, baseline)].to_numpy(dtype=float)
+        cand = wide[(metric, candidate)].to_numpy(dtype=float)
+        diff = cand - base
+        var_diff = diff.var(ddof=1) if n > 1 else math.inf
+        var_indep = base.var(ddof=1) + cand.var(ddof=1) if n > 1 else math.inf
+        halfwidth = t * math.sqrt(var_diff / n)
+        rows.append({
+            "metric": metric,
+            f"mean_{baseline}": base.mean(),
+            f"mean_{candidate}": cand.mean(),
+            "mean_diff": diff.mean(),
+            "ci_low": diff.mean() - halfwidth,
+            "ci_high": diff.mean() + halfwidth,
+            "halfwidth": halfwidth,
+            "variance_reduction": var_indep / var_diff if var_diff > 0 else math.inf,
+            "n_runs": n,
+        })
+    return pd.DataFrame(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Comparação pareada (CRN) Legada vs Resiliente")
+    parser.add_argument("--n-runs", type=int, default=200, help="Número de tentativas pareadas")
+    parser.add_argument("--p-node", type=float, default=0.0, help="Probabilidade de falha inicial adicional por nó")
+    parser.add_argument("--p-propagate-legacy", type=float, default=DEFAULT_P_PROPAGATE["legacy"])
+    parser.add_argument("--p-propagate-resilient", type=float, default=DEFAULT_P_PROPAGATE["resilient"])
+    parser.add_argument("--region", type=str, default="us-east-1", help="Região em pane ('none' desativa)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Nível de confiança dos intervalos")
+    parser.add_argument("--independent", action="store_true", help="Desativa os números aleatórios comuns")
+    parser.add_argument("--uniform-edges", action="store_true", help="Ignora o tipo das arestas na propagação")
+    parser.add_argument("--seed", type=int, default=None, help="Semente para reprodutibilidade")
+    parser.add_argument("--output-csv", type=Path, default=None, help="CSV com as tentativas (separado por ';')")
+    parser.add_argument("--summary-csv", type=Path, default=None, help="CSV com as diferenças pareadas")
+    args = parser.parse_args()
+    df = run_paired(
+        args.n_runs,
+        p_node=args.p_node,
+        p_propagate={"legacy": args.p_propagate_legacy, "resilient": args.p_propagate_resilient},
+        region=None if args.region.lower() == "none" else args.region,
+        seed=args.seed,
+        common_random_numbers=not args.independent,
+        edge_weights=None if args.uniform_edges else DEFAULT_EDGE_WEIGHTS,
+    )
+    summary = summarize_paired(df, confidence=args.confidence)
+    print(summary.to_string(index=False))
+    if args.output_csv:
+        df.to_csv(args.output_csv, sep=";", index=False)
+    if args.summary_csv:
+        summary.to_csv(args.summary_csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+plot_aggregation.py
+-------------------
+
+Agregação dos resultados de Monte Carlo antes da plotagem.  Em vez de enviar
+cada linha ao Plotly, os resultados são lidos em blocos e resumidos em
+histogramas com bordas fixas (por ``p_node``), em uma matriz de densidade 2D
+(tempo de recuperação x impacto em usuários) e em uma tabela por célula
+``(p_node, capacity)`` com contagem, média, desvio padrão, mínimo e máximo.
+O tamanho do HTML e o tempo de renderização dependem apenas do número de
+bins e de células, não do número de simulações.
+
+Exemplo:
+
+```python
+from pathlib import Path
+from sim.plot_aggregation import aggregate_csv, write_report
+
+agg = aggregate_csv(Path("sim_results.csv"), chunksize=200_000)
+write_report(agg, Path("sim_plots.html"))
+```
+"""
+
+import html
+import math
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+PLOT_METRICS = ("recovery_time", "user_impact_pct", "avg_wait")
+METRIC_TITLES = {
+    "recovery_time": "Distribuição do Tempo de Recuperação",
+    "user_impact_pct": "Percentual de Usuários Impactados",
+    "avg_wait": "Tempo Médio de Espera (fila)",
+}
+DENSITY_AXES = ("recovery_time", "user_impact_pct")
+CELL_COLUMNS = ("p_node", "capacity")
+
+
+def _edges(lo: float, hi: float, bins: int, integer: bool) -> np.ndarray:
+    """Bordas fixas dos bins; métricas inteiras com poucos valores ganham um bin por valor."""
+    if integer and hi - lo + 1 <= bins:
+        return np.arange(lo - 0.5, hi + 1.5)
+    if hi <= lo:
+        hi = lo + 1.0
+    return np.linspace(lo, hi, bins + 1)
+
+
+def scan_ranges(chunks: Iterable[pd.DataFrame], metrics: Sequence[str]) -> Dict[str, Tuple[float, float, bool]]:
+    """Mínimo, máximo e se a métrica é inteira, acumulados sobre blocos."""
+    ranges: Dict[str, Tuple[float, float, bool]] = {}
+    for chunk in chunks:
+        for metric in metrics:
+            values = chunk[metric].to_numpy(dtype=float)
+            if not len(values):
+                continue
+            lo, hi = np.nanmin(values), np.nanmax(values)
+            integer = bool(np.all(np.mod(values, 1.0) == 0.0))
+            if metric in ranges:
+                old_lo, old_hi, old_int = ranges[metric]
+                lo, hi, integer = min(lo, old_lo), max(hi, old_hi), integer and old_int
+            ranges[metric] = (float(lo), float(hi), integer)
+    return ranges
+
+
+class ResultAggregator:
+    """Histogramas, densidade 2D e resumo por célula acumulados bloco a bloco."""
+
+    def __init__(
+        self,
+        ranges: Dict[str, Tuple[float, float, bool]],
+        metrics: Sequence[str] = PLOT_METRICS,
+        bins: int = 50,
+        density_bins: int = 60,
+        group: str = "p_node",
+    ):
+        self.metrics = tuple(metrics)
+        self.group = group
+        self.edges = {m: _edges(*ranges[m][:2], bins=bins, integer=ranges[m][2]) for m in self.metrics}
+        self.hist: Dict[str, Dict[float, np.ndarray]] = {m: {} for m in self.metrics}
+        x, y = DENSITY_AXES
+        self.density_edges = (
+            _edges(*ranges[x][:2], bins=density_bins, integer=ranges[x][2]),
+            _edges(*ranges[y][:2], bins=density_bins, integer=ranges[y][2]),
+        )
+        self.density = np.zeros((len(self.density_edges[0]) - 1, len(self.density_edges[1]) - 1), dtype=np.int64)
+        self._cells: Dict[Tuple, Dict[str, List[float]]] = {}
+        self.rows = 0
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        """Acumula um bloco de linhas de resultado."""
+        self.rows += len(chunk)
+        for key, part in chunk.groupby(self.group, sort=False):
+            for metric in self.metrics:
+                counts, _ = np.histogram(part[metric].to_numpy(dtype=float), bins=self.edges[metric])
+                acc = self.hist[metric].get(key)
+                self.hist[metric][key] = counts if acc is None else acc + counts
+        x, y = DENSITY_AXES
+        counts, _, _ = np.histogram2d(
+            chunk[x].to_numpy(dtype=float), chunk[y].to_numpy(dtype=float), bins=self.density_edges
+        )
+        self.density += counts.astype(np.int64)
+        for cell, part in chunk.groupby(list(CELL_COLUMNS), sort=False):
+            stats = self._cells.setdefault(cell, {m: [0, 0.0, 0.0, math.inf, -math.inf] for m in self.metrics})
+            for metric in self.metrics:
+                values = part[metric].to_numpy(dtype=float)
+                s = stats[metric]
+                s[0] += len(values)
+                s[1] += values.sum()
+                s[2] += np.square(values).sum()
+                s[3] = min(s[3], values.min())
+                s[4] = max(s[4], values.max())
+
+    def summary(self) -> pd.DataFrame:
+        """Tabela por célula com ``n_sims`` e média/desvio/mínimo/máximo de cada métrica."""
+        rows = []
+        for cell in sorted(self._cells):
+            row = dict(zip(CELL_COLUMNS, cell))
+            for metric, (n, total, squares, lo, hi) in self._cells[cell].items():
+                mean = total / n
+                row["n_sims"] = int(n)
+                row[f"{metric}_mean"] = mean
+                row[f"{metric}_std"] = math.sqrt(max(squares / n - mean ** 2, 0.0) * n / (n - 1)) if n > 1 else 0.0
+                row[f"{metric}_min"] = lo
+                row[f"{metric}_max"] = hi
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def figures(self) -> List[go.Figure]:
+        """Figuras Plotly construídas apenas a partir dos agregados."""
+        figs = []
+        for metric in self.metrics:
+            edges = self.edges[metric]
+            centers, widths = (edges[:-1] + edges[1:]) / 2, np.diff(edges)
+            fig = go.Figure()
+            for key in sorted(self.hist[metric]):
+                fig.add_bar(x=centers, y=self.hist[metric][key], width=widths, name=f"{self.group}={key}")
+            fig.update_layout(
+                barmode="stack", title=METRIC_TITLES.get(metric, metric), xaxis_title=metric, yaxis_title="simulações"
+            )
+            figs.append(fig)
+        xe, ye = self.density_edges
+        x, y = DENSITY_AXES
+        fig = go.Figure(go.Heatmap(
+            x=(xe[:-1] + xe[1:]) / 2,
+            y=(ye[:-1] + ye[1:]) / 2,
+            z=np.where(self.density > 0, np.log10(np.maximum(self.density, 1)), np.nan).T,
+            customdata=self.density.T,
+            hovertemplate=f"{x}=%{{x}}<br>{y}=%{{y}}<br>simulações=%{{customdata}}<extra></extra>",
+            colorbar={"title": "log10(n)"},
+        ))
+        fig.update_layout(title="Densidade: Recuperação vs Impacto", xaxis_title=x, yaxis_title=y)
+        figs.append(fig)
+        return figs
+
+
+def aggregate_frame(df: pd.DataFrame, **kwargs) -> ResultAggregator:
+    """Agrega um DataFrame já carregado em memória."""
+    metrics = kwargs.get("metrics", PLOT_METRICS)
+    agg = ResultAggregator(scan_ranges([df], set(metrics) | set(DENSITY_AXES)), **kwargs)
+    agg.add(df)
+    return agg
+
+
+def aggregate_csv(path: Path, chunksize: int = 200_000, **kwargs) -> ResultAggregator:
+    """Agrega um CSV de resultados em duas passadas por blocos (faixas e contagens)."""
+    metrics = kwargs.get("metrics", PLOT_METRICS)
+    columns = sorted(set(metrics) | set(DENSITY_AXES) | set(CELL_COLUMNS) | {kwargs.get("group", "p_node")})
+    ranges = scan_ranges(pd.read_csv(path, usecols=columns, chunksize=chunksize), set(metrics) | set(DENSITY_AXES))
+    agg = ResultAggregator(ranges, **kwargs)
+    for chunk in pd.read_csv(path, usecols=columns, chunksize=chunksize):
+        agg.add(chunk)
+    return agg
+
+
+def write_report(agg: ResultAggregator, output_html: Path, title: str = "Resultados de Monte Carlo") -> None:
+    """Salva figuras e tabela de resumo em um único HTML (plotly.js carregado uma vez)."""
+    with open(output_html, "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head><body>\n")
+        f.write(f"<h1>{html.escape(title)}</h1><p>{agg.rows} simulações agregadas</p>\n")
+        for i, fig in enumerate(agg.figures()):
+            f.write(fig.to_html(full_html=False, include_plotlyjs="cdn" if i == 0 else False))
+        f.write("<h2>Resumo por célula</h2>\n")
+        f.write(agg.summary().to_html(index=False, float_format=lambda v: f"{v:.4g}"))
+        f.write("\n</body></html>\n")
@@ -0,0 +1,132 @@
+"""
+result_cache.py
+---------------
+
+Cache de resultados de sub-simulações indexado pela tupla de parâmetros.  Os
+resultados ficam em memória (no máximo ``max_memory_entries``, descartando os
+menos usados recentemente) e, opcionalmente, em um diretório no disco (um
+arquivo JSON por chave) com limite de tamanho: quando o total excede
+``max_bytes``, os arquivos menos usados recentemente são removidos.  Uma
+entrada que saiu da memória volta do disco na próxima consulta.  Isso permite
+que varreduras repetidas e reexecuções de notebooks reaproveitem trabalho já
+feito sem que varreduras longas acumulem todos os resultados na memória.
+
+Exemplo:
+
+```python
+from pathlib import Path
+from sim.result_cache import ResultCache
+
+cache = ResultCache(Path(".sim_cache"), max_bytes=64 * 1024 * 1024)
+key = ("queue", 10.0, 12.0, 2, 100.0)
+if cache.get(key) is None:
+    cache.put(key, {"avg_wait": 0.17})
+print(cache.hits, cache.misses)
+```
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Tuple
+
+# Incrementar quando a semântica das sub-simulações mudar, invalidando caches antigos
+CACHE_VERSION = 1
+
+
+def key_digest(key: Tuple[Hashable, ...]) -> str:
+    """Resumo SHA-256 estável de uma tupla de parâmetros (usa ``repr``)."""
+    return hashlib.sha256(repr((CACHE_VERSION,) + tuple(key)).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Cache LRU em memória com armazenamento opcional em disco e despejo por tamanho."""
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_memory_entries: int = 100_000,
+    ):
+        self.directory = Path(directory) if directory is not None else None
+        self.max_bytes = max_bytes
+        self.max_memory_entries = max(1, int(max_memory_entries))
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        self._disk_bytes = 0
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(p.stat().st_size for p in self.directory.glob("*.json"))
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.json"
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Dict[str, object]]:
+        """Retorna o resultado memorizado para ``key`` ou ``None``."""
+        digest = key_digest(key)
+        value = self._memory.get(digest)
+        if value is not None:
+            self._memory.move_to_end(digest)
+        elif self.directory is not None:
+            path = self._path(digest)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    value = json.load(f)
+                os.utime(path)  # marca como usado recentemente (LRU por mtime)
+                self._remember(digest, value)
+            except (FileNotFoundError, json.JSONDecodeError):
+                value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: Tuple[Hashable, ...], value: Dict[str, object]) -> None:
+        """Memoriza ``value`` (dicionário serializável em JSON) para ``key``."""
+        digest = key_digest(key)
+        self._remember(digest, value)
+        if self.directory is None:
+            return
+        path = self._path(digest)
+        previous = path.stat().st_size if path.exists() else 0
+        # escrita atômica: outro processo nunca lê um arquivo pela metade
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp, path)
+        self._disk_bytes += path.stat().st_size - previous
+        if self._disk_bytes > self.max_bytes:
+            self._evict()
+
+    def _remember(self, digest: str, value: Dict[str, object]) -> None:
+        self._memory[digest] = value
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self) -> None:
+        """Remove arquivos menos usados recentemente até caber em ``max_bytes``."""
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._memory.pop(path.stem, None)
+            total -= size
+        self._disk_bytes = total
@@ -0,0 +1,139 @@
+"""
+result_sink.py
+--------------
+
+Gravação incremental e retomável de resultados de simulação.  As linhas são
+acumuladas em lotes e anexadas a um CSV (append-only); após cada lote o
+arquivo é sincronizado em disco e um manifesto JSON registra os parâmetros da
+execução, o número de linhas e o tamanho em bytes do CSV confirmado.  Se a
+execução for interrompida, ``resume=True`` trunca qualquer lote parcial,
+recupera os ``simulation_id`` já gravados e permite pular essas tarefas.
+
+Exemplo:
+
+```python
+from pathlib import Path
+from sim.result_sink import CsvResultSink
+
+with CsvResultSink(Path("sim_results.csv"), params={"n_sims": 50}, resume=True) as sink:
+    for row in rows:
+        if row["simulation_id"] not in sink.completed_ids:
+            sink.write(row)
+```
+"""
+
+import csv
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+
+class CsvResultSink:
+    """CSV append-only gravado em lotes, com manifesto de checkpoint."""
+
+    def __init__(
+        self,
+        path: Path,
+        params: Dict[str, object],
+        manifest_path: Optional[Path] = None,
+        batch_size: int = 1000,
+        resume: bool = False,
+        id_column: str = "simulation_id",
+    ):
+        self.path = Path(path)
+        self.manifest_path = Path(manifest_path) if manifest_path else self.path.with_name(self.path.name + ".manifest.json")
+        self.params = params
+        self.batch_size = batch_size
+        self.id_column = id_column
+        self.completed_ids: Set[int] = set()
+        self.columns: Optional[List[str]] = None
+        self.rows = 0
+        self.batches = 0
+        self._buffer: List[Dict[str, object]] = []
+        manifest = self.load_manifest(self.manifest_path) if resume else None
+        if manifest is not None:
+            if manifest["params"] != params:
+                raise ValueError(
+                    f"Parâmetros da execução diferem do manifesto {self.manifest_path}; "
+                    "remova os arquivos ou execute sem --resume"
+                )
+            self._recover(manifest)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            open(self.path, "w", encoding="utf-8").close()
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns) if self.columns else None
+        self._write_manifest("running")
+
+    @staticmethod
+    def load_manifest(manifest_path: Path) -> Optional[Dict[str, object]]:
+        """Lê um manifesto existente ou retorna ``None``."""
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _recover(self, manifest: Dict[str, object]) -> None:
+        # descarta qualquer lote escrito após o último checkpoint confirmado
+        with open(self.path, "r+b") as f:
+            f.truncate(manifest["bytes"])
+        self.columns = manifest["columns"]
+        self.rows = manifest["rows"]
+        self.batches = manifest["batches"]
+        with open(self.path, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self.completed_ids.add(int(row[self.id_column]))
+
+    def _write_manifest(self, status: str) -> None:
+        manifest = {
+            "status": status,
+            "params": self.params,
+            "columns": self.columns,
+            "rows": self.rows,
+            "batches": self.batches,
+            "bytes": self._file.tell(),
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.manifest_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def write(self, row: Dict[str, object]) -> None:
+        """Adiciona uma linha ao lote corrente, gravando-o quando estiver cheio."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Grava o lote corrente, sincroniza o arquivo e atualiza o manifesto."""
+        if not self._buffer:
+            return
+        if self._writer is None:
+            self.columns = list(self._buffer[0].keys())
+            self._writer = csv.DictWriter(self._file, fieldnames=self.columns)
+            self._writer.writeheader()
+        self._writer.writerows(self._buffer)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.rows += len(self._buffer)
+        self.batches += 1
+        self.completed_ids.update(int(row[self.id_column]) for row in self._buffer)
+        self._buffer.clear()
+        self._write_manifest("running")
+
+    def close(self, status: str = "complete") -> None:
+        """Grava o lote pendente e marca o manifesto com ``status``."""
+        self.flush()
+        self._write_manifest(status)
+        self._file.close()
+
+    def __enter__(self) -> "CsvResultSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close("complete" if exc_type is None else "interrupted")
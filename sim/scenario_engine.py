@@ -0,0 +1,297 @@
+"""
+scenario_engine.py
+------------------
+
+Motor vetorizado dos cenários do relatório de resiliência
+(``deliverable/sim/3_simulation_report.csv``).  Reproduz os três cenários do
+notebook ``deliverable/sim/report.ipynb`` para as arquiteturas Legada e
+Resiliente, mas simula lotes de tentativas de uma vez com NumPy:
+
+* ``regional_outage``: todos os nós da região ``us-east-1`` falham e a falha
+  se propaga em ondas pelas dependências (uma matriz ``lote x nós`` por onda,
+  com uma moeda por aresta da fronteira), com probabilidade por tipo de
+  aresta e failover entre réplicas (camadas de ``graph_csr.compile_propagation``;
+  ``edge_weights=None`` volta à propagação uniforme).  ``RTO_steps`` é o
+  número de ondas, como em ``network_failure_sim.simulate_failure``.
+* ``mqtt_backpressure``: fila M/M/c FCFS simulada pela recursão dos instantes
+  de liberação dos servidores (todas as tentativas do lote avançam juntas a
+  cada chegada).  ``max_queue_length`` é o maior número de mensagens em espera
+  vista por uma chegada e ``time_queue_above_threshold`` soma as esperas das
+  mensagens atendidas com a fila acima do limiar, como no notebook.
+* ``ia_drift``: cada tentativa amostra ``drift_requests`` respostas com taxa
+  de invalidez ``raw_invalid_rate``; a arquitetura Resiliente ativa o fallback
+  quando a taxa observada ultrapassa ``alert_threshold``.
+
+A saída segue exatamente o esquema do relatório (separado por ``;``).
+
+Uso:
+
+```bash
+python -m sim.scenario_engine --n-runs 5000 --seed 42 \
+  --output-csv deliverable/sim/3_simulation_report.csv
+```
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .architectures import ARCHITECTURES, critical_nodes
+from .graph_csr import CompiledPropagation, GraphCSR, compile_propagation, from_networkx
+from .network_failure_sim import DEFAULT_EDGE_WEIGHTS, edge_type_probabilities
+
+REPORT_COLUMNS = [
+    "scenario",
+    "architecture",
+    "RTO_steps",
+    "failed_nodes_count",
+    "failed_critical_fraction",
+    "max_queue_length",
+    "time_queue_above_threshold",
+    "avg_invalid_rate",
+    "fallback_activation_ratio",
+    "run_id",
+]
+
+SCENARIOS = ("regional_outage", "mqtt_backpressure", "ia_drift")
+
+# Parâmetros dos cenários, conforme o notebook do relatório
+SCENARIO_PARAMS: Dict[str, Dict[str, object]] = {
+    "regional_outage": {
+        "region": "us-east-1",
+        "p_propagate": {"legacy": 1.0, "resilient": 0.1},
+        "edge_weights": DEFAULT_EDGE_WEIGHTS,
+    },
+    "mqtt_backpressure": {
+        "arrival_rate": 200.0,
+        "service_rate": 100.0,
+        "capacity": {"legacy": 10, "resilient": 100},
+        "sim_time": 100.0,
+        "queue_threshold": 50,
+    },
+    "ia_drift": {"raw_invalid_rate": 0.5, "alert_threshold": 0.05, "drift_requests": 1000},
+}
+
+
+def cascade_batch(
+    csr: GraphCSR,
+    initial: np.ndarray,
+    p_propagate: float,
+    n_trials: int,
+    rng: np.random.Generator,
+    propagation: Optional[CompiledPropagation] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Propaga falhas em ``n_trials`` tentativas simultâneas.
+
+    Args:
+        csr: grafo em CSR.
+        initial: máscara ``(N,)`` ou ``(n_trials, N)`` das falhas iniciais.
+        p_propagate: probabilidade de propagação por aresta.
+        propagation: camadas pré-compiladas por ``graph_csr.compile_propagation``;
+            ``None`` propaga por todas as arestas com ``p_propagate``.
+
+    Returns:
+        ``(rto, failed)``: ondas de propagação ``(n_trials,)`` e máscara final
+        de nós falhos ``(n_trials, N)``.
+    """
+    if propagation is None:
+        propagation = compile_propagation(csr, p_propagate)
+    layers = [(layer.src, layer.indices, layer.p) for layer in propagation.layers]
+    rep_node, rep_peer = propagation.replica_node, propagation.replica_peer
+    failed = np.broadcast_to(initial, (n_trials, csr.num_nodes)).copy()
+    exposed = np.zeros_like(failed)
+    rto = np.zeros(n_trials, dtype=np.int64)
+    while True:
+        frontier = failed & ~exposed
+        if len(rep_node):
+            # nós com alguma réplica saudável fazem failover e não propagam (ainda)
+            healthy_peers = np.zeros(failed.shape, dtype=np.int32)
+            np.add.at(healthy_peers, (slice(None), rep_node), ~failed[:, rep_peer])
+            frontier &= healthy_peers == 0
+        if not frontier.any():
+            return rto, failed
+        rto += frontier.any(axis=1)
+        exposed |= frontier
+        hit = np.zeros_like(failed)
+        for src, dst, p in layers:
+            # cada aresta é testada uma única vez: quando sua origem fica exposta
+            attempt = frontier[:, src] & ~failed[:, dst]
+            if p < 1.0:
+                attempt &= rng.random(attempt.shape) < p
+            trial, edge = np.nonzero(attempt)
+            hit[trial, dst[edge]] = True
+        failed |= hit
+
+
+def mmc_queue_batch(
+    arrival_rate: float,
+    service_rate: float,
+    capacity: int,
+    sim_time: float,
+    queue_threshold: int,
+    n_trials: int,
+    rng: np.random.Generator,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Simula ``n_trials`` filas M/M/c FCFS até ``sim_time``.
+
+    Returns:
+        ``(max_queue_length, time_queue_above_threshold)`` por tentativa.
+    """
+    expected = arrival_rate * sim_time
+    n_arrivals = int(expected + 6.0 * np.sqrt(expected) + 10)
+    arrivals = np.cumsum(rng.exponential(1.0 / arrival_rate, (n_trials, n_arrivals)), axis=1)
+    services = rng.exponential(1.0 / service_rate, (n_trials, n_arrivals))
+    free = np.zeros((n_trials, capacity))
+    start = np.empty_like(arrivals)
+    rows = np.arange(n_trials)
+    for i in range(n_arrivals):
+        server = free.argmin(axis=1)
+        begin = np.maximum(arrivals[:, i], free[rows, server])
+        start[:, i] = begin
+        free[rows, server] = begin + services[:, i]
+    max_queue = np.zeros(n_trials, dtype=np.int64)
+    above = np.zeros(n_trials)
+    for b in range(n_trials):
+        t, s = arrivals[b], start[b]  # em FCFS os inícios de atendimento são não decrescentes
+        arrived = t < sim_time
+        # mensagens em espera (incluindo a própria) vistas por cada chegada
+        waiting = np.arange(1, n_arrivals + 1) - np.searchsorted(s, t, side="right")
+        max_queue[b] = waiting[arrived].max(initial=0)
+        served = s < sim_time
+        queue_at_start = np.searchsorted(t, s, side="right") - np.searchsorted(s, s, side="right")
+        hit = served & (queue_at_start > queue_threshold)
+        above[b] = (s - t)[hit].sum()
+    return max_queue, above
+
+
+class ScenarioEngine:
+    """Gera linhas do relatório para cenários e arquiteturas em lotes."""
+
+    def __init__(self, params: Optional[Dict[str, Dict[str, object]]] = None):
+        self.params = {name: {**SCENARIO_PARAMS[name], **(params or {}).get(name, {})} for name in SCENARIOS}
+        self.graphs = {}
+        for arch, build in ARCHITECTURES.items():
+            G = build()
+            csr = from_networkx(G, category_attr="type")
+            outage = self.params["regional_outage"]
+            p_arch = outage["p_propagate"][arch]
+            edge_probs = None if outage["edge_weights"] is None else edge_type_probabilities(p_arch, outage["edge_weights"])
+            self.graphs[arch] = (
+                csr,
+                csr.mask(n for n, d in G.nodes(data=True) if d.get("region") == outage["region"]),
+                csr.mask(critical_nodes(G)),
+                compile_propagation(csr, p_arch, edge_probs),
+            )
+
+    def run(self, scenario: str, architecture: str, n_trials: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Métricas de ``n_trials`` tentativas de um cenário (colunas do relatório)."""
+        p = self.params[scenario]
+        out = {col: np.zeros(n_trials) for col in REPORT_COLUMNS[2:-1]}
+        if scenario == "regional_outage":
+            csr, initial, critical, propagation = self.graphs[architecture]
+            rto, failed = cascade_batch(csr, initial, p["p_propagate"][architecture], n_trials, rng, propagation)
+            out["RTO_steps"] = rto
+            out["failed_nodes_count"] = failed.sum(axis=1)
+            out["failed_critical_fraction"] = (failed & critical).sum(axis=1) / max(int(critical.sum()), 1)
+            if architecture == "resilient":
+                out["fallback_activation_ratio"][:] = 1.0  # failover regional ativa o fallback
+        elif scenario == "mqtt_backpressure":
+            max_queue, above = mmc_queue_batch(
+                p["arrival_rate"], p["service_rate"], p["capacity"][architecture], p["sim_time"],
+                p["queue_threshold"], n_trials, rng,
+            )
+            out["max_queue_length"] = max_queue
+            out["time_queue_above_threshold"] = above
+            if architecture == "resilient":
+                out["fallback_activation_ratio"] = (max_queue > p["queue_threshold"]).astype(float)
+        elif scenario == "ia_drift":
+            observed = rng.binomial(p["drift_requests"], p["raw_invalid_rate"], n_trials) / p["drift_requests"]
+            if architecture == "resilient":
+                # o shield detecta o drift e o roteador responde com o fallback seguro
+                triggered = observed > p["alert_threshold"]
+                out["fallback_activation_ratio"] = triggered.astype(float)
+                out["avg_invalid_rate"] = np.where(triggered, 0.0, observed)
+            else:
+                out["avg_invalid_rate"] = observed
+        else:
+            raise ValueError(f"Cenário desconhecido: {scenario}")
+        return out
+
+
+def run_report(
+    n_runs: int,
+    scenarios: Sequence[str] = SCENARIOS,
+    architectures: Sequence[str] = ("legacy", "resilient"),
+    seed: Optional[int] = None,
+    batch_size: int = 1000,
+    params: Optional[Dict[str, Dict[str, object]]] = None,
+    progress: bool = False,
+) -> pd.DataFrame:
+    """Executa ``n_runs`` tentativas por cenário e arquitetura.
+
+    Cada lote ``(cenário, arquitetura, lote)`` usa um gerador derivado de
+    ``SeedSequence(seed)``, portanto o resultado não depende da ordem de
+    execução.  As linhas seguem a ordem do notebook (``run_id``, cenário,
+    arquitetura) e as colunas ``REPORT_COLUMNS``.
+    """
+    engine = ScenarioEngine(params)
+    entropy = np.random.SeedSequence(seed).entropy
+    frames: List[pd.DataFrame] = []
+    for s_idx, scenario in enumerate(scenarios):
+        for a_idx, architecture in enumerate(architectures):
+            started = time.perf_counter()
+            for b_idx, first in enumerate(range(0, n_runs, batch_size)):
+                n = min(batch_size, n_runs - first)
+                seq = np.random.SeedSequence(entropy, spawn_key=(SCENARIOS.index(scenario), a_idx, b_idx))
+                metrics = engine.run(scenario, architecture, n, np.random.default_rng(seq))
+                frame = pd.DataFrame(metrics)
+                frame.insert(0, "architecture", architecture)
+                frame.insert(0, "scenario", scenario)
+                frame["run_id"] = np.arange(first, first + n)
+                frame["_order"] = s_idx * len(architectures) + a_idx
+                frames.append(frame)
+            if progress:
+                print(
+                    f"{scenario}/{architecture}: {n_runs} tentativas em {time.perf_counter() - started:.1f}s",
+                    file=sys.stderr,
+                )
+    df = pd.concat(frames, ignore_index=True).sort_values(["run_id", "_order"], kind="stable")
+    for col in ("RTO_steps", "failed_nodes_count", "max_queue_length"):
+        df[col] = df[col].astype(int)
+    return df[REPORT_COLUMNS].reset_index(drop=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gera o relatório de cenários de resiliência (vetorizado)")
+    parser.add_argument("--n-runs", type=int, default=1000, help="Tentativas por cenário e arquitetura")
+    parser.add_argument(
+        "--scenarios",
+        type=lambda v: tuple(v.split(",")),
+        default=SCENARIOS,
+        help="Cenários separados por vírgula",
+    )
+    parser.add_argument("--batch-size", type=int, default=1000, help="Tentativas simuladas por lote")
+    parser.add_argument("--seed", type=int, default=None, help="Semente para reprodutibilidade")
+    parser.add_argument(
+        "--output-csv",
+        type=Path,
+        default=Path("deliverable/sim/3_simulation_report.csv"),
+        help="CSV do relatório (separado por ';')",
+    )
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Cenários desconhecidos: {', '.join(sorted(unknown))}")
+    df = run_report(args.n_runs, args.scenarios, seed=args.seed, batch_size=args.batch_size, progress=True)
+    df.to_csv(args.output_csv, sep=";", index=False)
+    print(df.groupby(["scenario", "architecture"]).mean(numeric_only=True).drop(columns="run_id").to_string())
+    print(f"Relatório salvo em {args.output_csv}")
+
+
+if __name__ == "__main__":
+    main()
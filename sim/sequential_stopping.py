@@ -0,0 +1,136 @@
+"""
+sequential_stopping.py
+----------------------
+
+Utilitários estatísticos para amostragem sequencial adaptativa.  Cada célula de
+parâmetros mantém médias e variâncias incrementais (algoritmo de Welford) das
+métricas de interesse; a amostragem de uma célula para quando a meia-largura
+do intervalo de confiança de todas as métricas atinge o alvo.  O orçamento de
+cada rodada é redistribuído entre as células ainda imprecisas na proporção do
+número de amostras que cada uma ainda precisa (estimado pela regra
+``n_total ≈ n * (meia_largura / alvo)^2``).
+
+Exemplo:
+
+```python
+from sim.sequential_stopping import RunningStats
+
+stats = RunningStats()
+for x in [1.0, 2.0, 3.0, 4.0]:
+    stats.add(x)
+print(stats.mean, stats.halfwidth(0.95))
+```
+"""
+
+import math
+from statistics import NormalDist
+from typing import Dict, Hashable, Iterable
+
+try:
+    from scipy.stats import t as student_t
+except ImportError:  # SciPy é opcional: sem ele vale a aproximação de ``t_quantile``
+    student_t = None
+
+# Limita a razão meia-largura/alvo ao estimar amostras restantes, evitando que
+# uma célula com alvo nulo (média zero em modo relativo) consuma todo o orçamento.
+MAX_PRECISION_RATIO = 10.0
+
+# Menor número de graus de liberdade em que a aproximação sem SciPy é aceitável
+MIN_APPROX_DF = 5
+
+
+def t_quantile(confidence: float, df: int) -> float:
+    """Quantil bilateral da distribuição t de Student.
+
+    Usa ``scipy.stats.t.ppf`` quando o SciPy está instalado.  Sem ele, aplica a
+    expansão de Cornish-Fisher de primeira ordem em torno da normal, que só
+    vale para ``df >= 5``; abaixo disso devolve ``inf`` (o intervalo não fecha
+    e a célula continua sendo amostrada) em vez de um quantil curto demais.
+    """
+    if df <= 0:
+        return math.inf
+    p = (1.0 + confidence) / 2.0
+    if student_t is not None:
+        return float(student_t.ppf(p, df))
+    if df < MIN_APPROX_DF:
+        return math.inf
+    z = NormalDist().inv_cdf(p)
+    return z + (z ** 3 + z) / (4.0 * df)
+
+
+class RunningStats:
+    """Média e variância incrementais (Welford)."""
+
+    __slots__ = ("n", "mean", "_m2")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (value - self.mean)
+
+    def update(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.n - 1) if self.n > 1 else math.inf
+
+    def halfwidth(self, confidence: float = 0.95) -> float:
+        """Meia-largura do intervalo de confiança da média."""
+        if self.n < 2:
+            return math.inf
+        return t_quantile(confidence, self.n - 1) * math.sqrt(self.variance / self.n)
+
+
+def precision_ratio(
+    stats: Dict[str, RunningStats], target: float, relative: bool = True, confidence: float = 0.95
+) -> float:
+    """Maior razão meia-largura/alvo entre as métricas de uma célula.
+
+    Com ``relative=True`` o alvo é ``target * |média|``; caso contrário é a
+    própria meia-largura absoluta ``target``.  Valores ``<= 1`` indicam que a
+    célula atingiu a precisão desejada.
+    """
+    worst = 0.0
+    for metric in stats.values():
+        hw = metric.halfwidth(confidence)
+        if hw == 0.0:
+            continue
+        goal = target * abs(metric.mean) if relative else target
+        worst = max(worst, hw / goal if goal > 0 else math.inf)
+    return worst
+
+
+def allocate_samples(
+    ratios: Dict[Hashable, float], counts: Dict[Hashable, int], budget: int
+) -> Dict[Hashable, int]:
+    """Distribui até ``budget`` amostras entre células com ``ratio > 1``.
+
+    Cada célula precisa de aproximadamente ``n * (ratio^2 - 1)`` amostras
+    adicionais; se a necessidade total exceder o orçamento, ele é dividido
+    proporcionalmente, priorizando as células mais imprecisas.
+    """
+    need = {}
+    for cell, ratio in ratios.items():
+        if ratio > 1.0:
+            ratio = min(ratio, MAX_PRECISION_RATIO)
+            need[cell] = max(1, math.ceil(counts[cell] * (ratio ** 2 - 1.0)))
+    total = sum(need.values())
+    if total <= budget:
+        return need
+    allocation: Dict[Hashable, int] = {}
+    remaining = budget
+    for cell in sorted(need, key=need.get, reverse=True):
+        if remaining <= 0:
+            break
+        share = min(remaining, max(1, budget * need[cell] // total))
+        allocation[cell] = share
+        remaining -= share
+    return allocation
@@ -0,0 +1,366 @@
+"""
+sweep.py
+--------
+
+Varreduras declarativas de cenários com desenhos de preenchimento de espaço.
+Em vez de grades fixas, um arquivo JSON descreve intervalos contínuos (ou
+inteiros) para os parâmetros da simulação de Monte Carlo; os pontos são
+amostrados por hipercubo latino (``lhs``) ou sequência de Sobol (``sobol``),
+avaliados em paralelo e usados para ajustar um modelo substituto barato
+(polinomial ou processo gaussiano) que interpola as superfícies de impacto
+sem simular todas as combinações.
+
+Formato do arquivo de especificação:
+
+```json
+{
+  "design": "lhs",
+  "n_points": 64,
+  "n_sims": 20,
+  "seed": 7,
+  "parameters": {
+    "p_node": {"low": 0.01, "high": 0.3},
+    "capacity": {"low": 1, "high": 4, "type": "int"},
+    "service_rate": {"value": 12.0}
+  },
+  "metrics": ["user_impact_pct", "recovery_time", "avg_wait"],
+  "surrogate": {"kind": "polynomial", "degree": 2}
+}
+```
+
+No desenho ``sobol`` o número de pontos é arredondado para a potência de 2
+seguinte (ex.: 48 vira 64): só blocos de ``2^m`` pontos da sequência mantêm o
+balanceamento entre os intervalos elementares; um prefixo truncado não mantém.
+
+Parâmetros aceitos: ``p_node``, ``p_propagate``, ``capacity``,
+``arrival_rate`` e ``service_rate``; os ausentes usam os padrões de
+``monte_carlo``.
+
+Uso:
+
+```bash
+python -m sim.sweep --spec sim/sweeps/example_sweep.json --graph-path data/graph.json \
+  --workers 4 --output-csv sweep_points.csv --surface p_node,capacity --surface-csv sweep_surface.csv
+```
+"""
+
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from .monte_carlo_resilience import ProgressReporter, SubsimulationRunner, load_graph
+from .result_cache import ResultCache
+
+SWEEP_PARAMETERS = {
+    "p_node": 0.1,
+    "p_propagate": 0.3,
+    "capacity": 2,
+    "arrival_rate": 10.0,
+    "service_rate": 12.0,
+}
+DEFAULT_METRICS = ("user_impact_pct", "recovery_time", "avg_wait")
+
+
+def load_sweep_spec(path: Path) -> Dict[str, object]:
+    """Lê e valida um arquivo de especificação de varredura."""
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    unknown = set(spec.get("parameters", {})) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos na varredura: {sorted(unknown)}")
+    if spec.get("design", "lhs") not in ("lhs", "sobol"):
+        raise ValueError(f"Desenho desconhecido: {spec['design']}")
+    for name, param in spec.get("parameters", {}).items():
+        if "value" not in param and not param.get("low", 0) < param.get("high", 0):
+            raise ValueError(f"Intervalo inválido para {name}: {param}")
+    return spec
+
+
+def varying_parameters(spec: Dict[str, object]) -> List[str]:
+    """Nomes dos parâmetros com intervalo (dimensões do desenho), em ordem estável."""
+    return [name for name, param in spec.get("parameters", {}).items() if "value" not in param]
+
+
+def latin_hypercube(n_points: int, n_dims: int, rng: np.random.Generator) -> np.ndarray:
+    """Hipercubo latino em ``[0, 1)^d``: cada estrato de cada dimensão recebe um ponto."""
+    strata = np.tile(np.arange(n_points), (n_dims, 1))
+    strata = rng.permuted(strata, axis=1).T
+    return (strata + rng.random((n_points, n_dims))) / n_points
+
+
+def sobol_sequence(n_points: int, n_dims: int, seed: Optional[int]) -> np.ndarray:
+    """Sequência de Sobol embaralhada (Owen) em ``[0, 1)^d`` com ``n_points`` arredondado para ``2^m``."""
+    try:
+        from scipy.stats import qmc
+    except ImportError:
+        raise ImportError("O desenho 'sobol' requer SciPy. Execute `pip install scipy` ou use 'lhs'.")
+    sampler = qmc.Sobol(d=n_dims, scramble=True, seed=seed)
+    m = int(np.ceil(np.log2(max(n_points, 1))))
+    # o bloco inteiro de 2^m pontos: truncá-lo perderia o balanceamento da sequência
+    return sampler.random_base2(m)
+
+
+def design_points(spec: Dict[str, object]) -> List[Dict[str, float]]:
+    """Amostra os pontos da varredura e os converte para o espaço dos parâmetros."""
+    names = varying_parameters(spec)
+    n_points = int(spec.get("n_points", 32))
+    seed = spec.get("seed")
+    if spec.get("design", "lhs") == "sobol":
+        unit = sobol_sequence(n_points, len(names), seed)
+    else:
+        unit = latin_hypercube(n_points, len(names), np.random.default_rng(seed))
+    points = []
+    for row in unit:
+        point = dict(SWEEP_PARAMETERS)
+        for name, param in spec.get("parameters", {}).items():
+            if "value" in param:
+                point[name] = param["value"]
+        for name, u in zip(names, row):
+            param = spec["parameters"][name]
+            low, high = param["low"], param["high"]
+            if param.get("type") == "int":
+                # estratos de mesma largura para cada inteiro do intervalo fechado
+                point[name] = int(min(high, low + np.floor(u * (high - low + 1))))
+            else:
+                point[name] = float(low + u * (high - low))
+        points.append(point)
+    return points
+
+
+# Estado de cada processo avaliador (definido pelo initializer do pool)
+_SWEEP_CONTEXT: Dict[str, object] = {}
+
+
+def _init_sweep_context(G: nx.DiGraph, n_sims: int, seed: Optional[int], metrics: Tuple[str, ...], cache_dir) -> None:
+    _SWEEP_CONTEXT.update(graph=G, n_sims=n_sims, seed=seed, metrics=metrics, cache=ResultCache(cache_dir))
+
+
+def _evaluate_point(point: Dict[str, float]) -> Dict[str, float]:
+    """Executa ``n_sims`` tentativas de um ponto e resume média e desvio das métricas."""
+    ctx = _SWEEP_CONTEXT
+    runner = SubsimulationRunner(
+        ctx["graph"],
+        p_propagate=point["p_propagate"],
+        arrival_rate=point["arrival_rate"],
+        service_rate=point["service_rate"],
+        seed=ctx["seed"],
+        cache=ctx["cache"],
+    )
+    with runner:
+        rows = runner.cell_rows(point["p_node"], int(point["capacity"]), list(range(ctx["n_sims"])))
+    summary = dict(point)
+    for metric in ctx["metrics"]:
+        values = np.array([row[metric] for row in rows], dtype=float)
+        summary[f"{metric}_mean"] = float(values.mean())
+        summary[f"{metric}_std"] = float(values.std(ddof=1)) if len(values) > 1 else 0.0
+    return summary
+
+
+def run_sweep(
+    G: nx.DiGraph,
+    spec: Dict[str, object],
+    workers: int = 1,
+    progress: bool = False,
+    cache_dir: Optional[Path] = None,
+) -> pd.DataFrame:
+    """Avalia todos os pontos do desenho (em paralelo se ``workers > 1``).
+
+    Cada ponto usa a mesma semente raiz (``spec["seed"]``) e o mecanismo de
+    sub-simulações memorizadas de ``monte_carlo``; com ``cache_dir`` os
+    resultados são compartilhados entre processos e execuções.
+    """
+    points = design_points(spec)
+    metrics = tuple(spec.get("metrics", DEFAULT_METRICS))
+    initargs = (G, int(spec.get("n_sims", 20)), spec.get("seed"), metrics, cache_dir)
+    reporter = ProgressReporter(len(points), enabled=progress)
+    results = []
+    if workers <= 1:
+        _init_sweep_context(*initargs)
+        for point in points:
+            results.append(_evaluate_point(point))
+            reporter.update()
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_context, initargs=initargs) as pool:
+            for result in pool.map(_evaluate_point, points):
+                results.append(result)
+                reporter.update()
+    return pd.DataFrame(results)
+
+
+class _Scaler:
+    """Normaliza entradas para o cubo unitário a partir dos limites da especificação."""
+
+    def __init__(self, bounds: np.ndarray):
+        self.low = bounds[:, 0]
+        self.span = np.where(bounds[:, 1] > bounds[:, 0], bounds[:, 1] - bounds[:, 0], 1.0)
+
+    def __call__(self, X: np.ndarray) -> np.ndarray:
+        return (np.asarray(X, dtype=float) - self.low) / self.span
+
+
+class PolynomialSurrogate:
+    """Regressão polinomial (com termos cruzados) ajustada por mínimos quadrados com ridge."""
+
+    def __init__(self, bounds: np.ndarray, degree: int = 2, ridge: float = 1e-6):
+        self.scale = _Scaler(bounds)
+        self.degree = degree
+        self.ridge = ridge
+        self.coef: Optional[np.ndarray] = None
+
+    def _features(self, X: np.ndarray) -> np.ndarray:
+        Z = self.scale(X)
+        columns = [np.ones(len(Z))]
+        for d in range(1, self.degree + 1):
+            for combo in itertools.combinations_with_replacement(range(Z.shape[1]), d):
+                columns.append(np.prod(Z[:, combo], axis=1))
+        return np.column_stack(columns)
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "PolynomialSurrogate":
+        F = self._features(X)
+        A = F.T @ F + self.ridge * np.eye(F.shape[1])
+        self.coef = np.linalg.solve(A, F.T @ np.asarray(y, dtype=float))
+        return self
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self._features(X) @ self.coef
+
+
+class GaussianProcessSurrogate:
+    """Processo gaussiano com kernel RBF; hiperparâmetros escolhidos por verossimilhança marginal.
+
+    ``predict`` retorna a média posterior; ``predict_std`` o desvio padrão,
+    útil para decidir onde simular novos pontos.
+    """
+
+    def __init__(self, bounds: np.ndarray, length_scales=(0.1, 0.2, 0.4, 0.8), noise: float = 1e-2):
+        self.scale = _Scaler(bounds)
+        self.length_scales = length_scales
+        self.noise = noise
+
+    @staticmethod
+    def _kernel(A: np.ndarray, B: np.ndarray, length_scale: float) -> np.ndarray:
+        sq = np.sum(A ** 2, 1)[:, None] + np.sum(B ** 2, 1)[None, :] - 2 * A @ B.T
+        return np.exp(-0.5 * np.maximum(sq, 0.0) / length_scale ** 2)
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "GaussianProcessSurrogate":
+        Z = self.scale(X)
+        y = np.asarray(y, dtype=float)
+        self.y_mean = y.mean()
+        self.y_std = y.std() or 1.0
+        t = (y - self.y_mean) / self.y_std
+        best = None
+        for length_scale in self.length_scales:
+            K = self._kernel(Z, Z, length_scale) + self.noise * np.eye(len(Z))
+            L = np.linalg.cholesky(K)
+            alpha = np.linalg.solve(L.T, np.linalg.solve(L, t))
+            log_likelihood = -0.5 * t @ alpha - np.log(np.diag(L)).sum()
+            if best is None or log_likelihood > best[0]:
+                best = (log_likelihood, length_scale, L, alpha)
+        _, self.length_scale, self._L, self._alpha = best
+        self._Z = Z
+        return self
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        Ks = self._kernel(self.scale(X), self._Z, self.length_scale)
+        return self.y_mean + self.y_std * (Ks @ self._alpha)
+
+    def predict_std(self, X: np.ndarray) -> np.ndarray:
+        Ks = self._kernel(self.scale(X), self._Z, self.length_scale)
+        v = np.linalg.solve(self._L, Ks.T)
+        return self.y_std * np.sqrt(np.maximum(1.0 - np.sum(v ** 2, axis=0), 0.0))
+
+
+def parameter_bounds(spec: Dict[str, object]) -> np.ndarray:
+    """Limites ``(low, high)`` de cada parâmetro variável, na ordem de ``varying_parameters``."""
+    return np.array([[spec["parameters"][n]["low"], spec["parameters"][n]["high"]] for n in varying_parameters(spec)])
+
+
+def fit_surrogate(spec: Dict[str, object], df: pd.DataFrame, metric: str):
+    """Ajusta o substituto configurado em ``spec["surrogate"]`` para ``<metric>_mean``."""
+    config = dict(spec.get("surrogate", {"kind": "polynomial"}))
+    kind = config.pop("kind", "polynomial")
+    bounds = parameter_bounds(spec)
+    X = df[varying_parameters(spec)].to_numpy(dtype=float)
+    y = df[f"{metric}_mean"].to_numpy(dtype=float)
+    if kind == "gp":
+        model = GaussianProcessSurrogate(bounds, **config)
+    elif kind == "polynomial":
+        model = PolynomialSurrogate(bounds, **config)
+    else:
+        raise ValueError(f"Substituto desconhecido: {kind}")
+    return model.fit(X, y)
+
+
+def cross_validated_r2(spec: Dict[str, object], df: pd.DataFrame, metric: str, folds: int = 5, seed: int = 0) -> float:
+    """R² do substituto em validação cruzada k-fold (qualidade da interpolação)."""
+    order = np.random.default_rng(seed).permutation(len(df))
+    y = df[f"{metric}_mean"].to_numpy(dtype=float)
+    predictions = np.empty(len(df))
+    names = varying_parameters(spec)
+    for fold in np.array_split(order, min(folds, len(df))):
+        train = df.drop(df.index[fold])
+        model = fit_surrogate(spec, train, metric)
+        predictions[fold] = model.predict(df.iloc[fold][names].to_numpy(dtype=float))
+    residual = np.sum((y - predictions) ** 2)
+    total = np.sum((y - y.mean()) ** 2)
+    return float(1.0 - residual / total) if total > 0 else 1.0
+
+
+def predict_surface(
+    spec: Dict[str, object], df: pd.DataFrame, axes: Tuple[str, str], resolution: int = 25
+) -> pd.DataFrame:
+    """Interpola as métricas numa grade 2D de ``axes``; demais parâmetros no ponto médio."""
+    names = varying_parameters(spec)
+    bounds = dict(zip(names, parameter_bounds(spec)))
+    grids = [np.linspace(bounds[a][0], bounds[a][1], resolution) for a in axes]
+    mesh = np.array(list(itertools.product(*grids)))
+    X = np.column_stack([
+        mesh[:, axes.index(n)] if n in axes else np.full(len(mesh), bounds[n].mean()) for n in names
+    ])
+    surface = pd.DataFrame(X, columns=names)
+    for metric in spec.get("metrics", DEFAULT_METRICS):
+        surface[f"{metric}_pred"] = fit_surrogate(spec, df, metric).predict(X)
+    return surface
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Varredura de cenários com desenhos de preenchimento de espaço")
+    parser.add_argument("--spec", type=Path, required=True, help="Arquivo JSON com a especificação da varredura")
+    parser.add_argument("--graph-path", type=Path, default=Path("data/graph.json"), help="Caminho para o grafo JSON")
+    parser.add_argument("--workers", type=int, default=1, help="Número de processos paralelos (0 = todos os núcleos)")
+    parser.add_argument("--cache-dir", type=Path, default=None, help="Diretório de cache de sub-simulações")
+    parser.add_argument("--output-csv", type=Path, default=Path("sweep_points.csv"), help="CSV com os pontos avaliados")
+    parser.add_argument(
+        "--surface",
+        type=lambda v: tuple(v.split(",")),
+        default=None,
+        help="Dois parâmetros (separados por vírgula) para interpolar uma superfície com o substituto",
+    )
+    parser.add_argument("--surface-csv", type=Path, default=Path("sweep_surface.csv"), help="CSV da superfície interpolada")
+    parser.add_argument("--resolution", type=int, default=25, help="Pontos por eixo da superfície")
+    parser.add_argument("--no-progress", action="store_true", help="Desativa a exibição de progresso/ETA")
+    args = parser.parse_args()
+    spec = load_sweep_spec(args.spec)
+    G = load_graph(args.graph_path)
+    df = run_sweep(G, spec, workers=args.workers or os.cpu_count() or 1, progress=not args.no_progress, cache_dir=args.cache_dir)
+    df.to_csv(args.output_csv, index=False)
+    print(f"{len(df)} pontos salvos em {args.output_csv}")
+    for metric in spec.get("metrics", DEFAULT_METRICS):
+        print(f"R² (validação cruzada) do substituto para {metric}: {cross_validated_r2(spec, df, metric):.3f}")
+    if args.surface:
+        if len(args.surface) != 2 or not set(args.surface) <= set(varying_parameters(spec)):
+            parser.error("--surface requer dois parâmetros variáveis da especificação")
+        predict_surface(spec, df, args.surface, args.resolution).to_csv(args.surface_csv, index=False)
+        print(f"Superfície interpolada salva em {args.surface_csv}")
+
+
+if __name__ == "__main__":
+    main()
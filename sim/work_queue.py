@@ -0,0 +1,304 @@
+"""
+work_queue.py
+-------------
+
+Backend coordenador/worker para distribuir as sub-simulações de
+``monte_carlo`` entre vários processos ou hosts, usando uma tabela de tarefas
+SQLite como broker (sem serviços externos).  O coordenador insere lotes de
+chaves de sub-simulação; cada worker reivindica um lote com um *lease*
+(prazo), renova o lease periodicamente (heartbeat) enquanto executa e grava os
+resultados.  Lotes cujo lease expira — worker morto ou host perdido — voltam a
+ficar disponíveis e são reatribuídos a outro worker.
+
+O grafo e a entropia raiz ficam gravados no próprio banco, portanto um worker
+precisa apenas do caminho do arquivo.  Para vários hosts, o arquivo deve estar
+em um sistema de arquivos compartilhado com locks POSIX funcionais (ex.: NFSv4
+com ``lockd``); em um único host basta um diretório local.
+
+Uso:
+
+```bash
+# coordenador (executa a varredura e aguarda os workers)
+python -m sim.monte_carlo_resilience --graph-path data/graph.json --queue-db /shared/sweep.db
+
+# em cada host/processo worker
+python -m sim.work_queue worker --db /shared/sweep.db
+```
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+import networkx as nx
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+"""
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path), timeout=60.0, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 60000")
+    return conn
+
+
+class WorkQueue:
+    """Tabela de tarefas com leases sobre um arquivo SQLite."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.conn = _connect(self.db_path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def set_meta(self, key: str, value: object) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def get_meta(self, key: str, default: object = None) -> object:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def submit(self, payloads: Iterable[object]) -> List[int]:
+        """Enfileira tarefas e retorna seus ids."""
+        ids = []
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for payload in payloads:
+                cursor = self.conn.execute("INSERT INTO tasks (payload) VALUES (?)", (json.dumps(payload),))
+                ids.append(cursor.lastrowid)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return ids
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Tuple[int, object]]:
+        """Reivindica a tarefa pendente (ou com lease expirado) mais antiga."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT id, payload FROM tasks WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (worker, now + lease_seconds, row[0]),
+                )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def heartbeat(self, task_id: int, worker: str, lease_seconds: float) -> bool:
+        """Renova o lease; retorna ``False`` se a tarefa foi reatribuída ou concluída."""
+        cursor = self.conn.execute(
+            "UPDATE tasks SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease_seconds, task_id, worker),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, task_id: int, worker: str, result: object) -> bool:
+        """Grava o resultado.  Se outro worker já concluiu a tarefa, ignora (idempotente)."""
+        cursor = self.conn.execute(
+            "UPDATE tasks SET status = 'done', worker = ?, result = ?, lease_expires = NULL "
+            "WHERE id = ? AND status != 'done'",
+            (worker, json.dumps(result), task_id),
+        )
+        return cursor.rowcount == 1
+
+    def results(self, task_ids: List[int]) -> Dict[int, object]:
+        """Resultados já concluídos entre ``task_ids``."""
+        found: Dict[int, object] = {}
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for task_id, result in self.conn.execute(
+                f"SELECT id, result FROM tasks WHERE status = 'done' AND id IN ({marks})", chunk
+            ):
+                found[task_id] = json.loads(result)
+        return found
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+
+
+def graph_to_json(G: nx.DiGraph) -> Dict[str, List[Dict[str, object]]]:
+    """Serializa o grafo no formato de ``data/generate_graph.py``."""
+    return {
+        "nodes": [{"id": n, **attr} for n, attr in G.nodes(data=True)],
+        "edges": [{"source": u, "target": v, **attr} for u, v, attr in G.edges(data=True)],
+    }
+
+
+def graph_from_json(data: Dict[str, List[Dict[str, object]]]) -> nx.DiGraph:
+    G = nx.DiGraph()
+    for node in data["nodes"]:
+        G.add_node(node["id"], **{k: v for k, v in node.items() if k != "id"})
+    for edge in data["edges"]:
+        G.add_edge(edge["source"], edge["target"], **{k: v for k, v in edge.items() if k not in ("source", "target")})
+    return G
+
+
+def _as_key(value: object) -> Tuple[Hashable, ...]:
+    # JSON converte tuplas em listas; a chave precisa voltar a ser a mesma tupla
+    return tuple(value)
+
+
+class SqliteWorkQueueExecutor:
+    """Lado coordenador: expõe ``map`` como um pool, mas executa via workers da fila.
+
+    Apenas ``_run_subsimulation`` é suportada, já que os workers conhecem uma
+    única função; os lotes têm ``chunksize`` chaves.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        G: nx.DiGraph,
+        entropy: int,
+        poll_interval: float = 0.2,
+        timeout: Optional[float] = None,
+    ):
+        self.queue = WorkQueue(db_path)
+        self.run_id = uuid.uuid4().hex
+        # um arquivo de fila atende uma execução por vez: descarta tarefas antigas
+        self.queue.conn.execute("DELETE FROM tasks")
+        self.queue.set_meta("graph", graph_to_json(G))
+        self.queue.set_meta("entropy", str(entropy))
+        self.queue.set_meta("run", self.run_id)
+        self.queue.set_meta("closed", False)
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def map(self, fn: Callable, keys: Iterable[Tuple[Hashable, ...]], chunksize: int = 1) -> Iterator[Dict[str, object]]:
+        keys = list(keys)
+        batches = [keys[i:i + chunksize] for i in range(0, len(keys), max(1, chunksize))]
+        task_ids = self.queue.submit([{"run": self.run_id, "keys": batch} for batch in batches])
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        done: Dict[int, object] = {}
+        while len(done) < len(task_ids):
+            done.update(self.queue.results([t for t in task_ids if t not in done]))
+            if len(done) < len(task_ids):
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"{len(task_ids) - len(done)} lotes sem resultado em {self.queue.db_path}")
+                time.sleep(self.poll_interval)
+        for task_id in task_ids:
+            yield from done[task_id]
+
+    def shutdown(self) -> None:
+        """Sinaliza aos workers que não haverá novas tarefas."""
+        self.queue.set_meta("closed", True)
+        self.queue.close()
+
+
+def run_worker(
+    db_path: Path,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = 30.0,
+    poll_interval: float = 0.5,
+    max_idle: Optional[float] = None,
+) -> int:
+    """Executa lotes da fila até o coordenador fechá-la; retorna lotes concluídos.
+
+    O grafo e a entropia são lidos do banco na primeira tarefa de cada
+    execução do coordenador.  Enquanto um lote é processado, uma thread renova o lease a cada
+    ``lease_seconds / 3``.  O worker encerra quando a fila está fechada e sem
+    tarefas pendentes, ou após ``max_idle`` segundos sem trabalho.
+    """
+    from .monte_carlo_resilience import _init_task_context, _run_subsimulation
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    queue = WorkQueue(db_path)
+    run_id = None
+    completed = 0
+    idle_since = time.monotonic()
+    try:
+        while True:
+            claimed = queue.claim(worker_id, lease_seconds)
+            if claimed is None:
+                counts = queue.counts()
+                if queue.get_meta("closed") and not counts.get("pending") and not counts.get("leased"):
+                    break
+                if max_idle is not None and time.monotonic() - idle_since > max_idle:
+                    break
+                time.sleep(poll_interval)
+                continue
+            task_id, payload = claimed
+            if payload["run"] != run_id:
+                # nova execução do coordenador: recarrega grafo e entropia
+                _init_task_context(graph_from_json(queue.get_meta("graph")), {"entropy": int(queue.get_meta("entropy"))})
+                run_id = payload["run"]
+            stop = threading.Event()
+            beat = threading.Thread(
+                target=_heartbeat_loop, args=(db_path, task_id, worker_id, lease_seconds, stop), daemon=True
+            )
+            beat.start()
+            try:
+                results = [_run_subsimulation(_as_key(key)) for key in payload["keys"]]
+            finally:
+                stop.set()
+                beat.join()
+            queue.complete(task_id, worker_id, results)
+            completed += 1
+            idle_since = time.monotonic()
+    finally:
+        queue.close()
+    return completed
+
+
+def _heartbeat_loop(db_path: Path, task_id: int, worker_id: str, lease_seconds: float, stop: threading.Event) -> None:
+    queue = WorkQueue(db_path)  # conexão própria: sqlite3 não compartilha conexões entre threads
+    try:
+        while not stop.wait(lease_seconds / 3.0):
+            queue.heartbeat(task_id, worker_id, lease_seconds)
+    finally:
+        queue.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Worker da fila SQLite de sub-simulações")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("worker", help="Processa lotes até a fila ser fechada pelo coordenador")
+    worker.add_argument("--db", type=Path, required=True, help="Arquivo SQLite da fila")
+    worker.add_argument("--worker-id", type=str, default=None, help="Identificador do worker (padrão: host-pid)")
+    worker.add_argument("--lease-seconds", type=float, default=30.0, help="Duração do lease de cada lote")
+    worker.add_argument("--max-idle", type=float, default=None, help="Encerra após N segundos sem trabalho")
+    status = sub.add_parser("status", help="Mostra a contagem de tarefas por estado")
+    status.add_argument("--db", type=Path, required=True, help="Arquivo SQLite da fila")
+    args = parser.parse_args()
+    if args.command == "worker":
+        done = run_worker(args.db, args.worker_id, args.lease_seconds, max_idle=args.max_idle)
+        print(f"Worker concluiu {done} lotes")
+    else:
+        queue = WorkQueue(args.db)
+        print(json.dumps(queue.counts()))
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,16 @@ distribuição das classes previstas.  Os testes utilizam o módulo `pytest` e
 podem ser executados com `pytest tests/`.
 """
 
+from pathlib import Path
+
 import numpy as np
+import pytest
 import torch
 
 from helius_sim_lab.ml.train_gnn import GraphSAGEModel
 
+GRAPH_JSON = Path(__file__).resolve().parents[1] / "data" / "graph.json"
+
 
 def test_gnn_output_shape():
     """Verifica se o modelo GraphSAGE produz saída com a forma correta."""
@@ -34,4 +39,361 @@ def test_fairness_distribution():
     preds = rng.choice([0, 1, 2], size=100, p=[0.5, 0.3, 0.2])
     unique, counts = np.unique(preds, return_counts=True)
     max_share = counts.max() / counts.sum()
-    assert max_share < 0.8, f"Distribuição enviesada: maior classe com {max_share*100:.1f}% das amostras"
\ No newline at end of file
+    assert max_share < 0.8, f"Distribuição enviesada: maior classe com {max_share*100:.1f}% das amostras"
+
+
+def test_dataset_cache_and_csr(tmp_path, monkeypatch):
+    """O dataset lido do CSR equivale ao do JSON e execuções repetidas usam o cache."""
+    from helius_sim_lab.ml import train_gnn
+    from helius_sim_lab.sim.graph_csr import from_networkx, save_npz
+    from helius_sim_lab.sim.monte_carlo_resilience import load_graph
+
+    graph_npz = tmp_path / "graph.csr.npz"
+    save_npz(from_networkx(load_graph(GRAPH_JSON)), graph_npz)
+    data_json, cats_json = train_gnn.build_dataset(train_gnn.load_graph(GRAPH_JSON), feature_seed=3)
+    data_csr, cats_csr = train_gnn.load_dataset(str(graph_npz), feature_seed=3)
+    assert cats_json == cats_csr
+    assert torch.equal(data_json.x, data_csr.x) and torch.equal(data_json.y, data_csr.y)
+    def as_set(edge_index):
+        return set(map(tuple, edge_index.t().tolist()))
+
+    assert as_set(data_json.edge_index) == as_set(data_csr.edge_index)
+
+    cache_dir = tmp_path / "cache"
+    first, _ = train_gnn.load_dataset(str(graph_npz), cache_dir, feature_seed=3)
+    assert len(list(cache_dir.glob("*.pt"))) == 1
+    with monkeypatch.context() as m:
+        m.setattr(train_gnn, "build_dataset_from_arrays", None)  # um acerto no cache não reconstrói nada
+        second, cats = train_gnn.load_dataset(str(graph_npz), cache_dir, feature_seed=3)
+    assert cats == cats_csr and torch.equal(first.x, second.x) and torch.equal(first.edge_index, second.edge_index)
+    train_gnn.load_dataset(str(graph_npz), cache_dir, feature_seed=4)
+    assert len(list(cache_dir.glob("*.pt"))) == 2
+
+
+def test_neighbor_sampler_bounded_subgraph():
+    """Lotes amostrados: sementes primeiro, arestas reais e fanout respeitado."""
+    from helius_sim_lab.ml import train_gnn
+    from helius_sim_lab.ml.neighbor_sampler import NeighborSampler, neighbor_loader
+
+    data, _ = train_gnn.build_dataset(train_gnn.load_graph(GRAPH_JSON), feature_seed=0)
+    edges = set(map(tuple, data.edge_index.t().tolist()))
+    fanouts = [3, 2]
+    sampler = NeighborSampler(data, fanouts, seed=0)
+    seeds = np.arange(0, data.num_nodes, 5)
+    batches = list(neighbor_loader(sampler, seeds, batch_size=4))
+    assert sum(b.batch_size for b in batches) == len(seeds)
+    for batch in batches:
+        n_id = batch.n_id
+        assert len(set(n_id.tolist())) == len(n_id)
+        assert torch.equal(batch.y, data.y[n_id[: batch.batch_size]])
+        assert len(n_id) <= batch.batch_size * (1 + 3 + 3 * 2)
+        src, dst = n_id[batch.edge_index]
+        assert set(zip(src.tolist(), dst.tolist())) <= edges
+        # cada semente recebe no máximo ``fanouts[0]`` vizinhos distintos
+        in_deg = torch.bincount(batch.edge_index[1], minlength=len(n_id))[: batch.batch_size]
+        assert int(in_deg.max()) <= 3
+
+
+def test_train_model_rejects_non_positive_intervals():
+    from helius_sim_lab.ml import train_gnn
+
+    data, categories = train_gnn.build_dataset(train_gnn.load_graph(GRAPH_JSON), feature_seed=0)
+    for interval in ({"eval_every": 0}, {"log_every": -1}):
+        with pytest.raises(ValueError):
+            train_gnn.train_model(data, len(categories), "invalid", "file:///nonexistent", epochs=1, **interval)
+
+
+def test_metric_buffer_batches_log_calls():
+    """O buffer envia as métricas acumuladas em lotes de até ``MAX_BATCH``."""
+    from helius_sim_lab.ml.train_gnn import MetricBuffer, PhaseTimer
+
+    class RecordingClient:
+        def __init__(self):
+            self.calls = []
+
+        def log_batch(self, run_id, metrics):
+            self.calls.append((run_id, list(metrics)))
+
+    client = RecordingClient()
+    buffer = MetricBuffer("run", client)
+    buffer.MAX_BATCH = 4
+    for epoch in range(1, 4):
+        buffer.add({"train_loss": 1.0 / epoch, "train_accuracy": 0.5}, step=epoch)
+    assert client.calls == []
+    buffer.flush()
+    assert [len(m) for _, m in client.calls] == [4, 2]
+    assert [(m.key, m.step) for _, batch in client.calls for m in batch][-2:] == [("train_loss", 3), ("train_accuracy", 3)]
+    buffer.flush()
+    assert len(client.calls) == 2
+
+    timer = PhaseTimer()
+    with timer.phase("train"):
+        pass
+    breakdown = timer.breakdown(epochs=2)
+    assert set(breakdown) == {"train"} and abs(breakdown["train"]["share"] - 1.0) < 1e-9
+
+
+def test_embedding_store_roundtrip(tmp_path):
+    """Os embeddings gravados são lidos somente leitura via memmap e indexados por id."""
+    from helius_sim_lab.ml import train_gnn
+    from helius_sim_lab.ml.embedding_store import EmbeddingStore, latest_version
+
+    data, categories = train_gnn.build_dataset(train_gnn.load_graph(GRAPH_JSON), feature_seed=0)
+    ids = train_gnn.load_node_ids(GRAPH_JSON)
+    torch.manual_seed(0)
+    model = train_gnn.GraphSAGEModel(data.x.size(1), 8, len(categories))
+    train_gnn.export_embeddings(model, data, ids, str(tmp_path), "v1", {"run_id": "test"})
+    assert latest_version(tmp_path) == "v1"
+
+    store = EmbeddingStore.open_latest(tmp_path)
+    assert isinstance(store.output, np.memmap) and store.output.dtype == np.float32
+    assert store.meta["dims"] == {"hidden": 8, "output": len(categories)} and store.meta["run_id"] == "test"
+    with torch.no_grad():
+        expected = model(data.x, data.edge_index).numpy()
+    picked = ids[[5, 0, 17]]
+    np.testing.assert_allclose(store.get(picked), expected[[5, 0, 17]], rtol=1e-6)
+    assert store.rows([picked[0], -123]).tolist() == [5, -1]
+    with pytest.raises(KeyError):
+        store.get([-123])
+    with pytest.raises(ValueError):
+        store.output[0, 0] = 1.0
+
+
+def test_embedding_store_string_ids_are_not_truncated(tmp_path):
+    """Ids de texto mais longos que os guardados não casam com um prefixo nem são cortados no ``grow``."""
+    from helius_sim_lab.ml.embedding_store import EmbeddingStore, write_embeddings
+
+    ids = np.array(["svc_b", "svc_a"])
+    write_embeddings(tmp_path, "v1", ids, {"output": np.eye(2, dtype=np.float32)})
+    store = EmbeddingStore.open_latest(tmp_path, mode="r+")
+    assert store.rows(["svc_a", "svc_a_extra", "svc", 7]).tolist() == [1, -1, -1, -1]
+    assert store.grow(["svc_a_extra"]).tolist() == [2]
+    assert store.ids.tolist() == ["svc_b", "svc_a", "svc_a_extra"]
+    assert store.rows(["svc_a_extra", "svc_a"]).tolist() == [2, 1]
+
+
+def test_incremental_refresh_matches_full_recompute(tmp_path):
+    """Após um delta, as linhas atualizadas no lugar igualam um recálculo completo."""
+    from helius_sim_lab.ml import train_gnn
+    from helius_sim_lab.ml.embedding_refresh import GraphDelta, refresh_embeddings
+    from helius_sim_lab.ml.embedding_store import EmbeddingStore
+
+    data, categories = train_gnn.build_dataset(train_gnn.load_graph(GRAPH_JSON), feature_seed=0)
+    ids = train_gnn.load_node_ids(GRAPH_JSON)
+    torch.manual_seed(0)
+    model = train_gnn.GraphSAGEModel(data.x.size(1), 8, len(categories))
+    meta = {"categories": categories, "feature_seed": 0}
+    train_gnn.export_embeddings(model, data, ids, str(tmp_path), "v1", meta)
+    src, dst = data.edge_index[:, 0].tolist()
+    delta = GraphDelta(
+        added_nodes=[{"id": 1000, "category": categories[0]}],
+        removed_nodes=[ids[10]],
+        added_edges=[(1000, ids[3]), (ids[7], ids[40])],
+        removed_edges=[(ids[src], ids[dst])],
+    )
+    store = EmbeddingStore.open_latest(tmp_path, mode="r+")
+    result = refresh_embeddings(store, model, delta)
+    assert len(result.output_rows) < len(store) - 1
+
+    reader = EmbeddingStore.open_latest(tmp_path)
+    assert reader.rows([1000, ids[10]]).tolist() == [len(ids), -1]
+    features, edge_index = reader.load_graph()
+    with torch.no_grad():
+        full = model.embed(torch.from_numpy(np.array(features)), torch.from_numpy(edge_index))
+    alive = ~reader.deleted
+    for layer in ("hidden", "output"):
+        np.testing.assert_allclose(reader.layers[layer][alive], full[layer].numpy()[alive], rtol=1e-5, atol=1e-6)
+
+
+def test_asha_promotions_and_resumable_trainer():
+    """ASHA promove o melhor terço de cada degrau; treino retomado iguala o contínuo."""
+    from helius_sim_lab.ml import train_gnn
+    from helius_sim_lab.ml.hparam_search import ASHAScheduler
+
+    scheduler = ASHAScheduler(min_epochs=1, max_epochs=9, eta=3)
+    assert scheduler.rungs == [1, 3, 9]
+    for trial_id, score in enumerate([0.2, 0.9]):
+        scheduler.report(trial_id, 0, score)
+    assert scheduler.promotion() is None
+    scheduler.report(2, 0, 0.5)
+    assert scheduler.promotion() == (1, 1)
+    assert scheduler.promotion() is None
+    scheduler.report(1, 1, 0.95)
+    assert scheduler.best() == (1, 1, 0.95)
+
+    data, categories = train_gnn.build_dataset(train_gnn.load_graph(GRAPH_JSON), feature_seed=0)
+    config = dict(random_seed=7, hidden_channels=8, lr=0.02, batch_size=8, fanouts=(3, 3))
+    continuous = train_gnn.GNNTrainer(data, len(categories), **config)
+    for _ in range(4):
+        continuous.train_epoch()
+    first = train_gnn.GNNTrainer(data, len(categories), **config)
+    for _ in range(2):
+        first.train_epoch()
+    first.evaluate()
+    resumed = train_gnn.GNNTrainer(data, len(categories), **config)
+    resumed.load_state_dict(first.state_dict())
+    for _ in range(2):
+        resumed.train_epoch()
+    for name, value in continuous.model.state_dict().items():
+        assert torch.equal(value, resumed.model.state_dict()[name]), name
+
+
+def test_trainer_validation_split_comes_from_training_nodes():
+    """``val_fraction`` tira a validação do treino e mantém o mesmo teste (seleção sem olhar o teste)."""
+    from helius_sim_lab.ml import train_gnn
+
+    data, categories = train_gnn.build_dataset(train_gnn.load_graph(GRAPH_JSON), feature_seed=0)
+    plain = train_gnn.GNNTrainer(data, len(categories), random_seed=3)
+    held_out = train_gnn.GNNTrainer(data, len(categories), random_seed=3, val_fraction=0.25)
+    assert torch.equal(held_out.test_idx, plain.test_idx)
+    train, val = set(held_out.train_idx.tolist()), set(held_out.val_idx.tolist())
+    assert val and not train & val and train | val == set(plain.train_idx.tolist())
+    assert 0.0 <= held_out.evaluate(split="val") <= 1.0
+    sampled = train_gnn.GNNTrainer(data, len(categories), random_seed=3, batch_size=8, fanouts=(3, 3), val_fraction=0.25)
+    sampled.train_epoch()
+    assert sampled.evaluate(split="val") == sampled.evaluate(split="val")
+    with pytest.raises(ValueError):
+        train_gnn.GNNTrainer(data, len(categories), val_fraction=1.0)
+
+
+def test_numpy_inference_matches_torch(tmp_path):
+    """Os pesos exportados reproduzem o GraphSAGE em NumPy sem importar torch."""
+    import subprocess
+    import sys
+
+    from helius_sim_lab.ml import train_gnn
+    from helius_sim_lab.ml.numpy_inference import NumpyGraphSAGE, export_npz
+
+    data, categories = train_gnn.build_dataset(train_gnn.load_graph(GRAPH_JSON), feature_seed=0)
+    torch.manual_seed(0)
+    model = train_gnn.GraphSAGEModel(data.x.size(1), 16, len(categories)).eval()
+    path = export_npz(model, tmp_path / "graphsage.npz", categories)
+    numpy_model = NumpyGraphSAGE.load(path)
+    assert numpy_model.categories == categories
+    # inclui aresta repetida e nós sem arestas de entrada
+    edge_index = torch.cat([data.edge_index[:, 10:], data.edge_index[:, :1]], dim=1)
+    with torch.no_grad():
+        expected = model.embed(data.x, edge_index)
+    got = numpy_model.embed(data.x.numpy(), edge_index.numpy())
+    for layer in ("hidden", "output"):
+        np.testing.assert_allclose(got[layer], expected[layer].numpy(), rtol=1e-4, atol=1e-5)
+
+    code = "import sys, ml.numpy_inference; assert 'torch' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=str(Path(__file__).resolve().parents[1]))
+
+
+def test_linkpred_learns_clustered_interactions(tmp_path):
+    """Leitura em blocos independe do tamanho do bloco; o modelo separa grupos usuário-item."""
+    import pandas as pd
+
+    from helius_sim_lab.ml import train_linkpred as lp
+
+    rng = np.random.default_rng(0)
+    users = rng.integers(120, size=3000)
+    items = rng.integers(20, size=3000) * 6 + users % 6  # cada usuário só interage com itens do seu grupo
+    path = tmp_path / "transactions.csv"
+    pd.DataFrame({"user_id": users + 1000, "item_id": items, "label": rng.random(3000) < 0.9}).astype(
+        {"label": int}
+    ).to_csv(path, index=False)
+    data = lp.load_interactions(str(path), chunksize=1000, test_fraction=0.2, seed=1)
+    again = lp.load_interactions(str(path), chunksize=333, test_fraction=0.2, seed=1)
+    np.testing.assert_array_equal(data.train, again.train)
+    assert data.user_ids[0] >= 1000 and data.n_items == 120
+
+    graph = lp.BipartiteGraph.from_pairs(data.train, data.n_users, data.n_items)
+    flat, offsets = lp.sample_neighbors(graph.user_indptr, graph.user_items, np.arange(data.n_users), 3, rng)
+    assert np.diff(np.append(offsets, len(flat))).max() <= 3
+    # a aresta do par pontuado sai da vizinhança (fanout acima do grau: sobra todo o resto)
+    owners, targets = data.train[0, :50], data.train[1, :50]
+    flat, offsets = lp.sample_neighbors(graph.user_indptr, graph.user_items, owners, 100, rng, exclude=targets)
+    sizes = np.diff(np.append(offsets, len(flat)))
+    assert not (flat == np.repeat(targets, sizes)).any()
+    assert sizes.tolist() == (np.diff(graph.user_indptr)[owners] - 1).tolist()
+
+    torch.manual_seed(0)
+    model = lp.BipartiteSAGE(data.n_users, data.n_items, dim=16)
+    optimizers = lp.make_optimizers(model)
+    for _ in range(5):
+        lp.train_epoch(model, graph, data.train, optimizers, batch_size=256, num_neg=16, fanout=5, rng=rng)
+    metrics = lp.evaluate(model, graph, data, k=20, fanout=5)
+    assert metrics["auc"] > 0.8
+    assert metrics["recall_at_20"] > 0.5
+    assert lp.evaluate(model, graph, data, k=20, fanout=5, user_chunk=7) == pytest.approx(metrics)
+
+
+def test_khop_subgraph_inference_matches_full_graph():
+    """O subgrafo k-hop reproduz a saída do grafo completo nas sementes; o cache respeita o limite."""
+    from helius_sim_lab.ml import train_gnn
+    from helius_sim_lab.ml.numpy_inference import NumpyGraphSAGE
+    from helius_sim_lab.ml.subgraph import KHopExtractor
+
+    data, categories = train_gnn.build_dataset(train_gnn.load_graph(GRAPH_JSON), feature_seed=0)
+    torch.manual_seed(0)
+    model = train_gnn.GraphSAGEModel(data.x.size(1), 16, len(categories)).eval()
+    numpy_model = NumpyGraphSAGE({name: value.numpy() for name, value in model.state_dict().items()}, categories)
+    x = data.x.numpy()
+    edge_index = torch.cat([data.edge_index, data.edge_index[:, :3]], dim=1).numpy()  # com arestas repetidas
+    full = numpy_model(x, edge_index)
+
+    sizes = [len(KHopExtractor(edge_index, len(x), 2, 0).edge_ids(s)) for s in range(len(x))]
+    extractor = KHopExtractor(edge_index, len(x), num_hops=2, max_cached_edges=sizes[0] + sizes[2] + sizes[5])
+    seeds = np.array([2, 0, 5, 2])
+    nodes, local_edges, seed_pos = extractor.subgraph(seeds)
+    assert local_edges.shape[1] < edge_index.shape[1]
+    np.testing.assert_allclose(numpy_model(x[nodes], local_edges)[seed_pos], full[seeds], rtol=1e-5, atol=1e-6)
+    extractor.subgraph([0])
+    assert extractor.stats()["hits"] == 1 and extractor.stats()["misses"] == 3
+    extractor.subgraph([7])  # expulsa o menos usado recentemente (2)
+    stats = extractor.stats()
+    assert 2 not in extractor._cache and 0 in extractor._cache
+    assert stats["cached_edges"] <= stats["max_cached_edges"]
+    with pytest.raises(IndexError):
+        extractor.subgraph([len(x)])
+
+
+def test_khop_cache_bounds_isolated_seeds():
+    """Subgrafos sem arestas contam 1 no limite do cache e ``max_cached_edges=0`` não guarda nada."""
+    from helius_sim_lab.ml.subgraph import KHopExtractor
+
+    edge_index = np.array([[0], [1]])  # nós 2..9 isolados
+    disabled = KHopExtractor(edge_index, 10, num_hops=2, max_cached_edges=0)
+    for seed in range(10):
+        disabled.edge_ids(seed)
+    assert disabled.stats()["entries"] == 0
+    bounded = KHopExtractor(edge_index, 10, num_hops=2, max_cached_edges=3)
+    for seed in range(2, 10):
+        assert len(bounded.edge_ids(seed)) == 0
+    assert list(bounded._cache) == [7, 8, 9]
+    assert bounded.stats()["cached_edges"] == 3
+
+
+def test_ivf_index_recall_filters_and_roundtrip(tmp_path):
+    """Com todas as listas o IVF iguala a busca exata; filtros e exclusões são respeitados."""
+    from helius_sim_lab.ml import train_gnn
+    from helius_sim_lab.ml.ann_index import IVFIndex, build_from_store
+    from helius_sim_lab.ml.embedding_store import write_embeddings
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((2000, 16)).astype(np.float32)
+    codes = rng.integers(3, size=2000)
+    index = IVFIndex.build(vectors, np.arange(2000) * 10, n_lists=20, codes=codes, categories=["a", "b", "c"])
+    index = IVFIndex.load(index.save(tmp_path / "ann"))
+    queries = vectors[:20]
+    exact = index.exact_search(queries, k=10)
+    for query, expected in zip(queries, exact):
+        ids, scores = index.search(query, k=10, nprobe=index.n_lists)
+        assert set(ids.tolist()) == set(index.ids[expected].tolist())
+        assert np.all(np.diff(scores) <= 0)
+    ids, _ = index.search(index.vector_of(30), k=50, nprobe=1, categories=["c"], exclude_ids=[30])
+    assert len(ids) == 50 and 30 not in ids
+    assert np.all(index.codes[index.positions(ids)] == 2)
+
+    # categorias lidas do one-hot das features guardadas com o store
+    data, categories = train_gnn.build_dataset(train_gnn.load_graph(GRAPH_JSON), feature_seed=0)
+    node_ids = train_gnn.load_node_ids(GRAPH_JSON)
+    store = write_embeddings(
+        tmp_path / "emb", "v1", node_ids, {"output": rng.standard_normal((len(node_ids), 8))},
+        {"categories": categories}, graph=(data.x.numpy(), data.edge_index.numpy()),
+    )
+    store_index = build_from_store(store)
+    np.testing.assert_array_equal(store_index.codes[store_index.positions(node_ids)], data.y.numpy())
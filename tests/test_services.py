@@ -0,0 +1,281 @@
+"""
+Testes dos componentes de serviço (micro-batching, executor de inferência e
+cache de predições do Recommender Service).
+
+Os componentes rodam o loop ``asyncio`` diretamente; as rotas do app são
+exercitadas com ``fastapi.testclient`` sobre um store mínimo em ``tmp_path``.
+"""
+
+import asyncio
+import importlib
+import json
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from helius_sim_lab.services.recommender_service.batching import MicroBatcher
+from helius_sim_lab.services.recommender_service.cache import PredictionCache
+from helius_sim_lab.services.recommender_service.executor import BoundedExecutor, Overloaded
+
+# O serviço do protótipo (deliverable) é uma imagem à parte com o pacote ``app``
+DELIVERABLE_SERVICE = (
+    Path(__file__).resolve().parents[1] / "deliverable" / "4_prototype_repo" / "services" / "recommender_service"
+)
+
+
+def deliverable_module(name: str):
+    """Importa ``app.<name>`` do serviço do protótipo."""
+    if str(DELIVERABLE_SERVICE) not in sys.path:
+        sys.path.insert(0, str(DELIVERABLE_SERVICE))
+    return importlib.import_module(f"app.{name}")
+
+
+def test_micro_batcher_coalesces_and_scatters():
+    """Requisições concorrentes viram uma chamada e cada uma recebe a sua fatia."""
+    calls = []
+
+    def double(items):
+        calls.append(list(items))
+        return [2 * x for x in items]
+
+    async def scenario():
+        batcher = MicroBatcher(double, max_items=100, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit([i, i + 100]) for i in range(5)))
+        small = MicroBatcher(double, max_items=3, max_wait_ms=50)
+        await asyncio.gather(*(small.submit([i, i]) for i in range(4)))
+        await batcher.stop()
+        await small.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    assert results == [[2 * i, 2 * i + 200] for i in range(5)]
+    assert len(calls[0]) == 10
+    # com ``max_items=3`` o lote é despachado ao atingir o limite, sem esperar
+    assert [len(c) for c in calls[1:]] == [4, 4]
+
+
+def test_micro_batcher_propagates_errors():
+    def fail(items):
+        raise ValueError("falhou")
+
+    async def scenario():
+        batcher = MicroBatcher(fail, max_wait_ms=1)
+        try:
+            return await asyncio.gather(batcher.submit([1]), batcher.submit([2]), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(scenario()))
+
+
+def test_bounded_executor_rejects_when_full():
+    """Com o pool e a fila ocupados, ``run`` recusa na hora em vez de enfileirar."""
+    release = threading.Event()
+
+    async def scenario():
+        executor = BoundedExecutor(workers=1, max_queue=1, name="test")
+        first = asyncio.ensure_future(executor.run(release.wait, 5))
+        second = asyncio.ensure_future(executor.run(lambda: "ok"))
+        await asyncio.sleep(0)
+        try:
+            await executor.run(lambda: "nunca")
+        except Overloaded:
+            rejected = True
+        else:
+            rejected = False
+        admitted = executor.stats()["admitted"]
+        release.set()
+        results = await asyncio.gather(first, second)
+        executor.shutdown()
+        return rejected, admitted, results, executor.stats()["admitted"]
+
+    rejected, admitted, results, after = asyncio.run(scenario())
+    assert rejected and admitted == 2
+    assert results == [True, "ok"] and after == 0
+
+
+def test_prediction_cache_ttl_size_and_version():
+    now = [0.0]
+    cache = PredictionCache(max_entries=2, ttl_seconds=10, name="test", clock=lambda: now[0])
+    cache.put_many("v1", [1, 2], ["a", "b"])
+    assert cache.get_many("v1", [1, 2, 3]) == ["a", "b", None]
+    # LRU: 1 foi consultado depois de 2, então 2 sai quando 3 entra
+    cache.get_many("v1", [1])
+    cache.put_many("v1", [3], ["c"])
+    assert cache.get_many("v1", [1, 2, 3]) == ["a", None, "c"]
+    now[0] = 10.0
+    assert cache.get_many("v1", [1, 3]) == [None, None]
+    cache.put_many("v1", [1], ["a"])
+    # versão nova esvazia o cache e gravações atrasadas da anterior são ignoradas
+    assert cache.get_many("v2", [1]) == [None]
+    cache.put_many("v1", [1], ["velho"])
+    assert cache.get_many("v2", [1]) == [None]
+    stats = cache.stats()
+    assert stats["version"] == "v2" and stats["entries"] == 0 and stats["hits"] == 5
+
+
+@pytest.mark.parametrize("deliverable", [False, True], ids=["recommender", "deliverable"])
+def test_bounded_executor_keeps_slot_while_cancelled_job_runs(deliverable):
+    """Cancelar quem espera não libera a vaga enquanto a thread ainda executa."""
+    module = deliverable_module("executor") if deliverable else sys.modules[BoundedExecutor.__module__]
+    release = threading.Event()
+
+    async def scenario():
+        executor = module.BoundedExecutor(workers=1, max_queue=0, name="test-cancel")
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(executor.run(release.wait, 5), 0.05)
+        with pytest.raises(module.Overloaded):
+            await executor.run(lambda: "nunca")
+        queued = executor._pool._work_queue.qsize()
+        release.set()
+        for _ in range(200):
+            if executor.stats()["admitted"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        result = await executor.run(lambda: "ok")
+        executor.shutdown()
+        return queued, result
+
+    assert asyncio.run(scenario()) == (0, "ok")
+
+
+@pytest.fixture
+def recommender_app(tmp_path, monkeypatch):
+    """App do Recommender Service sobre um store mínimo (6 nós, 2 categorias) em ``tmp_path``."""
+    from fastapi.testclient import TestClient
+
+    from helius_sim_lab.ml.ann_index import build_from_store
+    from helius_sim_lab.ml.embedding_store import write_embeddings
+    from helius_sim_lab.ml.numpy_inference import FORMAT_VERSION
+    from helius_sim_lab.services.recommender_service import main
+
+    rng = np.random.default_rng(0)
+    categories = ["service", "data_store"]
+    ids = np.arange(100, 106)
+    features = np.eye(2, dtype=np.float32)[[0, 1, 0, 1, 0, 1]]
+    edge_index = np.array([[0, 1, 2, 3, 4, 5], [1, 2, 3, 4, 5, 0]], dtype=np.int64)
+    weights = {}
+    for layer, (n_in, n_out) in {"conv1": (2, 4), "conv2": (4, 2)}.items():
+        weights[f"{layer}.lin_l.weight"] = rng.normal(size=(n_out, n_in)).astype(np.float32)
+        weights[f"{layer}.lin_l.bias"] = np.zeros(n_out, dtype=np.float32)
+        weights[f"{layer}.lin_r.weight"] = rng.normal(size=(n_out, n_in)).astype(np.float32)
+    meta = json.dumps({"format_version": FORMAT_VERSION, "categories": categories})
+    np.savez(tmp_path / "g.npz", meta=np.asarray(meta), **weights)
+    model = main.NumpyGraphSAGE.load(tmp_path / "g.npz")
+    layers = model.embed(features, edge_index)
+    store = write_embeddings(
+        tmp_path / "emb", "v1", ids, layers, {"categories": categories}, graph=(features, edge_index)
+    )
+    build_from_store(store, n_lists=2).save(tmp_path / "ann")
+
+    monkeypatch.setattr(main, "NUMPY_MODEL_PATH", str(tmp_path / "g.npz"))
+    monkeypatch.setattr(main, "GRAPH_STORE_PATH", str(tmp_path / "emb"))
+    monkeypatch.setattr(main, "ANN_INDEX_PATH", str(tmp_path / "ann"))
+    monkeypatch.setattr(main, "CACHE", main.PredictionCache(100, 60))
+    expected = [categories[c] for c in layers["output"].argmax(axis=1)]
+    with TestClient(main.app) as client:
+        yield client, ids, expected
+
+
+def test_recommender_app_endpoints(recommender_app):
+    client, ids, expected = recommender_app
+    health = client.get("/health").json()
+    assert health["status"] == "ok" and health["ann_index"] == {"store_version": "v1", "stale": False}
+    node_ids = [int(ids[0]), int(ids[3]), int(ids[0])]
+    for _ in range(2):  # a segunda passada sai do cache de predições
+        response = client.post("/predict", json={"node_ids": node_ids})
+        assert response.status_code == 200
+        assert response.json()["predictions"] == [expected[0], expected[3], expected[0]]
+    assert client.post("/predict", json={"node_ids": [999]}).status_code == 404
+    stats = client.get("/stats").json()
+    assert stats["store_version"] == "v1" and stats["prediction_cache"]["hits"] == 3
+
+    items = client.get("/recommend", params={"node_id": int(ids[0]), "k": 3}).json()["items"]
+    assert len(items) == 3 and int(ids[0]) not in [item["node_id"] for item in items]
+    filtered = client.get("/recommend", params={"node_id": int(ids[0]), "k": 2, "category": "data_store"})
+    assert {item["category"] for item in filtered.json()["items"]} == {"data_store"}
+    assert client.get("/recommend", params={"node_id": 999}).status_code == 404
+    assert "recommender_prediction_cache_hits_total" in client.get("/metrics").text
+
+
+def test_recommender_main_runs_as_script(tmp_path):
+    """``python services/recommender_service/main.py`` carrega os módulos irmãos sem pacote pai."""
+    script = Path(__file__).resolve().parents[1] / "services" / "recommender_service" / "main.py"
+    code = f"import runpy; app = runpy.run_path({str(script)!r})['app']; print(app.title)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "Recommender Service"
+
+
+def test_recommender_app_flags_stale_ann_index(recommender_app, caplog, monkeypatch):
+    """Índice construído sobre outra versão do store: aviso na carga e ``stale`` no ``/health``."""
+    from helius_sim_lab.services.recommender_service import main
+
+    client, ids, _ = recommender_app
+    meta_path = Path(main.ANN_INDEX_PATH) / "meta.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta_path.write_text(json.dumps({**meta, "store_version": "v0"}), encoding="utf-8")
+    with caplog.at_level("WARNING", logger="uvicorn"):
+        assert main.load_ann_index(main.STORE) is not None
+    assert "v0" in caplog.text
+    monkeypatch.setattr(main, "INDEX", main.load_ann_index(main.STORE))
+    assert client.get("/health").json()["ann_index"]["stale"] is True
+
+
+def test_deliverable_prediction_cache():
+    """Cache do protótipo: chave normalizada, TTL, LRU e troca de versão."""
+    cache_module = deliverable_module("cache")
+    now = [0.0]
+    cache = cache_module.PredictionCache(max_entries=2, ttl_seconds=5, name="test-deliverable", clock=lambda: now[0])
+    key = cache_module.normalize_features([1, -0.0])
+    assert key == cache_module.normalize_features([1.0, 0.0])
+    cache.put("v1", key, 0.5)
+    cache.put("v1", (2.0,), 2.0)
+    assert cache.get("v1", key) == 0.5
+    cache.put("v1", (3.0,), 3.0)  # (2.0,) é a menos usada
+    assert cache.get("v1", (2.0,)) is None and cache.get("v1", (3.0,)) == 3.0
+    now[0] = 5.0
+    assert cache.get("v1", key) is None
+    cache.put("v1", key, 0.5)
+    assert cache.get("v2", key) is None
+    cache.put("v1", key, 0.5)  # gravação atrasada da versão anterior
+    assert cache.stats() == {"version": "v2", "entries": 0, "max_entries": 2}
+
+
+def test_deliverable_reload_swaps_model_and_invalidates_cache(monkeypatch):
+    """``/model/reload`` exige o token, troca a versão e o cache deixa de servir a anterior."""
+    pytest.importorskip("prometheus_fastapi_instrumentator")
+    from fastapi.testclient import TestClient
+
+    main = deliverable_module("main")
+    model_module = deliverable_module("model")
+
+    class FakeModel:
+        def __init__(self, run_id, factor):
+            self.metadata = type("Meta", (), {"run_id": run_id})()
+            self.factor = factor
+
+        def predict(self, x):
+            return [self.factor * float(x.sum())]
+
+    current = {"model": FakeModel("aaaaaaaa0000", 1.0)}
+    monkeypatch.setattr(model_module, "load_model_from_mlflow", lambda: current["model"])
+    monkeypatch.setattr(main, "log_inference", lambda **kwargs: None)
+    monkeypatch.setattr(main, "prediction_cache", deliverable_module("cache").PredictionCache(10, 60))
+    monkeypatch.setattr(main, "MODEL_RELOAD_TOKEN", "")
+    with TestClient(main.app) as client:
+        first = client.post("/predict", json={"features": [1.0, 2.0]}).json()
+        assert first["prediction"] == 3.0 and first["model_version"] == "mlflow-aaaaaaaa"
+        assert client.post("/model/reload").status_code == 404
+
+        monkeypatch.setattr(main, "MODEL_RELOAD_TOKEN", "segredo")
+        assert client.post("/model/reload", headers={"X-Reload-Token": "errado"}).status_code == 403
+        current["model"] = FakeModel("bbbbbbbb0000", 10.0)
+        reloaded = client.post("/model/reload", headers={"X-Reload-Token": "segredo"})
+        assert reloaded.json()["model_version"] == "mlflow-bbbbbbbb"
+        second = client.post("/predict", json={"features": [1.0, 2.0]}).json()
+        assert second == {**first, "prediction": 30.0, "model_version": "mlflow-bbbbbbbb"}
@@ -0,0 +1,521 @@
+"""
+Testes das simulações de resiliência (filas e Monte Carlo).
+
+Os cenários usam sementes fixas e horizontes curtos para manter a suíte
+rápida; tolerâncias refletem o erro estatístico esperado de cada simulação.
+"""
+
+import random
+from pathlib import Path
+
+import pytest
+
+from helius_sim_lab.sim.backpressure_sim import (
+    analytic_applicable,
+    erlang_c,
+    estimate_backpressure,
+    simulate_backpressure,
+)
+
+GRAPH_JSON = Path(__file__).resolve().parents[1] / "data" / "graph.json"
+
+
+def test_erlang_c_matches_mm1():
+    """Para c=1 a probabilidade de espera é a própria utilização."""
+    assert erlang_c(5.0, 6.0, 1) == pytest.approx(5.0 / 6.0)
+
+
+def test_analytic_and_simulation_agree():
+    """A espera média de Erlang C deve coincidir com uma simulação longa."""
+    analytic = estimate_backpressure(5.0, 6.0, 2, sim_time=20000.0)
+    assert analytic["method"] == "analytic"
+    random.seed(7)
+    simulated = estimate_backpressure(5.0, 6.0, 2, sim_time=20000.0, method="simulation")
+    assert simulated["method"] == "simulation"
+    assert simulated["avg_wait"] == pytest.approx(analytic["avg_wait"], rel=0.1)
+    assert simulated["completed"] == pytest.approx(analytic["completed"], rel=0.05)
+
+
+def test_fallback_to_simulation():
+    """Filas instáveis, limitadas ou transitórias devem ser simuladas."""
+    assert not analytic_applicable(12.0, 6.0, 2, sim_time=1000.0)
+    assert not analytic_applicable(5.0, 6.0, 2, sim_time=1000.0, queue_limit=10)
+    assert not analytic_applicable(5.0, 6.0, 1, sim_time=1.0)
+    random.seed(3)
+    bounded = estimate_backpressure(12.0, 6.0, 1, sim_time=200.0, queue_limit=5)
+    assert bounded["method"] == "simulation"
+    assert bounded["dropped"] > 0
+    with pytest.raises(ValueError):
+        estimate_backpressure(12.0, 6.0, 1, sim_time=200.0, method="analytic")
+
+
+def test_simulate_backpressure_counts_completed():
+    random.seed(11)
+    metrics = simulate_backpressure(5.0, 6.0, 2, sim_time=100.0)
+    assert metrics["completed"] > 0
+    assert metrics["dropped"] == 0
+
+
+def _chain_graph():
+    """Usuário -> serviço -> data store, o menor caminho de chamada síncrona."""
+    import networkx as nx
+
+    G = nx.DiGraph()
+    G.add_node("user", category="user")
+    G.add_node("api", category="service")
+    G.add_node("db", category="data_store")
+    G.add_edge("user", "api", type="calls")
+    G.add_edge("api", "db", type="depends_on")
+    return G
+
+
+def test_queue_network_single_station_matches_erlang_c():
+    """Sem chamadas a dependências, cada estação é uma fila M/M/c independente."""
+    from helius_sim_lab.sim.queue_network_sim import compile_queue_network, simulate_queue_network
+
+    network = compile_queue_network(_chain_graph(), service_rate=6.0, capacity=2)
+    metrics = simulate_queue_network(network, {"api": 5.0}, sim_time=20000.0, p_call=0.0, rng=random.Random(5))
+    expected = estimate_backpressure(5.0, 6.0, 2, sim_time=20000.0)["avg_wait"]
+    assert metrics["stations"]["api"]["avg_wait"] == pytest.approx(expected, rel=0.1)
+
+
+def test_queue_network_propagates_slowdown_upstream():
+    """Degradar o data store deve aumentar espera e rejeições no serviço chamador."""
+    from helius_sim_lab.sim.queue_network_sim import (
+        compile_queue_network,
+        entry_rates_from_users,
+        simulate_queue_network,
+    )
+
+    G = _chain_graph()
+    network = compile_queue_network(G, service_rate=20.0, capacity=2, queue_limit=20)
+    rates = entry_rates_from_users(G, network, rate_per_user=10.0)
+    assert rates == {"api": 10.0}
+    healthy = simulate_queue_network(network, rates, 500.0, p_call=1.0, rng=random.Random(1))
+    degraded = simulate_queue_network(network, rates, 500.0, p_call=1.0, slowdown={"db": 8.0}, rng=random.Random(1))
+    assert degraded["stations"]["api"]["avg_wait"] > 10 * healthy["stations"]["api"]["avg_wait"]
+    assert degraded["requests"]["rejected"] > healthy["requests"]["rejected"]
+    again = simulate_queue_network(network, rates, 500.0, p_call=1.0, slowdown={"db": 8.0}, rng=random.Random(1))
+    assert again == degraded
+
+
+def test_queue_network_cyclic_calls_do_not_deadlock():
+    """Em um ciclo A <-> B as chamadas liberam o atendente; fora dele continuam retendo."""
+    import networkx as nx
+
+    from helius_sim_lab.sim.queue_network_sim import compile_queue_network, simulate_queue_network
+
+    G = nx.DiGraph()
+    G.add_node("a", category="service")
+    G.add_node("b", category="service")
+    G.add_edge("a", "b", type="calls")
+    G.add_edge("b", "a", type="calls")
+    G.add_node("db", category="data_store")
+    G.add_edge("b", "db", type="depends_on")
+    network = compile_queue_network(G, service_rate=50.0, capacity=1)
+    assert network.holds_server == [(False,), (False, True), ()]
+    metrics = simulate_queue_network(
+        network, {"a": 5.0, "b": 5.0}, sim_time=200.0, p_call=0.7, max_depth=20, rng=random.Random(2)
+    )
+    requests = metrics["requests"]
+    assert requests["completed"] > 0.95 * requests["arrivals"]
+    assert all(station["backlog"] < 20 for station in metrics["stations"].values())
+
+
+def test_monte_carlo_is_independent_of_worker_count():
+    """A semeadura por tarefa deve produzir resultados idênticos em série e em paralelo."""
+    import networkx as nx
+
+    from helius_sim_lab.sim.monte_carlo_resilience import monte_carlo
+
+    G = nx.gnp_random_graph(40, 0.08, seed=1, directed=True)
+    for n in list(G.nodes)[:8]:
+        G.nodes[n]["category"] = "user"
+    kwargs = dict(n_sims=4, failure_probs=[0.05, 0.2], capacities=[1, 2], queue_method="simulation", seed=123)
+    serial = monte_carlo(G, workers=1, **kwargs)
+    parallel = monte_carlo(G, workers=2, **kwargs)
+    assert serial == parallel
+    assert [r["simulation_id"] for r in serial] == list(range(1, 17))
+    assert monte_carlo(G, workers=1, **{**kwargs, "seed": 124}) != serial
+
+
+def test_monte_carlo_memoizes_independent_subsimulations(tmp_path):
+    """Falhas e filas são simuladas uma vez por parâmetro e reaproveitadas do disco."""
+    import networkx as nx
+
+    from helius_sim_lab.sim.monte_carlo_resilience import monte_carlo
+    from helius_sim_lab.sim.result_cache import ResultCache
+
+    G = nx.gnp_random_graph(30, 0.1, seed=2, directed=True)
+    kwargs = dict(n_sims=3, failure_probs=[0.1, 0.2], capacities=[1, 2, 3], queue_method="simulation", seed=9)
+    cache = ResultCache(tmp_path)
+    first = monte_carlo(G, cache=cache, **kwargs)
+    assert len(first) == 18
+    assert len(cache) == 2 * 3 + 3 * 3
+    warm = ResultCache(tmp_path)
+    assert monte_carlo(G, cache=warm, **kwargs) == first
+    assert warm.misses == 0
+    # linhas com a mesma capacidade compartilham a tentativa de fila
+    by_capacity = [r["avg_wait"] for r in first if r["capacity"] == 2]
+    assert by_capacity[:3] == by_capacity[3:]
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    import os
+
+    from helius_sim_lab.sim.result_cache import ResultCache, key_digest
+
+    cache = ResultCache(tmp_path, max_bytes=10**6)
+    for i in range(5):
+        cache.put(("k", i), {"value": "x" * 100})
+        # envelhece as entradas em ordem de inserção
+        os.utime(tmp_path / f"{key_digest(('k', i))}.json", (i, i))
+    cache.max_bytes = 250
+    cache.put(("k", 5), {"value": "x" * 100})
+    reopened = ResultCache(tmp_path)
+    assert reopened.get(("k", 0)) is None
+    assert reopened.get(("k", 5)) is not None
+
+
+def test_result_cache_bounds_memory_and_refills_from_disk(tmp_path):
+    from helius_sim_lab.sim.result_cache import ResultCache
+
+    memory_only = ResultCache(max_memory_entries=2)
+    for i in range(3):
+        memory_only.put(("k", i), {"value": i})
+    memory_only.get(("k", 1))
+    memory_only.put(("k", 3), {"value": 3})
+    assert len(memory_only) == 2
+    assert memory_only.get(("k", 2)) is None and memory_only.get(("k", 1)) == {"value": 1}
+
+    cache = ResultCache(tmp_path, max_memory_entries=2)
+    for i in range(5):
+        cache.put(("k", i), {"value": i})
+    assert len(cache) == 2
+    assert cache.get(("k", 0)) == {"value": 0} and len(cache) == 2
+
+
+def test_result_sink_resumes_after_partial_batch(tmp_path):
+    """Um lote escrito após o último checkpoint deve ser descartado na retomada."""
+    import csv
+
+    from helius_sim_lab.sim.result_sink import CsvResultSink
+
+    path = tmp_path / "results.csv"
+    params = {"n_sims": 4, "seed": 1}
+    sink = CsvResultSink(path, params, batch_size=2)
+    for sid in range(1, 4):
+        sink.write({"simulation_id": sid, "value": sid * 1.5})
+    # simula uma queda: o terceiro registro ficou no buffer e há lixo após o checkpoint
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("3,4.")
+    resumed = CsvResultSink(path, params, batch_size=2, resume=True)
+    assert resumed.completed_ids == {1, 2}
+    for sid in range(1, 5):
+        if sid not in resumed.completed_ids:
+            resumed.write({"simulation_id": sid, "value": sid * 1.5})
+    resumed.close()
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [int(r["simulation_id"]) for r in rows] == [1, 2, 3, 4]
+    assert CsvResultSink.load_manifest(resumed.manifest_path)["status"] == "complete"
+    with pytest.raises(ValueError):
+        CsvResultSink(path, {"n_sims": 8, "seed": 1}, resume=True)
+
+
+def test_work_queue_reassigns_expired_leases(tmp_path):
+    """Um lote cujo worker parou de enviar heartbeats volta para a fila."""
+    import time
+
+    from helius_sim_lab.sim.work_queue import WorkQueue
+
+    queue = WorkQueue(tmp_path / "queue.db")
+    (task_id,) = queue.submit([{"keys": [["queue", 1]]}])
+    assert queue.claim("dead", lease_seconds=0.05)[0] == task_id
+    assert queue.claim("alive", lease_seconds=30.0) is None
+    time.sleep(0.1)
+    assert queue.claim("alive", lease_seconds=30.0)[0] == task_id
+    assert not queue.heartbeat(task_id, "dead", 30.0)
+    assert queue.complete(task_id, "alive", [{"value": 1}])
+    assert not queue.complete(task_id, "dead", [{"value": 2}])
+    assert queue.results([task_id]) == {task_id: [{"value": 1}]}
+
+
+def test_monte_carlo_over_work_queue_matches_local(tmp_path):
+    """Workers em processos separados produzem as mesmas linhas que a execução local."""
+    import multiprocessing
+
+    import networkx as nx
+
+    from helius_sim_lab.sim.monte_carlo_resilience import monte_carlo
+    from helius_sim_lab.sim.work_queue import run_worker
+
+    G = nx.gnp_random_graph(30, 0.1, seed=3, directed=True)
+    kwargs = dict(n_sims=3, failure_probs=[0.1, 0.2], capacities=[1, 2], queue_method="simulation", seed=5)
+    db = tmp_path / "queue.db"
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=run_worker, args=(db,), kwargs={"poll_interval": 0.05}) for _ in range(2)]
+    for proc in workers:
+        proc.start()
+    distributed = monte_carlo(G, queue_db=db, **kwargs)
+    for proc in workers:
+        proc.join(timeout=30)
+        assert proc.exitcode == 0
+    assert distributed == monte_carlo(G, **kwargs)
+
+
+def test_paired_comparison_reduces_variance_with_common_random_numbers():
+    """Sorteios comuns estreitam o IC da diferença entre arquiteturas."""
+    from helius_sim_lab.sim.paired_comparison import run_paired, summarize_paired
+
+    kwargs = dict(p_node=0.1, p_propagate={"legacy": 0.3, "resilient": 0.3}, region=None, seed=11)
+    paired = summarize_paired(run_paired(300, **kwargs)).set_index("metric")
+    independent = summarize_paired(run_paired(300, common_random_numbers=False, **kwargs)).set_index("metric")
+    assert paired.loc["failed_nodes_count", "variance_reduction"] > 1.5
+    assert paired.loc["failed_nodes_count", "halfwidth"] < independent.loc["failed_nodes_count", "halfwidth"]
+    outage = run_paired(5, seed=1)
+    assert set(outage["failed_critical_fraction"][outage["architecture"] == "legacy"]) == {1.0}
+
+
+def test_scenario_engine_emits_report_schema():
+    """O motor vetorizado gera o esquema do relatório com métricas coerentes."""
+    import numpy as np
+    import networkx as nx
+
+    from helius_sim_lab.sim.graph_csr import from_networkx
+    from helius_sim_lab.sim.scenario_engine import REPORT_COLUMNS, cascade_batch, mmc_queue_batch, run_report
+
+    chain = from_networkx(nx.path_graph(5, create_using=nx.DiGraph))
+    rto, failed = cascade_batch(chain, chain.mask([1]), 1.0, 3, np.random.default_rng(0))
+    assert rto.tolist() == [4, 4, 4]
+    assert failed.sum(axis=1).tolist() == [4, 4, 4]
+    # limiar -1: soma todas as esperas, cuja média deve seguir Erlang C (Wq ~ 0.035)
+    _, total_wait = mmc_queue_batch(5.0, 6.0, 2, 400.0, -1, 50, np.random.default_rng(1))
+    assert (total_wait / (5.0 * 400.0)).mean() == pytest.approx(0.035, rel=0.15)
+
+    df = run_report(20, seed=3, batch_size=8)
+    assert list(df.columns) == REPORT_COLUMNS
+    assert len(df) == 20 * 3 * 2
+    assert df[["scenario", "architecture"]].iloc[:2].values.tolist() == [
+        ["regional_outage", "legacy"], ["regional_outage", "resilient"]
+    ]
+    means = df.groupby(["scenario", "architecture"]).mean(numeric_only=True)
+    assert means.loc[("regional_outage", "legacy"), "failed_critical_fraction"] == 1.0
+    assert means.loc[("regional_outage", "resilient"), "failed_critical_fraction"] < 1.0
+    assert means.loc[("ia_drift", "resilient"), "avg_invalid_rate"] == 0.0
+    assert run_report(20, seed=3, batch_size=8).equals(df)
+
+
+def test_typed_propagation_respects_edge_semantics(tmp_path):
+    """``monitors`` não propaga, réplicas fazem failover e o kernel em lote concorda com o NetworkX."""
+    import numpy as np
+    import networkx as nx
+
+    from helius_sim_lab.sim.graph_csr import compile_propagation, from_networkx, load_npz, save_npz
+    from helius_sim_lab.sim.monte_carlo_resilience import load_graph
+    from helius_sim_lab.sim.network_failure_sim import edge_type_probabilities, simulate_failure_with_draws
+    from helius_sim_lab.sim.scenario_engine import cascade_batch
+
+    G = nx.DiGraph()
+    G.add_edge("api", "db", type="depends_on")
+    G.add_edge("grafana", "api", type="monitors")
+    G.add_edge("db", "db_replica", type="replicates")
+    G.add_edge("web", "db_replica", type="depends_on")
+    probs = edge_type_probabilities(1.0)
+    ones = {e: 0.0 for e in G.edges}
+    zeros = {n: 1.0 for n in G.nodes}
+    # réplica saudável: a falha do db não chega à api
+    assert simulate_failure_with_draws(G, 0.0, 1.0, zeros, ones, ["db"], probs) == (0, {"db"})
+    rto, failed = simulate_failure_with_draws(G, 0.0, 1.0, zeros, ones, ["db", "db_replica"], probs)
+    assert failed == {"db", "db_replica", "api", "web"} and rto == 2
+
+    csr = from_networkx(G)
+    save_npz(csr, tmp_path / "g.npz")
+    csr = load_npz(tmp_path / "g.npz")
+    batch_rto, batch_failed = cascade_batch(
+        csr, csr.mask(["db", "db_replica"]), 1.0, 2, np.random.default_rng(0), compile_propagation(csr, 1.0, probs)
+    )
+    assert batch_rto.tolist() == [2, 2]
+    assert batch_failed[0].tolist() == csr.mask(failed).tolist()
+
+    big = load_graph(GRAPH_JSON)
+    csr = from_networkx(big)
+    probs = edge_type_probabilities(0.6)
+    initial = [n for n, c in big.nodes(data="category") if c in ("data_store", "cloud_region")]
+    _, batched = cascade_batch(
+        csr, csr.mask(initial), 0.6, 400, np.random.default_rng(1), compile_propagation(csr, 0.6, probs)
+    )
+    rng = np.random.default_rng(2)
+    serial = [
+        len(simulate_failure_with_draws(
+            big, 0.0, 0.6, {n: 1.0 for n in big}, dict(zip(big.edges, rng.random(big.number_of_edges()))),
+            initial, probs,
+        )[1])
+        for _ in range(400)
+    ]
+    assert batched.sum(axis=1).mean() == pytest.approx(np.mean(serial), rel=0.1)
+
+
+def test_typed_propagation_on_undirected_graph():
+    """Em ``nx.Graph`` a propagação por tipo segue os vizinhos (dependência nos dois sentidos)."""
+    import networkx as nx
+
+    from helius_sim_lab.sim.network_failure_sim import simulate_failure, simulate_failure_with_draws
+
+    G = nx.path_graph(4)
+    nx.set_edge_attributes(G, "calls", "type")
+    assert simulate_failure(G, 1.0, 1.0, random.Random(0), edge_probs={"calls": 1.0}) == (1, {0, 1, 2, 3})
+    rto, failed = simulate_failure_with_draws(
+        G, 0.0, 1.0, {n: 1.0 for n in G}, {e: 0.0 for e in G.edges}, [1], {"calls": 1.0}
+    )
+    assert failed == {0, 1, 2, 3} and rto == 3
+
+
+def test_plot_aggregation_is_bounded_and_chunk_invariant(tmp_path):
+    """Agregados por blocos coincidem com o DataFrame inteiro e o HTML não cresce com as linhas."""
+    import numpy as np
+    import pandas as pd
+
+    from helius_sim_lab.sim.plot_aggregation import aggregate_csv, aggregate_frame, write_report
+
+    def results(n):
+        rng = np.random.default_rng(n)
+        return pd.DataFrame({
+            "p_node": rng.choice([0.05, 0.1], n),
+            "capacity": rng.choice([1, 2], n),
+            "recovery_time": rng.integers(0, 6, n),
+            "user_impact_pct": rng.uniform(0, 100, n),
+            "avg_wait": rng.exponential(0.2, n),
+        })
+
+    df = results(20000)
+    df.to_csv(tmp_path / "r.csv", index=False)
+    whole = aggregate_frame(df)
+    chunked = aggregate_csv(tmp_path / "r.csv", chunksize=3000)
+    assert (chunked.density == whole.density).all()
+    for key, counts in whole.hist["avg_wait"].items():
+        assert (chunked.hist["avg_wait"][key] == counts).all()
+    summary = chunked.summary().set_index(["p_node", "capacity"])
+    expected = df.groupby(["p_node", "capacity"])["user_impact_pct"].agg(["mean", "std"])
+    assert np.allclose(summary["user_impact_pct_mean"], expected["mean"])
+    assert np.allclose(summary["user_impact_pct_std"], expected["std"])
+
+    write_report(chunked, tmp_path / "big.html")
+    write_report(aggregate_frame(results(200)), tmp_path / "small.html")
+    assert (tmp_path / "big.html").stat().st_size < 1.5 * (tmp_path / "small.html").stat().st_size
+
+
+def test_t_quantile_small_samples(monkeypatch):
+    """Com poucos graus de liberdade o quantil é o exato, ou infinito sem o SciPy."""
+    from helius_sim_lab.sim import sequential_stopping
+
+    exact = {1: 12.706, 2: 4.303, 5: 2.571, 30: 2.042}
+    for df, value in exact.items():
+        assert sequential_stopping.t_quantile(0.95, df) == pytest.approx(value, abs=1e-3)
+    monkeypatch.setattr(sequential_stopping, "student_t", None)
+    assert sequential_stopping.t_quantile(0.95, 2) == float("inf")
+    assert sequential_stopping.t_quantile(0.95, 30) == pytest.approx(exact[30], abs=0.01)
+
+
+def test_allocate_samples_favours_imprecise_cells():
+    from helius_sim_lab.sim.sequential_stopping import allocate_samples
+
+    allocation = allocate_samples({"a": 3.0, "b": 1.2, "c": 0.5}, {"a": 10, "b": 10, "c": 10}, budget=20)
+    assert "c" not in allocation
+    assert allocation["a"] > allocation["b"] >= 1
+    assert sum(allocation.values()) <= 20
+
+
+def test_adaptive_monte_carlo_stops_within_budget():
+    """Células convergem ou param no orçamento; a execução é determinística."""
+    import networkx as nx
+    import pandas as pd
+
+    from helius_sim_lab.sim.monte_carlo_resilience import iter_adaptive_monte_carlo, summarize_cells
+
+    G = nx.gnp_random_graph(30, 0.1, seed=4, directed=True)
+    for n in list(G.nodes)[:10]:
+        G.nodes[n]["category"] = "user"
+    kwargs = dict(
+        failure_probs=[0.05, 0.3],
+        capacities=[2],
+        metrics=("user_impact_pct", "avg_wait"),
+        target=0.25,
+        min_sims=8,
+        batch_size=8,
+        max_total_sims=400,
+        seed=5,
+    )
+    rows = list(iter_adaptive_monte_carlo(G, **kwargs))
+    assert rows == list(iter_adaptive_monte_carlo(G, **kwargs))
+    assert len(rows) <= 400
+    assert [r["simulation_id"] for r in rows] == list(range(1, len(rows) + 1))
+    summary = summarize_cells(pd.DataFrame(rows), ("user_impact_pct", "avg_wait"), target=0.25)
+    for record in summary.to_dict("records"):
+        assert record["converged"] or len(rows) >= 400 - 8
+    # a célula de maior variância relativa (p_node baixo) recebe mais tentativas
+    counts = summary.set_index("p_node")["n_sims"]
+    assert counts[0.05] > counts[0.3]
+
+
+def test_latin_hypercube_stratifies_every_dimension():
+    import numpy as np
+
+    from helius_sim_lab.sim.sweep import latin_hypercube
+
+    unit = latin_hypercube(16, 3, np.random.default_rng(0))
+    for dim in range(3):
+        assert sorted(np.floor(unit[:, dim] * 16).astype(int)) == list(range(16))
+
+
+def test_sobol_design_rounds_up_to_balanced_block():
+    """Com ``n_points`` fora de potência de 2 o Sobol usa o bloco inteiro seguinte, balanceado."""
+    import numpy as np
+
+    from helius_sim_lab.sim.sweep import design_points, sobol_sequence
+
+    unit = sobol_sequence(12, 2, seed=0)
+    assert unit.shape == (16, 2)
+    for dim in range(2):
+        assert sorted(np.floor(unit[:, dim] * 16).astype(int)) == list(range(16))
+    spec = {"design": "sobol", "n_points": 5, "seed": 0, "parameters": {"p_node": {"low": 0.0, "high": 1.0}}}
+    assert len(design_points(spec)) == 8
+
+
+def test_surrogates_interpolate_smooth_surface():
+    import numpy as np
+    import pandas as pd
+
+    from helius_sim_lab.sim.sweep import cross_validated_r2, design_points, fit_surrogate
+
+    spec = {
+        "design": "sobol",
+        "n_points": 32,
+        "seed": 1,
+        "parameters": {"p_node": {"low": 0.0, "high": 0.5}, "arrival_rate": {"low": 5.0, "high": 15.0}},
+    }
+    df = pd.DataFrame(design_points(spec))
+    df["impact_mean"] = 100 * df["p_node"] ** 2 + 0.5 * df["arrival_rate"]
+    assert cross_validated_r2(spec, df, "impact") > 0.99
+    for kind in ("polynomial", "gp"):
+        model = fit_surrogate({**spec, "surrogate": {"kind": kind}}, df, "impact")
+        assert model.predict(np.array([[0.25, 10.0]]))[0] == pytest.approx(11.25, abs=0.5)
+
+
+def test_run_sweep_matches_across_workers():
+    import networkx as nx
+
+    from helius_sim_lab.sim.sweep import run_sweep
+
+    G = nx.gnp_random_graph(25, 0.1, seed=3, directed=True)
+    spec = {
+        "design": "lhs",
+        "n_points": 4,
+        "n_sims": 3,
+        "seed": 11,
+        "parameters": {"p_node": {"low": 0.05, "high": 0.3}, "capacity": {"low": 1, "high": 3, "type": "int"}},
+    }
+    serial = run_sweep(G, spec, workers=1)
+    assert len(serial) == 4
+    assert set(serial["capacity"]) <= {1, 2, 3}
+    assert serial.equals(run_sweep(G, spec, workers=2))